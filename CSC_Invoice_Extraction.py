@@ -1,238 +1,7 @@
 import streamlit as st
-import pdfplumber
-import re
-import pandas as pd
-import io
-
-# ========= Regex Patterns =========
-footer_pattern = re.compile(
-    r"(Powered by wastedge\.com|Page:\s*\d+|Tax Invoice:|Invoice Date:|Acc:)",
-    re.IGNORECASE
-)
-
-header_pattern = {
-    "tax_invoice": r"Tax Invoice\s+(\d+)",
-    "account_number": r"Account Number\s+([\d.]+)",
-    "billing_period": r"Billing Period\s+([\d/]+ to [\d/]+)",
-    "invoice_date": r"Invoice Date\s+([\d/]+)",
-    "total": r"Total\s+([\d.,]+)"
-}
-
-site_pattern = re.compile(
-    r"Services\s*/\s*Site:\s*(\d+\.\d+)\s+(.+?)\s*-\s*(.+?)\s*-\s*(.+?)\s+([A-Z]{2,3})\s*(\d+)",
-    re.DOTALL
-)
-
-# Primary pattern for service lines
-pattern = re.compile(
-    r"^(\d{2}/\d{2}/\d{2})\s+"        # Date
-    r"([\d.]+)\s+"                    # Ref No
-    r"(.+?)\s+"                       # Description
-    r"(\d+)\s+"                       # Qty
-    r"([\d.,]+)\s+"                   # Price
-    r"([\d.,]+)\s*"                   # Total
-    r"(.*)$"                          # Trailing desc
-)
-
-# Alternate pattern (decimal qty)
-pattern_alt = re.compile(
-    r"""^
-    (\d{2}/\d{2}/\d{2})\s+
-    ([\d.]+)\s+
-    (.+?)\s+
-    ([\d.]+)\s+
-    ([\d.,]+)\s+
-    ([\d.,]+)\s*
-    (.*)$
-    """,
-    re.VERBOSE
-)
-
-# ========= Functions =========
-def extract_pdf_text(pdf_bytes):
-    text = ""
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    return text
-
-def extract_headers(text):
-    """
-    Extract all invoice headers from the PDF text.
-    Returns a list of dictionaries, each containing:
-    tax_invoice, account_number, billing_period, invoice_date, total
-    """
-    invoice_pattern = re.compile(
-        r"Tax Invoice\s+(\d+).*?"              # Tax Invoice
-        r"Account Number\s+([\d.]+).*?"       # Account Number
-        r"Billing Period\s+([\d/]+ to [\d/]+).*?"  # Billing Period
-        r"Invoice Date\s+([\d/]+).*?"         # Invoice Date
-        r"Total\s+([\d.,]+)",                  # Total (immediately after Invoice Date)
-        re.DOTALL
-    )
-
-    headers = []
-    for match in invoice_pattern.finditer(text):
-        tax_invoice, account_number, billing_period, invoice_date, total = match.groups()
-        headers.append({
-            "tax_invoice": tax_invoice.strip(),
-            "account_number": account_number.strip(),
-            "billing_period": billing_period.strip(),
-            "invoice_date": invoice_date.strip(),
-            "total": float(total.replace(",", "").strip())
-        })
-
-    return headers
-
-def extract_header(text):
-    header_data = {}
-    for key, pat in header_pattern.items():
-        if key == "total":
-            # Find all totals and sum them
-            matches = re.findall(pat, text)
-            if matches:
-                totals = [float(m.replace(",", "")) for m in matches]
-                header_data[key] = str(sum(totals))
-                header_data["all_totals"] = totals  # store individual totals too
-        else:
-            match = re.search(pat, text)
-            if match:
-                header_data[key] = match.group(1).strip()
-    return header_data
-
-
-
-
-def count_service_lines(text):
-    pat = re.compile(r"^\d{2}/\d{2}/\d{2}", re.MULTILINE)
-    matches = pat.findall(text)
-    return len(matches)
-
-
-def parse_invoice(text):
-    rows = []
-    unmatched_rows = []
-    header_data = extract_header(text)
-    sites = list(site_pattern.finditer(text))
-
-    for idx, site_match in enumerate(sites):
-        site_code, customer_name, address, city, region, zipcode = site_match.groups()
-        start_pos = site_match.end()
-        if idx + 1 < len(sites):
-            end_pos = sites[idx + 1].start()
-            site_block = text[start_pos:end_pos]
-        else:
-            site_block = text[start_pos:]
-
-        lines = [l.strip() for l in site_block.split("\n") if l.strip()]
-        i = 0
-        while i < len(lines):
-            if re.match(r"^\d{2}/\d{2}/\d{2}\s", lines[i]):
-                booking_lines = [lines[i]]
-                j = i + 1
-                while j < len(lines):
-                    if re.match(r"^\d{2}/\d{2}/\d{2}\s", lines[j]):
-                        break
-                    if re.match(r"^Sub\s+Total", lines[j], re.IGNORECASE):
-                        break
-                    if footer_pattern.search(lines[j]):
-                        j += 1
-                        continue
-                    booking_lines.append(lines[j])
-                    j += 1
-
-                full_line = " ".join(booking_lines)
-                m = pattern.match(full_line)
-                if not m:
-                    m = pattern_alt.match(full_line)
-
-                if m:
-                    date, ref_no, desc, qty, price, total, trailing_desc = m.groups()
-                    description = (desc + " " + trailing_desc).strip()
-                    rows.append({
-                        "Tax Invoice": header_data.get("tax_invoice", ""),
-                        "Site": site_code,
-                        "Customer Name": customer_name.strip(),
-                        "Address": address.strip(),
-                        "City": city.strip(),
-                        "Region": region.strip(),
-                        "Zip": zipcode.strip(),
-                        "Date": date.strip(),
-                        "Ref No": ref_no.strip(),
-                        "Description": description,
-                        "PO": "",
-                        "Qty": qty.strip(),
-                        "Price": price.replace(",", ""),
-                        "Total": total.replace(",", "")
-                    })
-                else:
-                    unmatched_rows.append({
-                        "Tax Invoice": header_data.get("tax_invoice", ""),
-                        "Site": site_code,
-                        "Customer Name": customer_name.strip(),
-                        "Address": address.strip(),
-                        "City": city.strip(),
-                        "Region": region.strip(),
-                        "Zip": zipcode.strip(),
-                        "Raw Line": full_line
-                    })
-                i = j
-            else:
-                i += 1
-
-    return rows, unmatched_rows
-
-
-def parse_period_charges(text):
-    period_rows = []
-    period_blocks = re.split(r"Services / Site:", text)
-    for block in period_blocks:
-        if "Period Charges" in block:
-            site_match = re.search(r"(\d+\.\d+)\s+Wasteflex Pty Ltd\s+-\s+(.+)", block)
-            if not site_match:
-                continue
-            site_code = site_match.group(1)
-            customer_name_full = site_match.group(2).strip()
-
-            if " - " in customer_name_full:
-                customer_name, address = customer_name_full.split(" - ", 1)
-            else:
-                customer_name = customer_name_full
-                address = ""
-
-            lines = block.split("\n")
-            try:
-                start_idx = lines.index("Period Charges") + 1
-            except ValueError:
-                continue
-
-            if lines[start_idx].strip().startswith("Description"):
-                start_idx += 1
-
-            period_pattern = re.compile(r"^(.+?)\s+([\d.,]+)\s+([\d.,]+)\s+([\d.,]+)$")
-
-            for line in lines[start_idx:]:
-                line = line.strip()
-                if not line:
-                    continue
-                m = period_pattern.match(line)
-                if m:
-                    description_text, qty, price, total = m.groups()
-                    period_rows.append({
-                        "Site": site_code,
-                        "Customer Name": customer_name.strip(),
-                        "Address": address.strip(),
-                        "Description": description_text.strip(),
-                        "Qty": qty.replace(",", "").strip(),
-                        "Price": price.replace(",", "").strip(),
-                        "Total": total.replace(",", "").strip(),
-                    })
-                else:
-                    break
-    return period_rows
 
+from extractors import columnar, csc, result_cache, router
+from extractors.workbook import workbook_bytes
 
 # ========= Streamlit UI =========
 st.title("📄 CSC Invoice Extractor")
@@ -240,77 +9,67 @@ st.title("📄 CSC Invoice Extractor")
 uploaded_file = st.file_uploader("Upload a PDF invoice", type=["pdf"])
 
 if uploaded_file is not None:
+    wrong_upload = router.wrong_upload_message(uploaded_file, "csc")
+    if wrong_upload:
+        st.warning(wrong_upload)
+        if not st.checkbox("Parse it as a CSC invoice anyway"):
+            st.stop()
+
     pdf_bytes = uploaded_file.read()
     st.info("Processing...")
 
-    pdf_text = extract_pdf_text(pdf_bytes)
-    rows, unmatched_rows = parse_invoice(pdf_text)
-    period_charges = parse_period_charges(pdf_text)
-    headers = extract_headers(pdf_text)  # Updated: multiple invoice headers
+    def extract():
+        result = csc.parse(pdf_bytes)
+        return result, workbook_bytes(result["tables"]), columnar.zip_bytes(result["tables"])
+
+    # Parsed once per upload; widget reruns reuse the result and the export files
+    result, output_file, parquet_zip = result_cache.cached_result(csc, pdf_bytes, extract)
+    rows, unmatched_rows = result["rows"], result["unmatched_rows"]
+    period_charges = result["period_charges"]
+    headers = result["headers"]  # Updated: multiple invoice headers
 
-    raw_line_count = count_service_lines(pdf_text)
+    raw_line_count = result["raw_line_count"]
     extracted_line_count = len(rows)
     unmatched_line_count = len(unmatched_rows)
 
-    # Save results into Excel (in-memory)
-    output_file = io.BytesIO()
-    with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-        pd.DataFrame(rows).to_excel(writer, index=False, sheet_name="invoice_data")
-        pd.DataFrame(unmatched_rows).to_excel(writer, index=False, sheet_name="unmatched_lines")
-        pd.DataFrame(period_charges).to_excel(writer, index=False, sheet_name="Period Charges")
-    output_file.seek(0)
-
     # Show extraction results
     st.success("✅ Extraction complete!")
     st.write(f"Raw service lines found: **{raw_line_count}**")
     st.write(f"Extracted service lines: **{extracted_line_count}**")
     st.write(f"Unmatched lines: **{unmatched_line_count}**")
     st.write(f"Period Charges lines: **{len(period_charges)}**")
+    if not result["rejects"].empty:
+        st.warning(f"⚠️ {len(result['rejects'])} amount value(s) could not be read as numbers")
+        st.dataframe(result["rejects"])
 
     # ===== Invoice Validation =====
-    try:
-        # Sum of all invoice totals from PDF
-        total_invoice_sum = sum(h["total"] for h in headers)
-
-        # Sum extracted line totals
-        df_lines = pd.DataFrame(rows)
-        line_total_sum = df_lines["Total"].astype(float).sum() if not df_lines.empty else 0.0
-
-        # Include Period Charges totals if needed
-        df_period = pd.DataFrame(period_charges)
-        if not df_period.empty:
-            line_total_sum += df_period["Total"].astype(float).sum()
-
-        # GST and Total incl. GST
-        gst_amount = round(line_total_sum * 0.10, 2)
-        calculated_total = round(line_total_sum + gst_amount, 2)
-
+    validation = result["reconciliation"]
+    if "error" in validation:
+        st.warning(f"⚠️ Could not validate invoice total: {validation['error']}")
+    else:
         st.subheader("📊 Invoice Validation")
-        st.write(f"**Service Lines Total:** {df_lines['Total'].astype(float).sum():,.2f}")
-        st.write(f"**Period Charges Total:** {df_period['Total'].astype(float).sum() if not df_period.empty else 0.00:,.2f}")
-        st.write(f"**Subtotal (excl. GST):** {line_total_sum:,.2f}")
-        st.write(f"**GST (10%):** {gst_amount:,.2f}")
-        st.write(f"**Calculated Total (incl. GST):** {calculated_total:,.2f}")
+        st.write(f"**Service Lines Total:** {validation['service_lines_total']:,.2f}")
+        st.write(f"**Period Charges Total:** {validation['period_charges_total']:,.2f}")
+        st.write(f"**Subtotal (excl. GST):** {validation['subtotal']:,.2f}")
+        st.write(f"**GST (10%):** {validation['gst_amount']:,.2f}")
+        st.write(f"**Calculated Total (incl. GST):** {validation['calculated_total']:,.2f}")
 
         if headers:
             st.write("**Invoice Totals Found on PDF:**")
             for idx, h in enumerate(headers, start=1):
                 st.write(f"Invoice {idx} ({h['tax_invoice']}): {h['total']:,.2f}")
-            st.write(f"**Sum of Invoice Totals (for validation):** {total_invoice_sum:,.2f}")
+            st.write(f"**Sum of Invoice Totals (for validation):** {validation['total_invoice_sum']:,.2f}")
 
-        if abs(total_invoice_sum - calculated_total) < 0.01:
+        if validation["status"] == "MATCH":
             st.success("✅ Validation Passed: Invoice total matches calculated total.")
         else:
-            st.error(f"❌ Validation Failed: Difference = {total_invoice_sum - calculated_total:,.2f}")
-
-    except Exception as e:
-        st.warning(f"⚠️ Could not validate invoice total: {e}")
+            st.error(f"❌ Validation Failed: Difference = {validation['difference']:,.2f}")
 
 
 
     # Show first few rows
     if extracted_line_count > 0:
-        st.dataframe(pd.DataFrame(rows).head())
+        st.dataframe(result["tables"]["invoice_data"].head())
 
     # Download button
     st.download_button(
@@ -319,3 +78,9 @@ if uploaded_file is not None:
         file_name="CSC_invoice_EXTRACTED.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
+    st.download_button(
+        label="📥 Download Parquet (zip)",
+        data=parquet_zip,
+        file_name="CSC_invoice_EXTRACTED_parquet.zip",
+        mime="application/zip"
+    )
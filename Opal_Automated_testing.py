@@ -1,360 +1,30 @@
-import pdfplumber
-import pandas as pd
 import re
 import io
-import json
 import streamlit as st
 
-# -----------------------------
-# Load learned patterns
-# -----------------------------
-def load_learned_patterns():
-    try:
-        with open("learned_patterns.json", "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
-def save_learned_patterns(patterns):
-    with open("learned_patterns.json", "w") as f:
-        json.dump(patterns, f, indent=2)
-
-learned_patterns = load_learned_patterns()
-
-# -----------------------------
-# Tokenizer
-# -----------------------------
-def tokenize_line(line):
-    tokens = line.split()
-    return " ".join([
-        "<DATE>" if re.match(r"\d{2}\.\d{2}\.\d{4}", t)
-        else "<NUMBER>" if re.match(r"^\d[\d,\.]*$", t)
-        else "<AUD>" if t.upper() == "AUD"
-        else "<TEXT>"
-        for t in tokens
-    ])
-
-
-
-# -----------------------------
-# Main PDF Processing
-# -----------------------------
-def process_pdf(file_stream):
-    invoice_no = ""
-    data = []
-    missed_lines = []
-    customer = ""
-    full_text = ""
-
-    with pdfplumber.open(file_stream) as pdf:
-        for page_num, page in enumerate(pdf.pages, start=1):
-            text = page.extract_text()
-            full_text += (text or "") + "\n"
-
-            # Extract invoice number
-            if not invoice_no and text and "Invoice No." in text:
-                match = re.search(r"Invoice No\. (\d+)", text)
-                if match:
-                    invoice_no = match.group(1)
-
-            if not text:
-                continue
-
-            lines = text.split("\n")
-
-            for i, line in enumerate(lines):
-                matched = False
-
-                # ---------------- Customer ----------------
-                cust_match = re.match(r"^(R-[A-Z0-9]+)\s+(.+)", line)
-                if cust_match:
-                    customer = cust_match.group(1) + " " + cust_match.group(2).strip()
-                    matched = True
-                    continue
-
-                # ---------------- Rental ----------------
-                rental_match = re.match(
-                    r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+(\d{2}\.\d{2}\.\d{4} to \d{2}\.\d{2}\.\d{4})\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+(\w+)\s+([\d,\.]+)\s+([\d,\.]+)\s+([\d,\.]+) AUD",
-                    line
-                )
-                if rental_match:
-                    date, description, period, qty, qty_unit, unit_price, unit_unit, amt_excl_gst, gst, amt_incl_gst = rental_match.groups()
-                    billed_qty_line = lines[i + 1] if i + 1 < len(lines) else ""
-                    billed_qty_match = re.search(r"Billed Qty\s+([\d\.]+)\s+(\w+)", billed_qty_line)
-                    billed_qty_full = f"{billed_qty_match.group(1)} {billed_qty_match.group(2)}" if billed_qty_match else ""
-                    data.append({
-                        "Invoice No.": invoice_no, "Customer": customer, "Date": date, "Description": description,
-                        "Charge Type/Period Reference": period, "Reference": "", "Billed qty": billed_qty_full,
-                        "Qty.": f"{qty} {qty_unit}", "Unit Price": f"{unit_price} {unit_unit}",
-                        "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
-                    })
-                    matched = True
-                    continue
-
-                # ---------------- FFS - Qty/Weight ----------------
-                ffs_match = re.match(
-                    r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+FFS - Qty/Weight\s+([\w\d/]+)\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+([\w\d\.]+)\s+([\d,\.]+)\s+([\d,\.]+)\s+([\d,\.]+) AUD",
-                    line
-                )
-                if ffs_match:
-                    date, description, reference, qty, qty_unit, unit_price, unit_unit, amt_excl_gst, gst, amt_incl_gst = ffs_match.groups()
-                    billed_qty_line = lines[i + 1] if i + 1 < len(lines) else ""
-                    billed_qty_match = re.search(r"Billed Qty\s+([\d\.]+)\s+(\w+)", billed_qty_line)
-                    billed_qty_full = f"{billed_qty_match.group(1)} {billed_qty_match.group(2)}" if billed_qty_match else ""
-                    data.append({
-                        "Invoice No.": invoice_no, "Customer": customer, "Date": date, "Description": description,
-                        "Charge Type/Period Reference": "FFS - Qty/Weight", "Reference": reference,
-                        "Billed qty": billed_qty_full, "Qty.": f"{qty} {qty_unit}", "Unit Price": f"{unit_price} {unit_unit}",
-                        "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
-                    })
-                    matched = True
-                    continue
-
-                # ---------------- FFS with TO ----------------
-                ffs_qty_to_match = re.match(
-                    r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+FFS - Qty/Weight\s+([\w\-\/]+)\s+([\d\.]+)\s+TO\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+) AUD",
-                    line
-                )
-                if ffs_qty_to_match:
-                    date, description, reference, val1, val2, qty_unit, billed_qty, unit_price, amt_incl_gst = ffs_qty_to_match.groups()
-                    gst = str(round(float(amt_incl_gst) - float(unit_price), 2))
-                    amt_excl_gst = unit_price
-                    billed_qty_full = f"{billed_qty} {qty_unit}"
-                    data.append({
-                        "Invoice No.": invoice_no, "Customer": customer, "Date": date,
-                        "Description": description, "Charge Type/Period Reference": "FFS - Qty/Weight",
-                        "Reference": reference, "Billed qty": billed_qty_full, "Qty.": f"{val1} TO {val2} {qty_unit}",
-                        "Unit Price": unit_price, "Amount excl. GST": amt_excl_gst,
-                        "GST": gst, "Amount Incl. GST": amt_incl_gst
-                    })
-                    matched = True
-                    continue
-
-                # ---------------- FFS - Load Compact ----------------
-                ffs_load_compact_match = re.match(
-                    r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+FFS - Load\s+([\w\-\.]+)\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+) AUD",
-                    line
-                )
-                if ffs_load_compact_match:
-                    date, description, reference, qty, qty_unit, unit_price, gst, amt_incl_gst = ffs_load_compact_match.groups()
-                    amt_excl_gst = str(round(float(amt_incl_gst) - float(gst), 2))
-                    billed_qty_line = lines[i + 1] if i + 1 < len(lines) else ""
-                    billed_qty_match = re.search(r"Billed Qty\s+([\d\.]+)\s+(\w+)", billed_qty_line)
-                    billed_qty_full = f"{billed_qty_match.group(1)} {billed_qty_match.group(2)}" if billed_qty_match else ""
-                    data.append({
-                        "Invoice No.": invoice_no, "Customer": customer, "Date": date,
-                        "Description": description.strip(), "Charge Type/Period Reference": "FFS - Load",
-                        "Reference": reference.strip(), "Billed qty": billed_qty_full,
-                        "Qty.": f"{qty} {qty_unit}", "Unit Price": f"{unit_price}",
-                        "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
-                    })
-                    matched = True
-                    continue
-
-                # ---------------- Front Lift / Rental style ----------------
-                front_lift_match = re.match(
-                    r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+(\d{2}\.\d{2}\.\d{4} to \d{2}\.\d{2}\.\d{4})\s+(.+?)\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+) AUD",
-                    line
-                )
-                if front_lift_match:
-                    date, description, period, ref_details, qty_val, qty_unit, unit_price_val, unit_price_unit, amt_excl_gst, gst, amt_incl_gst = front_lift_match.groups()
-                    billed_qty_full = f"{qty_val} {qty_unit}"
-                    data.append({
-                        "Invoice No.": invoice_no, "Customer": customer, "Date": date,
-                        "Description": description.strip(), "Charge Type/Period Reference": period,
-                        "Reference": ref_details.strip(), "Billed qty": billed_qty_full,
-                        "Qty.": billed_qty_full, "Unit Price": f"{unit_price_val} {unit_price_unit}",
-                        "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
-                    })
-                    matched = True
-                    continue
-
-                # ---------------- Manual Price ----------------
-                if "Manual Price" in line:
-                    try:
-                        date_match = re.match(r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+Manual Price\s+(.+)", line)
-                        if not date_match:
-                            continue
-                        date, desc1, desc2 = date_match.groups()
-                        description_lines = [f"{desc1.strip()} {desc2.strip()}"]
-
-                        lookahead = 1
-                        while i + lookahead < len(lines) and lookahead <= 5:
-                            next_line = lines[i + lookahead].strip()
-                            if next_line == "":
-                                break
-                            if (re.search(r"\d+\.?\d*\s+(TO\s+)?\d+\.?\d*", next_line) or "AUD" in next_line or "Billed Qty" in next_line):
-                                description_lines.append(next_line)
-                            else:
-                                break
-                            lookahead += 1
-
-                        full_block = " ".join(description_lines)
-
-                        totals_match = re.search(r"([\d,\.]+)\s+([\d,\.]+)\s+([\d,\.]+)\s+AUD", full_block)
-                        amt_excl_gst, gst, amt_incl_gst = totals_match.groups() if totals_match else ("", "", "")
-
-                        qty_match = re.search(r"(\d+\.?\d*)\s+TO\s+([\d,\.]+)", full_block)
-                        qty = f"{qty_match.group(1)} TO" if qty_match else ""
-                        unit_price = qty_match.group(2) if qty_match else ""
-
-                        billed_qty_match = re.search(r"Billed Qty\s+([\d\.]+)\s+TO", full_block)
-                        billed_qty = f"{billed_qty_match.group(1)} TO" if billed_qty_match else ""
-
-                        data.append({
-                            "Invoice No.": invoice_no, "Customer": customer, "Date": date,
-                            "Description": "Manual Price - " + description_lines[0],
-                            "Charge Type/Period Reference": "Manual Price",
-                            "Reference": "", "Billed qty": billed_qty or qty,
-                            "Qty.": qty, "Unit Price": unit_price,
-                            "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
-                        })
-                        matched = True
-                        continue
-
-                    except Exception:
-                        continue
-
-                # ---------------- Learned Patterns ----------------
-                if not matched:
-                    for token_pattern, pattern_data in learned_patterns.items():
-                        regex = pattern_data["regex"]
-                        field_map = pattern_data["field_map"]
-                        charge_type = pattern_data.get("Charge Type", "")
-                        current_token_pattern = tokenize_line(line)
-
-                        if current_token_pattern == token_pattern:
-                            match = re.match(regex, line)
-                            if match:
-                                groups = match.groups()
-                                parsed = {
-                                    "Invoice No.": invoice_no,
-                                    "Customer": customer,
-                                    "Charge Type/Period Reference": charge_type,
-                                }
-
-                                # ✅ Safe group lookup
-                                for field, group_index in field_map.items():
-                                    if 0 < group_index <= len(groups):
-                                        parsed[field] = groups[group_index - 1]
-                                    else:
-                                        parsed[field] = ""  # fallback empty if invalid mapping
-
-                                data.append(parsed)
-                                matched = True
-                                break
-
-                # ---------------- Fallback Plastic Rolls ----------------
-                if not matched:
-                    ffs_plastic_roll_match = re.match(
-                        r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+FFS - Qty/Weight\s+([A-Z0-9]+)\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+)\s+AUD",
-                        line
-                    )
-                    if ffs_plastic_roll_match:
-                        date, description, reference, qty, qty_unit, unit_price, amt_excl_gst, gst, amt_incl_gst = ffs_plastic_roll_match.groups()
-                        billed_qty_full = f"{qty} {qty_unit}"
-                        data.append({
-                            "Invoice No.": invoice_no, "Customer": customer, "Date": date,
-                            "Description": description.strip(), "Charge Type/Period Reference": "FFS - Qty/Weight",
-                            "Reference": reference.strip(), "Billed qty": billed_qty_full,
-                            "Qty.": billed_qty_full, "Unit Price": unit_price,
-                            "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
-                        })
-                        matched = True
-                        continue
-
-                # ---------------- Unmatched ----------------
-                if not matched and re.search(r"\d{2}\.\d{2}\.\d{4}.*AUD", line):
-                    missed_lines.append({
-                        "Page": page_num, "Line No.": i + 1, "Customer": customer,
-                        "Line": line, "Note": "Potential invoice data (unparsed)"
-                    })
-
-    # ---------------- Totals ----------------
-    total_payable_matches = re.findall(
-        r"Total Payable\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s+AUD",
-        full_text, re.IGNORECASE
-    )
-
-    totals = {}
-    if total_payable_matches:
-        excl_total = gst_total = incl_total = 0.0
-        for excl_str, gst_str, incl_str in total_payable_matches:
-            excl_total += float(excl_str.replace(",", ""))
-            gst_total += float(gst_str.replace(",", ""))
-            incl_total += float(incl_str.replace(",", ""))
-        totals = {
-            "Amount excl. GST": round(excl_total, 2),
-            "GST": round(gst_total, 2),
-            "Amount Incl. GST": round(incl_total, 2)
-        }
-
-    return invoice_no, data, missed_lines, totals
-
+from extractors import columnar, opal, result_cache, router
+from extractors.workbook import workbook_bytes
 
 #invoice totals
-def show_invoice_totals(extracted_lines, invoice_totals, tolerance=0.05):
+def show_invoice_totals(check):
+    """Display a result's ``reconciliation`` (see ``opal.invoice_totals_check``)."""
     st.subheader("📊 Invoice Totals Check (Amount Incl. GST Only)")
 
-    df = pd.DataFrame(extracted_lines)
-    if df.empty:
+    if check["status"] == "UNKNOWN":
         st.warning("⚠️ No line items found to calculate totals.")
         return
 
-    # Ensure Amount Incl. GST is numeric
-    if "Amount Incl. GST" in df.columns:
-        df["Amount Incl. GST"] = (
-            df["Amount Incl. GST"].astype(str)
-              .str.replace(",", "")
-              .str.extract(r"([\d\.]+)")[0]
-              .astype(float)
-              .fillna(0)
-        )
-
-    # Mark Manual Price lines
-    df['Is Manual Price'] = df['Charge Type/Period Reference'].str.contains("Manual Price", na=False)
-
-    # ---------------- Sum Amount Incl. GST ----------------
-    actual_total = df["Amount Incl. GST"].sum()
-
-    # ---------------- Compare with invoice total ----------------
-    expected_total = float(str(invoice_totals.get("Amount Incl. GST", 0)).replace(",", ""))
-    diff = actual_total - expected_total
-    within_tol = abs(diff) <= tolerance
-
     # ---------------- Display ----------------
-    status = "✅ OK" if within_tol else "❌ Mismatch"
-    st.write(f"**Invoice Amount Incl. GST:** {expected_total:,.2f}")
-    st.write(f"**Sum of All Lines (Incl. Manual Price):** {actual_total:,.2f}")
-    st.write(f"**Difference:** {diff:,.2f} → {status}")
+    status = "✅ OK" if check["within_tolerance"] else "❌ Mismatch"
+    st.write(f"**Invoice Amount Incl. GST:** {check['expected_total']:,.2f}")
+    st.write(f"**Sum of All Lines (Incl. Manual Price):** {check['actual_total']:,.2f}")
+    st.write(f"**Difference:** {check['difference']:,.2f} → {status}")
 
     # Optional: breakdown of Manual Price lines
-    manual_total = df.loc[df['Is Manual Price'], 'Amount Incl. GST'].sum()
-    st.info(f"➡️ Sum of Manual Price lines: {manual_total:,.2f}")
-# -----------------------------
-# Learning widget
-# -----------------------------
-
-def tokenize_line(line: str) -> str:
-    """Convert a line into a token pattern for matching."""
-    tokens = line.split()
-    return " ".join(["<NUM>" if t.replace(".", "").isdigit() else "<TXT>" for t in tokens])
-
+    st.info(f"➡️ Sum of Manual Price lines: {check['manual_price_total']:,.2f}")
 # -----------------------------
 # Learning widget - Improved UX
 # -----------------------------
-import re, json
-import streamlit as st
-
-# -----------------------------
-# Tokenizer
-# -----------------------------
-def tokenize_line(line: str) -> str:
-    """Convert a line into a token pattern for matching."""
-    tokens = line.split()
-    return " ".join(
-        ["<NUM>" if t.replace(".", "").isdigit() else "<TXT>" for t in tokens]
-    )
 
 # -----------------------------
 # Heuristic guesser
@@ -394,20 +64,6 @@ FIELD_OPTIONS = {
     "AUD": "💲 Currency AUD"
 }
 
-# -----------------------------
-# Load/save patterns
-# -----------------------------
-def load_patterns():
-    try:
-        with open("learned_patterns.json", "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
-def save_patterns(patterns):
-    with open("learned_patterns.json", "w") as f:
-        json.dump(patterns, f, indent=2)
-
 # -----------------------------
 # Learning Widget
 # -----------------------------
@@ -420,13 +76,13 @@ def show_learning_widget(missed_lines):
 
     st.markdown("### Map tokens to invoice fields")
 
-    learned_patterns = load_patterns()
+    learned_patterns = opal.load_learned_patterns()
 
     for idx, ml in enumerate(missed_lines[:10]):
         st.markdown(f"**📄 Page {ml['Page']}, Line {ml['Line No.']}**")
         line = ml["Line"].strip()
         tokens = line.split()
-        token_pattern = tokenize_line(line)
+        token_pattern = opal.tokenize_line(line)  # same signature the parser looks up
 
         # --- Prefill ---
         suggested_fields, confidence = [], []
@@ -507,7 +163,7 @@ def show_learning_widget(missed_lines):
                         "field_map": field_map,
                         "Charge Type": "Auto-Learned"
                     }
-                    save_patterns(learned_patterns)
+                    opal.save_learned_patterns(learned_patterns)
                     st.success("✅ Pattern saved successfully!")
                     st.json({f: m.group(i) for f, i in field_map.items()})
             except re.error as e:
@@ -520,7 +176,7 @@ def show_learning_widget(missed_lines):
 def manage_patterns():
     st.subheader("📚 Manage Learned Patterns")
 
-    learned_patterns = load_patterns()
+    learned_patterns = opal.load_learned_patterns()
     if not learned_patterns:
         st.info("No saved patterns yet.")
         return
@@ -617,12 +273,12 @@ def manage_patterns():
                     learned_patterns[token_pattern]["regex"] = new_regex
                     learned_patterns[token_pattern]["Charge Type"] = new_charge_type
                     learned_patterns[token_pattern]["field_map"] = new_field_map
-                    save_patterns(learned_patterns)
+                    opal.save_learned_patterns(learned_patterns)
                     st.success("✅ Pattern updated!")
             with colB:
                 if st.button(f"🗑️ Delete Pattern ({token_pattern})"):
                     del learned_patterns[token_pattern]
-                    save_patterns(learned_patterns)
+                    opal.save_learned_patterns(learned_patterns)
                     st.warning("❌ Pattern deleted!")
                     st.experimental_rerun()
 
@@ -637,19 +293,52 @@ tab1, tab2, tab3 = st.tabs(["📂 Upload & Extract", "🧠 Teach Me", "📚 Mana
 uploaded_file = st.file_uploader("Upload an Invoice PDF", type=["pdf"])
 
 if uploaded_file:
+    wrong_upload = router.wrong_upload_message(uploaded_file, "opal")
+    if wrong_upload:
+        st.warning(wrong_upload)
+        if not st.checkbox("Parse it as an Opal invoice anyway"):
+            st.stop()
+
+    pdf_bytes = uploaded_file.getvalue()
+    learned_patterns = opal.load_learned_patterns()
+
+    def scan():
+        return opal.scan_pdf(io.BytesIO(pdf_bytes), learned_patterns)
+
+    def extract():
+        # The PDF is scanned once per upload; patterns learned since then are
+        # applied to the affected lines only
+        scanned = opal.relearn(result_cache.cached_result(opal, pdf_bytes, scan), learned_patterns)
+        # Same normalized amounts, rejects and sheets as opal.parse / the CLI
+        result = opal.parse_result(
+            scanned["invoice_no"], scanned["data"], scanned["missed_lines"], scanned["totals"]
+        )
+        return result, workbook_bytes(result["tables"]), columnar.zip_bytes(result["tables"])
+
+    # One result per upload and learned-pattern set; Teach Me / Manage Patterns
+    # widget reruns reuse the result and the export files
     with st.spinner("Processing PDF... please wait ⏳"):
-        file_stream = io.BytesIO(uploaded_file.read())
-        invoice_no, data, missed_lines, totals = process_pdf(file_stream)
+        result, output, parquet_zip = result_cache.cached_result(
+            opal, pdf_bytes, extract, opal.learned_patterns_version(learned_patterns)
+        )
+    invoice_no, data, missed_lines, totals = (
+        result["invoice_no"], result["data"], result["missed_lines"], result["totals"]
+    )
 
     st.success(f"✅ Extracted {len(data)} lines | ⚠️ {len(missed_lines)} unmatched")
 
     if data:
         st.subheader("Extracted Data (preview)")
-        st.dataframe(pd.DataFrame(data).head(20))
+        st.dataframe(result["tables"]["Invoice Data"].head(20))
+
+    if not result["rejects"].empty:
+        st.subheader("Rejected Values")
+        st.warning(f"⚠️ {len(result['rejects'])} amount value(s) could not be read as numbers")
+        st.dataframe(result["rejects"])
 
     # 🔹 Show invoice totals summary instead of raw JSON
     if data and totals:
-        show_invoice_totals(data, totals, tolerance=0.05)
+        show_invoice_totals(result["reconciliation"])
 
     if missed_lines:
         st.subheader("Unmatched Lines (first 10)")
@@ -662,24 +351,17 @@ if uploaded_file:
     # Pattern manager always available
     manage_patterns()
 
-    # --- Save to Excel ---
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        if data:
-            pd.DataFrame(data).to_excel(writer, sheet_name="Invoice Data", index=False)
-
-        if missed_lines:
-            pd.DataFrame(missed_lines).to_excel(writer, sheet_name="Unmatched Lines", index=False)
-
-        if totals:
-            # Save invoice totals as a single-row sheet
-            pd.DataFrame([totals]).to_excel(writer, sheet_name="Invoice Totals", index=False)
-
     # ✅ Streamlit download button
     st.download_button(
         label="📥 Download Excel",
-        data=output.getvalue(),
+        data=output,
         file_name=f"Opal_Invoice_{invoice_no or 'Unknown'}.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
+    st.download_button(
+        label="📥 Download Parquet (zip)",
+        data=parquet_zip,
+        file_name=f"Opal_Invoice_{invoice_no or 'Unknown'}_parquet.zip",
+        mime="application/zip"
+    )
 
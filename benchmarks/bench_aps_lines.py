@@ -0,0 +1,121 @@
+"""Line classification / description cleanup throughput for the APS parser.
+
+Compares the per-line regex chains the parser used to run against
+``extractors.aps.classify_line`` and ``clean_description`` on a synthetic
+statement, checks both produce identical results, and prints lines/sec.
+
+    python benchmarks/bench_aps_lines.py [n_lines]
+"""
+import random
+import re
+import sys
+import time
+
+from extractors import aps
+
+
+# --- Previous implementation, kept for comparison ---
+def legacy_is_footer_line(line):
+    line = line.strip().lower()
+    return bool(
+        "powered by wastedge" in line
+        or re.match(r"^page[: ]*\d+", line)
+        or re.search(r"tax invoice[: ]*\d+", line)
+        or re.search(r"invoice date[: ]*\d{2}/\d{2}/\d{2}", line)
+        or re.search(r"acc[: ]*\d+\.\d+", line)
+        or ("tax invoice" in line and "invoice date" in line and "acc" in line)
+    )
+
+def legacy_classify_line(line):
+    line = line.strip()
+    if legacy_is_footer_line(line):
+        return aps.LINE_FOOTER
+    if re.match(r"\d{2}/\d{2}/\d{2}\s+\d+\.\d+", line):
+        return aps.LINE_SERVICE
+    lower_cleaned = line.lower()
+    if (
+        re.fullmatch(r"\d{5,}(\.\d+)?", line) or
+        re.fullmatch(r"[A-Z]{2,5}\d+(\.\d+)?", line) or
+        re.fullmatch(r"[A-Z]{2,5}\d+[\\/]\d+", line) or
+        re.fullmatch(r"\d{3}-\d{5}", line) or
+        lower_cleaned in {"no docket", "n/a", "na"} or
+        re.fullmatch(r"^t\d{5}[\\/]\d$", line.lower())
+    ):
+        return aps.LINE_NOISE
+    if lower_cleaned.startswith("sub total"):
+        return aps.LINE_SUBTOTAL
+    return aps.LINE_TEXT
+
+def legacy_clean_description(desc):
+    patterns = [
+        r"\b(EPD|TH|AGR|RYD)\w*[\\/]\d+\b",
+        r"\b(EPD|TH|AGR|RYD)\w*\d+(\.\d+)?\b",
+        r"\b\d{5,}(\.\d+)?\b",
+        r"\b\d{3}-\d{5}\b",
+        r"\bNO DOCKET\b",
+        r"\bN/A\b",
+        r"\bNA\b",
+        r"\bT\d{5}[\\/]\d\b",
+        r"\bD\d{5}[\\/]\d\b"
+    ]
+    cleaned_desc = desc
+    for pat in patterns:
+        cleaned_desc = re.sub(pat, "", cleaned_desc, flags=re.IGNORECASE)
+    cleaned_desc = re.sub(r"\s{2,}", " ", cleaned_desc).strip()
+    return cleaned_desc
+
+
+# --- Synthetic statement ---
+TOKENS = [
+    "EPD123/4", "th55.2", "AGR7", "RYD12\\3", "123456", "12345.67", "123-45678", "NO DOCKET",
+    "n/a", "NA", "na", "T12345/6", "d54321\\1", "Bin", "Exchange", "3m3", "Frontlift",
+    "General", "Waste", "-", "/", "  ", "Sub", "Total", "x", "@", "1.00", "tonne",
+]
+
+def synthetic_lines(n, seed=0):
+    rng = random.Random(seed)
+    fixed = [
+        "Powered by Wastedge", "Page: 3 of 9", "Tax Invoice 1234567", "Invoice Date: 01/07/24",
+        "ACC: 1234.01", "Sub Total 120.00", "123456", "EPD12/3", "T12345/6", "no docket",
+        "Services / Site: 4411 ACME PTY LTD 1 Main St NSW", "Period Charges",
+    ]
+    lines = []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.35:
+            desc = " ".join(rng.choice(TOKENS) for _ in range(rng.randint(2, 8)))
+            lines.append(f"{rng.randint(1, 28):02d}/07/24 {rng.randint(1, 99999)}.{rng.randint(0, 9)} "
+                         f"{desc} 1 {rng.randint(10, 300)}.00 {rng.randint(10, 300)}.00")
+        elif r < 0.6:
+            lines.append(rng.choice(fixed))
+        else:
+            lines.append(" ".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 6))))
+    return lines
+
+
+def rate(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    lines = synthetic_lines(n)
+    descriptions = [" ".join(l.split()[2:-3]) or l for l in lines]
+
+    for line in lines:
+        assert aps.classify_line(line.strip()) == legacy_classify_line(line), line
+    for desc in descriptions:
+        assert aps.clean_description(desc) == legacy_clean_description(desc), desc
+
+    print(f"{n:,} lines, outputs identical")
+    print(f"classify:    {rate(legacy_classify_line, lines):>12,.0f} -> "
+          f"{rate(lambda l: aps.classify_line(l.strip()), lines):>12,.0f} lines/sec")
+    print(f"description: {rate(legacy_clean_description, descriptions):>12,.0f} -> "
+          f"{rate(aps.clean_description, descriptions):>12,.0f} lines/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Reloading a multi-month dataset: .xlsx via openpyxl vs typed Parquet / Arrow.
+
+Writes ``n_months`` line-item tables of ``rows_per_month`` rows each as
+workbooks (``extractors.workbook``) and as Parquet and Arrow IPC files
+(``extractors.columnar``), then times loading all months back: every column
+from Excel, and every column or just three of them from the columnar files.
+
+    python benchmarks/bench_columnar_load.py [n_months] [rows_per_month]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from bench_excel_export import synthetic_table
+from extractors import columnar
+from extractors.workbook import write_workbook
+
+PRUNED_COLUMNS = ["Invoice Number", "Date", "Total"]
+
+
+def timed(label, load):
+    start = time.perf_counter()
+    df = load()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {elapsed * 1000:9.1f} ms  {len(df):,} rows x {len(df.columns)} columns")
+    return df
+
+
+def main():
+    n_months = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    rows_per_month = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"xlsx": [], "parquet": [], "arrow": []}
+        for month in range(n_months):
+            df = synthetic_table(rows_per_month, seed=month)
+            base = os.path.join(tmp, f"2024-{month + 1:02d}")
+            paths["xlsx"].append(write_workbook({"Line Items": df}, base + ".xlsx"))
+            for fmt, suffix in columnar.FORMATS.items():
+                paths[fmt].append(columnar.write_table(df, base + suffix, fmt))
+
+        print(f"{n_months} months x {rows_per_month:,} rows")
+        timed("xlsx (read_excel, openpyxl)",
+              lambda: pd.concat([pd.read_excel(p, sheet_name="Line Items") for p in paths["xlsx"]],
+                                ignore_index=True))
+        for fmt in columnar.FORMATS:
+            timed(f"{fmt}, all columns", lambda: columnar.read_tables(paths[fmt]))
+            typed = timed(f"{fmt}, {len(PRUNED_COLUMNS)} columns", lambda: columnar.read_tables(paths[fmt], PRUNED_COLUMNS))
+        print("  column types:", {col: str(dtype) for col, dtype in typed.dtypes.items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Site-name correction store: appends stay appends after compaction.
+
+Fills an ``extractors.corrections.CorrectionStore`` past ``compact_every``
+so it compacts once, then makes two more ``put_many`` calls (and reopens the
+store for a third) and checks each one only appended to the CSV: same file,
+size grown by just the new rows. Prints the time of a compaction and of an
+append at that store size.
+
+    python benchmarks/bench_corrections.py [n_rows] [compact_every]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from extractors.corrections import CorrectionStore
+
+
+def timed_put(store, corrections):
+    start = time.perf_counter()
+    store.put_many("h", corrections)
+    return time.perf_counter() - start
+
+
+def check_append_only(store, corrections):
+    before = os.stat(store.path)
+    elapsed = timed_put(store, corrections)
+    after = os.stat(store.path)
+    assert after.st_ino == before.st_ino, "put_many rewrote the file instead of appending"
+    assert after.st_size > before.st_size
+    return elapsed
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    compact_every = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "site_name_corrections.csv")
+        store = CorrectionStore(path, compact_every=compact_every)
+        # One large write past compact_every: this put_many compacts the store
+        store.put_many("h", {f"raw {i}": f"Site {i % 500}" for i in range(n_rows)})
+
+        first = check_append_only(store, {"new raw a": "Site 1"})
+        second = check_append_only(store, {"new raw b": "Site 2"})
+        reopened = check_append_only(CorrectionStore(path, compact_every=compact_every), {"new raw c": "Site 3"})
+
+        start = time.perf_counter()
+        store.compact()
+        compaction = time.perf_counter() - start
+        print(f"{n_rows:,} stored corrections, compact_every={compact_every:,}")
+        print(f"  put_many after compaction: {first * 1000:.2f} / {second * 1000:.2f} ms "
+              f"(reopened store {reopened * 1000:.2f} ms), append only")
+        print(f"  full compaction:           {compaction * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
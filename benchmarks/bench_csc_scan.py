@@ -0,0 +1,66 @@
+"""CSC single-pass scan scaling on synthetic invoices.
+
+Times ``extractors.csc.parse_page_texts`` at doubling page counts; the scan
+keeps one site block in flight, so the per-line cost should stay flat as the
+document grows.
+
+    python benchmarks/bench_csc_scan.py [max_pages]
+"""
+import random
+import sys
+import time
+
+from extractors import csc
+
+
+def synthetic_pages(n_pages, seed=0):
+    rng = random.Random(seed)
+    pages = []
+    invoice = 500000
+    for p in range(n_pages):
+        lines = []
+        if p % 10 == 0:
+            invoice += 1
+            lines += [
+                f"Tax Invoice {invoice}", "Account Number 4321.1", "Billing Period 01/02/24 to 29/02/24",
+                "Invoice Date 29/02/24", f"Total {rng.randint(1, 9)},{rng.randint(100, 999)}.50",
+            ]
+        for s in range(4):
+            lines += [
+                f"Services / Site: {2000 + s}.{p} Customer {s} - {s + 1} High St - Melbourne VIC 3000",
+                "Date Ref No Description Qty Price Total",
+            ]
+            for _ in range(8):
+                if rng.random() < 0.2:
+                    lines += [f"1{rng.randint(0, 9)}/02/24 {rng.randint(100, 999)}.5 Waste lift weird", "1.5 20.00 30.00"]
+                else:
+                    lines.append(f"1{rng.randint(0, 9)}/02/24 {rng.randint(100, 999)}.5 Bin lift general "
+                                 f"{rng.randint(1, 3)} 1,020.00 1,020.00 extra")
+            lines.append("Sub Total 100.00")
+        if p % 3 == 0:
+            lines += [
+                "Services / Site: 2999.1 Wasteflex Pty Ltd - Rental Co - 9 Low St", "Period Charges",
+                "Description Qty Price Total", "Bin rental 2 10.00 20.00", "",
+            ]
+        lines.append(f"Powered by wastedge.com Page: {p + 1}")
+        pages.append("\n".join(lines))
+    return pages
+
+
+def main():
+    max_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    n_pages = max(1, max_pages // 16)
+    while n_pages <= max_pages:
+        pages = synthetic_pages(n_pages)
+        total = sum(page.count("\n") + 1 for page in pages)
+        start = time.perf_counter()
+        scan = csc.parse_page_texts(pages)
+        elapsed = time.perf_counter() - start
+        print(f"{n_pages:>6,} pages {total:>9,} lines  {elapsed:7.3f}s  {elapsed / total * 1e6:6.2f} us/line  "
+              f"({len(scan['rows']):,} rows, {len(scan['period_charges']):,} period charges, "
+              f"{len(scan['headers']):,} headers)")
+        n_pages *= 2
+
+
+if __name__ == "__main__":
+    main()
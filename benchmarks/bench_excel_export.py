@@ -0,0 +1,79 @@
+"""Excel export: pandas + openpyxl / xlsxwriter vs the streaming workbook writer.
+
+Builds an ``n_rows`` line-item table and writes it to an in-memory .xlsx the
+way the apps used to (``pd.ExcelWriter`` with openpyxl or default-mode
+xlsxwriter) and with ``extractors.workbook.workbook_bytes``. Each run happens
+in a fresh child process; peak RSS is reported above the RSS after building
+the table, so it measures the writer alone.
+
+    python benchmarks/bench_excel_export.py [n_rows] [method ...]
+"""
+import io
+import multiprocessing
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("openpyxl", "xlsxwriter", "stream")
+
+
+def synthetic_table(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    invoices = np.array([str(900000 + i) for i in range(max(1, n_rows // 100))], dtype=object)
+    descriptions = np.array(["Bin lift general", "Disposal tonnes", "Rental 3m3 bin", "Site: Rental big bin monthly"],
+                            dtype=object)
+    return pd.DataFrame({
+        "Invoice Number": invoices[rng.integers(0, len(invoices), n_rows)],
+        "Date": "01/04/24",
+        "Ref No": rng.integers(100, 999, n_rows).astype(str).astype(object),
+        "Description": descriptions[rng.integers(0, len(descriptions), n_rows)],
+        "Qty": rng.integers(1, 20, n_rows).astype(float),
+        "Price": rng.integers(100, 10000, n_rows) / 100,
+        "Total": rng.integers(100, 100000, n_rows) / 100,
+        "Charge Type": "Booking",
+    })
+
+
+def _peak_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(method, n_rows, queue):
+    from extractors.workbook import workbook_bytes
+
+    df = synthetic_table(n_rows)
+    baseline = _peak_mib()
+    start = time.perf_counter()
+    if method == "stream":
+        size = len(workbook_bytes({"Line Items": df}))
+    else:
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine=method) as writer:
+            df.to_excel(writer, sheet_name="Line Items", index=False)
+        size = len(output.getvalue())
+    queue.put((time.perf_counter() - start, _peak_mib() - baseline, size))
+
+
+def measure(method, n_rows):
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_measure, args=(method, n_rows, queue))
+    child.start()
+    result = queue.get()
+    child.join()
+    return result
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    methods = sys.argv[2:] or METHODS
+    print(f"{n_rows:,} rows x 8 columns")
+    for method in methods:
+        elapsed, extra_mib, size = measure(method, n_rows)
+        print(f"  {method:<10}  {elapsed:7.1f}s  +{extra_mib:,.0f} MiB peak RSS  ({size / 2**20:,.1f} MiB file)")
+
+
+if __name__ == "__main__":
+    main()
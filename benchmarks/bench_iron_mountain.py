@@ -0,0 +1,61 @@
+"""Iron Mountain line-scan scaling on synthetic statements.
+
+Times ``extractors.iron_mountain.parse_page_texts`` at doubling line counts;
+with linear-time parsing the per-line cost stays flat as the statement grows.
+
+    python benchmarks/bench_iron_mountain.py [max_lines]
+"""
+import random
+import sys
+import time
+
+from extractors import iron_mountain
+
+LINES_PER_PAGE = 50
+
+
+def synthetic_pages(n_lines, seed=0):
+    rng = random.Random(seed)
+    pages = []
+    for p in range(max(1, n_lines // LINES_PER_PAGE)):
+        lines = []
+        if p % 20 == 0:
+            lines += ["Account ID: 12345", f"Invoice Number: INV{p:05d}"]
+        if p % 2 == 0:
+            lines += [
+                f"Level 2 Account: {p + 100} Level 2 Account Name: Acme & Co",
+                "Service Address: 1 Storage Rd Sydney",
+                "IM Order No.: ORD123",
+            ]
+        while len(lines) < LINES_PER_PAGE - 3:
+            r = rng.random()
+            if r < 0.35:
+                lines.append(f"SS: Box storage carton standard size {rng.randint(1, 999)} 01/02/2024 EA 0.50 10 5.00")
+            elif r < 0.5:
+                lines.append(f"SS: unparsed storage line {rng.randint(1, 9999)}")
+            elif r < 0.65:
+                lines.append(f"Transport {rng.randint(1, 99)} 02/02/2024 TRIP 15.00 1 15.00")
+            else:
+                lines.append("Description text carried over from the previous charge line with no amounts")
+        if p % 20 == 19:
+            lines += ["List of Charges", "SS: summary line", "SUBTOTAL: $1,234.50"]
+        pages.append("\n".join(lines))
+    return pages
+
+
+def main():
+    max_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_lines = max_lines // 8
+    while n_lines <= max_lines:
+        pages = synthetic_pages(n_lines)
+        total = sum(page.count("\n") + 1 for page in pages)
+        start = time.perf_counter()
+        df, unmatched_df, _, _ = iron_mountain.parse_page_texts(pages)
+        elapsed = time.perf_counter() - start
+        print(f"{total:>9,} lines  {elapsed:7.3f}s  {elapsed / total * 1e6:6.2f} us/line  "
+              f"{total / elapsed:>10,.0f} lines/sec  ({len(df):,} rows, {len(unmatched_df):,} unparsed)")
+        n_lines *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Opal line-dispatch throughput on a synthetic statement.
+
+Feeds generated page texts straight to ``extractors.opal.parse_page_texts`` so
+the number reflects line classification and row building, not pdfplumber.
+Runs once without learned patterns and once with ``n_learned`` of them; the
+two rates should stay close however many patterns are learned.
+
+    python benchmarks/bench_opal_lines.py [n_pages] [n_learned]
+"""
+import itertools
+import random
+import sys
+import time
+
+from extractors import opal
+
+PRICED_LINES = [
+    ["01.02.2024 Bin rental 01.02.2024 to 28.02.2024 1.00 EA 20.00 EA 20.00 2.00 22.00 AUD", "Billed Qty 1.00 EA"],
+    ["02.02.2024 General waste FFS - Qty/Weight ABC/1 2.00 EA 10.00 EA 20.00 2.00 22.00 AUD", "Billed Qty 2.00 EA"],
+    ["03.02.2024 Cardboard FFS - Qty/Weight AB-1 1.50 TO 2.00 TO 1.50 40.00 44.00 AUD"],
+    ["04.02.2024 Compactor FFS - Load LD-1 1.00 EA 100.00 10.00 110.00 AUD", "Billed Qty 1.00 EA"],
+    ["05.02.2024 Front lift 01.02.2024 to 28.02.2024 weekly svc 4.00 EA 5.00 EA 20.00 2.00 22.00 AUD"],
+    ["06.02.2024 Special Manual Price disposal fee", "1.20 TO 55.00", "66.00 6.60 72.60 AUD", "Billed Qty 1.20 TO"],
+    ["07.02.2024 Plastic roll FFS - Qty/Weight PR1 3.00 RL 2.00 6.00 0.60 6.60 AUD"],
+    ["08.02.2024 Unrecognised charge 1.00 2.00 AUD"],
+]
+HEADER_LINES = [
+    "Opal Packaging Australia", "Date Description Charge Type/Period Reference Qty. Unit Price",
+    "Amount excl. GST GST Amount Incl. GST", "", "Page 2 of 500", "Site address 1 Example Road",
+]
+
+
+def synthetic_pages(n_pages, seed=0):
+    rng = random.Random(seed)
+    pages = []
+    for p in range(n_pages):
+        lines = ["Invoice No. 98765432" if p == 0 else "Continued", f"R-{rng.randint(1000, 9999)}A Customer {p}"]
+        for _ in range(40):
+            if rng.random() < 0.4:
+                lines.extend(rng.choice(PRICED_LINES))
+            else:
+                lines.append(rng.choice(HEADER_LINES))
+        pages.append("\n".join(lines))
+    pages[-1] += "\nTotal Payable 1,000.00 100.00 1,100.00 AUD"
+    return pages
+
+
+def synthetic_learned_patterns(n):
+    """``n`` distinct token signatures, including one for the unrecognised charge line."""
+    patterns = {
+        opal.tokenize_line("08.02.2024 Unrecognised charge 1.00 2.00 AUD"): {
+            "regex": r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+([\d\.]+)\s+([\d,\.]+)\s+AUD",
+            "field_map": {"Date": 1, "Description": 2, "Qty.": 3, "Amount Incl. GST": 4},
+            "Charge Type": "Auto-Learned",
+        }
+    }
+    for tokens in itertools.product(("<NUM>", "<TXT>"), repeat=12):
+        if len(patterns) >= n:
+            break
+        patterns.setdefault(" ".join(tokens), {"regex": r"(.+)", "field_map": {"Description": 1}})
+    return patterns
+
+
+def run(pages, learned_patterns):
+    start = time.perf_counter()
+    _, data, missed_lines, _ = opal.parse_page_texts(pages, learned_patterns)
+    return time.perf_counter() - start, len(data), len(missed_lines)
+
+
+def main():
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    n_learned = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    pages = synthetic_pages(n_pages)
+    n_lines = sum(page.count("\n") + 1 for page in pages)
+
+    for learned_patterns in ({}, synthetic_learned_patterns(n_learned)):
+        elapsed, n_rows, n_missed = run(pages, learned_patterns)
+        print(f"{n_pages} pages, {n_lines:,} lines, {len(learned_patterns):,} learned patterns -> "
+              f"{n_rows:,} rows, {n_missed:,} unmatched, {n_lines / elapsed:,.0f} lines/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Applying changed Opal learned patterns: ``relearn`` vs scanning again.
+
+Scans ``n_pages`` synthetic page texts (``bench_opal_lines.synthetic_pages``)
+with no learned patterns, then steps through pattern changes: learn the
+unrecognised charge line, learn a catch-all for a header line signature,
+and delete the first pattern again. Each step is applied with
+``extractors.opal.relearn`` to the previous scan, timed against a full
+``scan_page_texts`` over the same texts, and checked for identical rows and
+unmatched lines. A real re-parse also re-extracts every page, so it is
+slower than the full scan timed here.
+
+    python benchmarks/bench_opal_relearn.py [n_pages]
+"""
+import sys
+import time
+
+from bench_opal_lines import synthetic_learned_patterns, synthetic_pages
+from extractors import opal
+
+HEADER_PATTERN = {
+    opal.tokenize_line("Site address 1 Example Road"): {
+        "regex": r"(.+)", "field_map": {"Description": 1}, "Charge Type": "Auto-Learned",
+    }
+}
+
+
+def timed(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    pages = synthetic_pages(n_pages)
+    unrecognised = synthetic_learned_patterns(1)
+    steps = [
+        ("learn unrecognised charge", unrecognised),
+        ("learn header catch-all", {**unrecognised, **HEADER_PATTERN}),
+        ("delete first pattern", HEADER_PATTERN),
+    ]
+
+    elapsed, scan = timed(opal.scan_page_texts, pages, {})
+    print(f"{n_pages} pages: initial scan {elapsed * 1000:.0f} ms, {len(scan['data']):,} rows, "
+          f"{len(scan['missed_lines']):,} unmatched")
+    for label, patterns in steps:
+        full_elapsed, full = timed(opal.scan_page_texts, pages, patterns)
+        relearn_elapsed, scan = timed(opal.relearn, scan, patterns)
+        assert scan["data"] == full["data"] and scan["missed_lines"] == full["missed_lines"], label
+        print(f"  {label:<26} relearn {relearn_elapsed * 1000:7.2f} ms  full scan {full_elapsed * 1000:7.0f} ms  "
+              f"-> {len(scan['data']):,} rows, {len(scan['missed_lines']):,} unmatched (identical)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Cold vs warm Remondis parse through the on-disk page-text cache.
+
+Writes an ``n_pages`` statement (``bench_remondis.synthetic_pages``) and
+parses it with the cache off, then twice against an empty temporary cache:
+the cold run extracts and stores every page, the warm run must read them all
+back without opening the PDF in any text backend.
+
+    python benchmarks/bench_page_cache.py [n_pages]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from bench_remondis import synthetic_pages, write_pdf
+from extractors import page_cache, pdf_text, remondis
+
+opened = []
+
+
+def counting(backend_class):
+    def open_backend(source):
+        opened.append(backend_class.__name__)
+        return backend_class(source)
+    return open_backend
+
+
+def timed_parse(label, path):
+    opened.clear()
+    start = time.perf_counter()
+    _, lines_df, _, _, _, _ = remondis.extract_invoice_data(path)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<12} {elapsed:7.2f}s  {len(lines_df):,} line items, backend opened {len(opened)}x")
+    return elapsed, lines_df.to_csv(index=False)
+
+
+def main():
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    pdf_text.BACKENDS = {name: counting(cls) for name, cls in pdf_text.BACKENDS.items()}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "remondis.pdf")
+        write_pdf(path, synthetic_pages(n_pages))
+        print(f"{n_pages:,} pages")
+
+        os.environ["INVOICE_PAGE_CACHE"] = "off"
+        _, uncached = timed_parse("cache off", path)
+        os.environ["INVOICE_PAGE_CACHE"] = os.path.join(tmp, "pages.sqlite")
+        cold, cold_csv = timed_parse("cold cache", path)
+        warm, warm_csv = timed_parse("warm cache", path)
+
+        assert cold_csv == warm_csv == uncached, "cached parse differs from the uncached one"
+        assert not opened, "warm parse opened the PDF"
+        cache = page_cache.get_cache()
+        on_disk = sum(os.path.getsize(p) for p in (cache.path, cache.path + "-wal") if os.path.exists(p))
+        print(f"  warm {cold / warm:.1f}x faster than cold, identical output; "
+              f"cache holds {cache.size() / 2**20:.2f} MiB of compressed text "
+              f"({on_disk / 2**20:.2f} MiB on disk, WAL included)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Remondis wall time and peak RSS on a synthetic multi-invoice statement.
+
+Writes an ``n_pages`` PDF with PyMuPDF (a new Tax Invoice every third page)
+and runs ``extractors.remondis.extract_invoice_data`` on it in a fresh child
+process, so the reported peak RSS belongs to the parse alone. With
+``workers`` > 1 the invoice chunks are extracted and parsed in a process pool
+and the result is checked against the sequential run.
+
+    python benchmarks/bench_remondis.py [n_pages] [workers]
+"""
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+
+def synthetic_pages(n_pages, seed=0):
+    rng = random.Random(seed)
+    pages = []
+    invoice = 900000
+    for p in range(n_pages):
+        lines = []
+        if p % 3 == 0:
+            invoice += 1
+            lines += [
+                "REMONDIS AUSTRALIA PTY LTD", f"Tax Invoice {invoice}", "ACME WIDGETS PTY LTD",
+                "Account Number 777.1", "Billing Period 01/04/24 to 30/04/24", "Invoice Date 30/04/24",
+                f"Total ${rng.randint(100, 999)}.{rng.randint(10, 99)}", f"Services / Site: S{p}.1",
+            ]
+        for _ in range(30):
+            kind = rng.randint(0, 3)
+            if kind == 0:
+                lines.append(f"0{rng.randint(1, 9)}/04/24 {rng.randint(100, 999)}.1 Bin lift general 12 "
+                             f"${rng.randint(1, 99)}.00 ${rng.randint(1, 99)}.00")
+            elif kind == 1:
+                lines.append(f"0{rng.randint(1, 9)}/04/24 {rng.randint(100, 999)}.2 Disposal tonnes 1.5 TO 2 $30.00 $60.00")
+            elif kind == 2:
+                lines.append("Site: Rental 3m3 bin 2 $10.00 $20.00")
+            else:
+                lines += ["Site: Rental big bin", "monthly", "1 x 2 $15.00 $30.00 extra words"]
+        lines += [f"Tax Invoice: {invoice} Invoice Date: 30/04/24 Acc: 777.1 ACME WIDGETS PTY LTD", f"Page: {p + 1}"]
+        pages.append(lines)
+    return pages
+
+
+def write_pdf(path, pages):
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page(height=40 + 11 * len(lines))
+        page.insert_text((20, 20), "\n".join(lines), fontsize=8)
+    doc.save(path)
+
+
+def _measure(path, workers, queue):
+    from extractors import remondis
+
+    start = time.perf_counter()
+    headers_df, lines_df, _, _, _, _ = remondis.extract_invoice_data(path, workers=workers)
+    elapsed = time.perf_counter() - start
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((elapsed, peak_mib, len(headers_df), len(lines_df), lines_df.to_csv(index=False)))
+
+
+def measure(path, workers=1):
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_measure, args=(path, workers, queue))
+    child.start()
+    result = queue.get()
+    child.join()
+    return result
+
+
+def main():
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "remondis.pdf")
+        write_pdf(path, synthetic_pages(n_pages))
+        elapsed, peak_mib, n_invoices, n_lines, lines_csv = measure(path)
+        print(f"{n_pages:,} pages, {n_invoices:,} invoices, {n_lines:,} line items: "
+              f"{elapsed:.2f}s, peak RSS {peak_mib:,.0f} MiB")
+        if workers > 1:
+            par_elapsed, par_peak, _, _, par_csv = measure(path, workers)
+            assert par_csv == lines_csv, "parallel line items differ from the sequential run"
+            print(f"  {workers} worker(s): {par_elapsed:.2f}s ({elapsed / par_elapsed:.2f}x, identical line items), "
+                  f"parent peak RSS {par_peak:,.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
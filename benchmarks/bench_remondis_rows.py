@@ -0,0 +1,37 @@
+"""Remondis row storage and frame building without the PDF.
+
+Feeds the synthetic statement pages from ``bench_remondis`` straight into
+``parse_invoice_chunk`` and ``merge_chunk_results`` and builds the output
+frames as ``extract_invoice_data`` does, reporting time and the tracemalloc
+peak of the row storage plus the Line Items and Bookings frames.
+
+    python benchmarks/bench_remondis_rows.py [n_pages]
+"""
+import sys
+import time
+import tracemalloc
+
+from bench_remondis import synthetic_pages
+from extractors import remondis
+
+
+def main():
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    page_texts = ["\n".join(lines) for lines in synthetic_pages(n_pages)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunk_results = [remondis.parse_invoice_chunk(page_texts[a:b])
+                     for a, b in remondis.split_invoice_chunks(page_texts)]
+    headers, items, row_headers = remondis.merge_chunk_results(chunk_results)
+    items_df, _ = remondis.normalize_amounts(remondis.item_table(items, row_headers), ("Qty", "Price", "Total"))
+    lines_df, bookings_df = remondis.item_views(items_df)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{n_pages:,} pages, {len(headers):,} invoices, {len(lines_df):,} rows: "
+          f"{elapsed:.2f}s, traced peak {peak / 2**20:,.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
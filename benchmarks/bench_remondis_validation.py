@@ -0,0 +1,73 @@
+"""Remondis GST validation on synthetic header and booking frames.
+
+Builds ``n_invoices`` headers and ``n_bookings`` bookings spread over them and
+times ``extractors.remondis.validate_invoices``. With ``--loop`` it also runs
+the previous per-invoice ``iterrows`` filter and checks both agree (slow: the
+loop scans every booking once per invoice).
+
+    python benchmarks/bench_remondis_validation.py [n_invoices] [n_bookings] [--loop]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from extractors import remondis
+
+
+def synthetic_frames(n_invoices, n_bookings, seed=0):
+    rng = np.random.default_rng(seed)
+    invoices = np.array([str(900000 + i) for i in range(n_invoices)], dtype=object)
+    bookings_df = pd.DataFrame({
+        "Invoice Number": invoices[rng.integers(0, n_invoices, n_bookings)],
+        "Total": rng.integers(100, 10000, n_bookings) / 100,
+    })
+    sums = bookings_df.groupby("Invoice Number")["Total"].sum().reindex(invoices, fill_value=0)
+    expected = np.round(sums.to_numpy() * 1.1, 2)
+    expected[rng.random(n_invoices) < 0.05] += 1.0
+    expected[rng.random(n_invoices) < 0.02] = np.nan
+    headers_df = pd.DataFrame({"Tax Invoice": invoices, "Total Amount": expected})
+    return headers_df, bookings_df
+
+
+def loop_validation(headers_df, bookings_df):
+    results = []
+    for _, header_row in headers_df.iterrows():
+        invoice_no = header_row.get("Tax Invoice")
+        expected_total = header_row.get("Total Amount", 0)
+        invoice_bookings = bookings_df[bookings_df["Invoice Number"] == invoice_no]
+        sum_total = invoice_bookings["Total"].sum() if not invoice_bookings.empty else 0
+        sum_with_gst = sum_total * 1.1
+        results.append({
+            "Invoice Number": invoice_no,
+            "Expected Total": expected_total,
+            "Sum of Bookings": sum_total,
+            "Sum with GST (10%)": sum_with_gst,
+            "Valid": pd.isna(expected_total) or abs(sum_with_gst - expected_total) < 0.01,
+        })
+    return pd.DataFrame(results)
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n_invoices = int(args[0]) if args else 5000
+    n_bookings = int(args[1]) if len(args) > 1 else 500_000
+    headers_df, bookings_df = synthetic_frames(n_invoices, n_bookings)
+
+    start = time.perf_counter()
+    validation_df = remondis.validate_invoices(headers_df, bookings_df)
+    elapsed = time.perf_counter() - start
+    print(f"{n_invoices:,} invoices, {n_bookings:,} bookings: groupby {elapsed:.3f}s, "
+          f"{int((~validation_df['Valid']).sum()):,} invalid")
+
+    if "--loop" in sys.argv:
+        start = time.perf_counter()
+        loop_df = loop_validation(headers_df, bookings_df)
+        loop_elapsed = time.perf_counter() - start
+        pd.testing.assert_frame_equal(validation_df, loop_df, check_exact=False)
+        print(f"  iterrows loop {loop_elapsed:.3f}s ({loop_elapsed / elapsed:,.0f}x slower, same result)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Streamlit rerun cost for an already-parsed upload, with the result cache.
+
+Writes an ``n_pages`` Opal statement (``bench_opal_lines.synthetic_pages``)
+and repeats what ``Opal_Automated_testing.py`` does on every rerun: load the
+learned patterns and ask ``extractors.result_cache`` for the parse and
+export files. The first run parses (page-text cache off) and every later
+rerun should be a lookup. Changing the learned patterns re-matches the
+affected lines of the cached scan (``opal.relearn``) and rebuilds the exports.
+
+    python benchmarks/bench_result_cache.py [n_pages] [reruns]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from bench_opal_lines import synthetic_learned_patterns, synthetic_pages
+from extractors import columnar, opal, result_cache
+from extractors.workbook import workbook_bytes
+
+
+def write_pdf(pages):
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page(height=40 + 9 * (text.count("\n") + 1))
+        page.insert_text((20, 20), text, fontsize=6)
+    return doc.tobytes()
+
+
+def rerun(pdf_bytes):
+    """The app's per-rerun lookup; returns (seconds, number of extracted lines)."""
+    start = time.perf_counter()
+    learned_patterns = opal.load_learned_patterns()
+
+    def scan():
+        return opal.scan_pdf(io.BytesIO(pdf_bytes), learned_patterns)
+
+    def extract():
+        scanned = opal.relearn(result_cache.cached_result(opal, pdf_bytes, scan), learned_patterns)
+        result = opal.parse_result(scanned["invoice_no"], scanned["data"], scanned["missed_lines"], scanned["totals"])
+        return result["data"], workbook_bytes(result["tables"]), columnar.zip_bytes(result["tables"])
+
+    data, _, _ = result_cache.cached_result(opal, pdf_bytes, extract, opal.learned_patterns_version(learned_patterns))
+    return time.perf_counter() - start, len(data)
+
+
+def main():
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    reruns = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    os.environ["INVOICE_PAGE_CACHE"] = "off"
+    pdf_bytes = write_pdf(synthetic_pages(n_pages))
+    with tempfile.TemporaryDirectory() as tmp:
+        opal.LEARNED_PATTERNS_FILE = os.path.join(tmp, "learned_patterns.json")
+        print(f"{n_pages} pages ({len(pdf_bytes) / 2**20:.1f} MiB)")
+
+        first, n_lines = rerun(pdf_bytes)
+        print(f"  first run (parse + exports)   {first * 1000:9.1f} ms  {n_lines:,} lines")
+        times = sorted(rerun(pdf_bytes)[0] for _ in range(reruns))
+        print(f"  widget rerun, median of {reruns:<4} {times[len(times) // 2] * 1000:9.1f} ms  "
+              f"(max {times[-1] * 1000:.1f} ms)")
+
+        opal.save_learned_patterns(synthetic_learned_patterns(1))
+        relearned, n_lines = rerun(pdf_bytes)
+        print(f"  after learning a pattern      {relearned * 1000:9.1f} ms  {n_lines:,} lines")
+        cache = result_cache.shared_cache()
+        print(f"  cache: {len(cache)} entries (scan + one result per pattern set), ~{cache.size / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
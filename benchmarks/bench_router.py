@@ -0,0 +1,75 @@
+"""Vendor detection time per file, independent of statement length.
+
+Writes an ``n_pages`` PDF per vendor with PyMuPDF (page one carries the
+vendor's usual first-page text) and times ``extractors.router.detect_vendor``
+on its bytes, checking the detected vendor and that no vendor module was
+imported along the way.
+
+    python benchmarks/bench_router.py [n_pages]
+"""
+import sys
+import time
+
+import fitz  # PyMuPDF
+
+from extractors import VENDORS, router
+
+FIRST_PAGES = {
+    "aps": [
+        "Tax Invoice 700001", "Account Number 1234.5", "Invoice Date 31/01/24", "Total (Excl.GST): 2,141.00",
+        "Services / Site: 1000.00 Charlie Cafe Pty - 63 Main St Sydney NSW",
+        "05/01/24 588.55 Bin Exchange EPD697 1 100.00 100.00", "Powered by wastedge.com Page: 1",
+    ],
+    "opal": [
+        "Opal Packaging", "Invoice No. 98765432", "R-7311A Customer 0",
+        "07.02.2024 Plastic roll FFS - Qty/Weight PR1 3.00 RL 2.00 6.00 0.60 6.60 AUD",
+    ],
+    "csc": [
+        "Tax Invoice 500001", "Account Number 4321.1", "Invoice Date 29/02/24", "Total 7,876.50",
+        "Services / Site: 2000.0 Customer 0 - 1 High St - Melbourne VIC 3000",
+        "10/02/24 365.5 Bin lift general 3 1,020.00 1,020.00 extra", "Powered by wastedge.com Page: 1",
+    ],
+    "ironmountain": [
+        "Account ID: 12345", "Invoice Number: INV0000", "Level 2 Account: 100 Level 2 Account Name: Acme & Co",
+        "SS: Box storage 2 01/02/2024 EA 0.50 10 5.00",
+    ],
+    "veolia": [
+        "Tax Invoice 800000", "Invoice Date 01/03/2024", "Total Inc GST $964.00", "Site Co 0", "1 Road St",
+        "Date Reference Service Provided Quantity Amount", "03/03/2024 CASE-365 Bin lift 2 $40.00",
+    ],
+    "remondis": [
+        "REMONDIS AUSTRALIA PTY LTD", "Tax Invoice 900001", "ACME WIDGETS PTY LTD", "Total $964.59",
+        "Services / Site: S0.1", "05/04/24 623.1 Bin lift general 12 $63.00 $52.00",
+        "Tax Invoice: 900001 Invoice Date: 30/04/24 Acc: 777.1 ACME WIDGETS PTY LTD",
+    ],
+}
+
+
+def synthetic_pdf(first_page, n_pages):
+    doc = fitz.open()
+    filler = "\n".join(f"01/01/24 {i}.1 Line item text {i} 1 $10.00 $10.00" for i in range(60))
+    for p in range(n_pages):
+        page = doc.new_page()
+        page.insert_text((20, 20), "\n".join(first_page) if p == 0 else filler, fontsize=7)
+    return doc.tobytes()
+
+
+def main():
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    pdfs = {vendor: synthetic_pdf(lines, n_pages) for vendor, lines in FIRST_PAGES.items()}
+    router.detect_vendor(pdfs["aps"])  # warm-up: first fitz call loads fonts
+
+    print(f"{n_pages} pages per PDF")
+    for vendor, pdf in pdfs.items():
+        start = time.perf_counter()
+        detected = router.detect_vendor(pdf)
+        elapsed = time.perf_counter() - start
+        assert detected == vendor, (vendor, detected)
+        print(f"  {vendor:<13} {elapsed * 1000:6.2f} ms  ({len(pdf) / 2**20:.1f} MiB)")
+    imported = [name for name in VENDORS.values() if name in sys.modules]
+    assert not imported, f"vendor modules imported during detection: {imported}"
+    print("  no vendor module imported")
+
+
+if __name__ == "__main__":
+    main()
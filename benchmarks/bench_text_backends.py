@@ -0,0 +1,90 @@
+"""pdfplumber vs PyMuPDF parity and speed per vendor on a sample corpus.
+
+Parses every PDF once with each text backend (by overriding
+``extractors.pdf_text.VENDOR_BACKENDS`` for the run) and reports, per vendor,
+how many pages extract to different text, how many parsed table rows differ
+between the two backends, and the parse time of each. A vendor whose row
+difference is 0 across a representative corpus can move to "pymupdf".
+
+    python benchmarks/bench_text_backends.py PDF_OR_DIR [...] [--vendor V] [--master-sites CSV]
+
+Without ``--vendor`` each file's vendor is detected from its first page.
+"""
+import argparse
+import io
+import time
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from extractors import load_vendor, pdf_text
+from extractors.cli import expand_inputs
+from extractors.router import detect_vendor
+
+
+def table_rows(tables):
+    """Every row of every table as a hashable (table, values...) tuple."""
+    rows = Counter()
+    for name, df in tables.items():
+        for values in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+            rows[(name, *values)] += 1
+    return rows
+
+
+def differing_pages(pdf_bytes):
+    with pdf_text.open_pdf(pdf_bytes, "pdfplumber") as plumber, pdf_text.open_pdf(pdf_bytes, "pymupdf") as mupdf:
+        return sum(1 for i in range(len(plumber)) if plumber.page_text(i).split() != mupdf.page_text(i).split())
+
+
+def parse_with(vendor, backend, pdf_bytes, kwargs):
+    configured = pdf_text.VENDOR_BACKENDS[vendor]
+    pdf_text.VENDOR_BACKENDS[vendor] = backend
+    try:
+        start = time.perf_counter()
+        result = load_vendor(vendor).parse(io.BytesIO(pdf_bytes), **kwargs)
+        return time.perf_counter() - start, table_rows(result["tables"])
+    finally:
+        pdf_text.VENDOR_BACKENDS[vendor] = configured
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+")
+    parser.add_argument("--vendor")
+    parser.add_argument("--master-sites", help="master sites CSV with a 'standard_name' column (for aps files)")
+    args = parser.parse_args()
+
+    vendor_kwargs = {}
+    if args.master_sites:
+        names = pd.read_csv(args.master_sites)["standard_name"].dropna().tolist()
+        vendor_kwargs["aps"] = {"master_site_names": names}
+
+    stats = defaultdict(Counter)
+    for path in expand_inputs(args.inputs):
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        vendor = args.vendor or detect_vendor(pdf_bytes)
+        if vendor is None or (vendor == "aps" and "aps" not in vendor_kwargs):
+            print(f"skipped {path} ({'unrecognised' if vendor is None else 'aps needs --master-sites'})")
+            continue
+        kwargs = vendor_kwargs.get(vendor, {})
+        plumber_time, plumber_rows = parse_with(vendor, "pdfplumber", pdf_bytes, kwargs)
+        mupdf_time, mupdf_rows = parse_with(vendor, "pymupdf", pdf_bytes, kwargs)
+        s = stats[vendor]
+        s["files"] += 1
+        s["pages differing"] += differing_pages(pdf_bytes)
+        s["rows"] += sum(plumber_rows.values())
+        s["rows differing"] += sum(((plumber_rows - mupdf_rows) + (mupdf_rows - plumber_rows)).values())
+        s["pdfplumber ms"] += plumber_time * 1000
+        s["pymupdf ms"] += mupdf_time * 1000
+
+    print(f"{'vendor':<13}{'configured':>11}{'files':>7}{'pages diff':>11}{'rows':>8}{'rows diff':>10}"
+          f"{'pdfplumber':>12}{'pymupdf':>10}{'speedup':>9}")
+    for vendor, s in stats.items():
+        print(f"{vendor:<13}{pdf_text.VENDOR_BACKENDS[vendor]:>11}{s['files']:>7}{s['pages differing']:>11}"
+              f"{s['rows']:>8}{s['rows differing']:>10}{s['pdfplumber ms'] / 1000:>11.2f}s{s['pymupdf ms'] / 1000:>9.2f}s"
+              f"{s['pdfplumber ms'] / max(s['pymupdf ms'], 1e-9):>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Veolia per-block cost on increasingly dense pages.
+
+Times ``extractors.veolia.parse_invoice`` on one page holding a doubling number
+of ``Date ... Service Provided`` site blocks; the site address lookup uses the
+page's line index, so the cost per block should stay flat as pages get denser.
+
+    python benchmarks/bench_veolia_blocks.py [max_sites]
+"""
+import random
+import sys
+import time
+
+from extractors import veolia
+
+
+def synthetic_page(n_sites, seed=0):
+    rng = random.Random(seed)
+    lines = [
+        "Tax Invoice 800001", "Invoice Date 01/03/2024", "Account Number 55555", "Purchase Order PO1",
+        "Total Inc GST $1,234.00", "Payment due by 30/03/2024",
+    ]
+    for s in range(n_sites):
+        lines += [f"Site Co {s}", f"{s + 1} Road St", f"Sydney NSW 2{s % 1000:03d}",
+                  "Date Reference Service Provided Quantity Amount"]
+        for k in range(4):
+            if rng.random() < 0.5:
+                lines.append(f"0{k + 1}/03/2024 CASE-{rng.randint(100, 999)} Bin lift 2 $40.00")
+            else:
+                lines += [f"0{k + 1}/03/2024 AB12345 Service fee 1", "$5.00"]
+        lines.append("Site Total $100.00")
+    return "\n".join(lines)
+
+
+def main():
+    max_sites = int(sys.argv[1]) if len(sys.argv) > 1 else 1600
+    n_sites = max(1, max_sites // 32)
+    while n_sites <= max_sites:
+        page = synthetic_page(n_sites)
+        start = time.perf_counter()
+        records, _ = veolia.parse_invoice(page)
+        elapsed = time.perf_counter() - start
+        print(f"{n_sites:>6,} sites/page  {elapsed:7.3f}s  {elapsed / n_sites * 1e6:8.1f} us/block  "
+              f"({len(records):,} records)")
+        n_sites *= 2
+
+
+if __name__ == "__main__":
+    main()
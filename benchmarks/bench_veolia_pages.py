@@ -0,0 +1,61 @@
+"""Sequential vs page-parallel Veolia parsing on a synthetic statement PDF.
+
+Builds an ``n_pages`` PDF with PyMuPDF (headers only on every third page, so
+the later pages rely on carried header fields), parses it with
+``veolia.parse(pdf, workers=1)`` and with ``workers``, checks the line items
+are identical and reports the speedup.
+
+    python benchmarks/bench_veolia_pages.py [n_pages] [workers]
+"""
+import os
+import random
+import sys
+import time
+
+import fitz  # PyMuPDF
+import pandas as pd
+
+from extractors import veolia
+
+
+def synthetic_pdf(n_pages, sites_per_page=12, seed=0):
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for p in range(n_pages):
+        lines = []
+        if p % 3 == 0:
+            lines += [f"Tax Invoice {800000 + p}", "Invoice Date 01/03/2024", "Account Number 55555",
+                      "Purchase Order PO1", f"Total Inc GST ${rng.randint(100, 999)}.00", "Payment due by 30/03/2024"]
+        for s in range(sites_per_page):
+            lines += [f"Site Co {s}", f"{s + 1} Road St", f"Sydney NSW 20{s % 10}0",
+                      "Date Reference Service Provided Quantity Amount"]
+            for k in range(3):
+                lines.append(f"0{k + 1}/03/2024 CASE-{rng.randint(100, 999)} Bin lift 2 $40.00")
+            lines.append("Site Total $100.00")
+        page = doc.new_page(height=20 + 11 * len(lines))
+        page.insert_text((20, 20), "\n".join(lines), fontsize=8)
+    return doc.tobytes()
+
+
+def timed_parse(pdf_bytes, workers):
+    start = time.perf_counter()
+    df = veolia.parse(pdf_bytes, workers=workers)["df"]
+    return time.perf_counter() - start, df
+
+
+def main():
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    pdf_bytes = synthetic_pdf(n_pages)
+
+    sequential, df_seq = timed_parse(pdf_bytes, 1)
+    parallel, df_par = timed_parse(pdf_bytes, workers)
+    pd.testing.assert_frame_equal(df_seq, df_par)
+
+    print(f"{n_pages} pages, {len(df_seq):,} line items")
+    print(f"  sequential          {sequential:7.3f}s")
+    print(f"  {workers:>2} worker(s)        {parallel:7.3f}s  ({sequential / parallel:.2f}x, identical output)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Headless invoice parsing core shared by the Streamlit apps.
+
+Each vendor module exposes ``parse(pdf, ...) -> dict`` with no Streamlit
+dependency. Every result carries a ``tables`` mapping (sheet name ->
+DataFrame, as exported by the app) and a ``reconciliation`` dict whose
+``status`` is ``"MATCH"``, ``"MISMATCH"`` or ``"UNKNOWN"``.
+"""
+import importlib
+
+VENDORS = {
+    "aps": "extractors.aps",
+    "opal": "extractors.opal",
+    "csc": "extractors.csc",
+    "ironmountain": "extractors.iron_mountain",
+    "veolia": "extractors.veolia",
+    "remondis": "extractors.remondis",
+}
+
+
+def load_vendor(vendor):
+    """Import a vendor module on demand so unused parsers cost nothing."""
+    try:
+        module_name = VENDORS[vendor]
+    except KeyError:
+        raise ValueError(f"Unknown vendor '{vendor}'. Choose from: {', '.join(VENDORS)}")
+    return importlib.import_module(module_name)
@@ -0,0 +1,608 @@
+"""APS (Wastedge) statement parser."""
+import re
+import logging
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from rapidfuzz import process, fuzz
+
+from extractors.corrections import CorrectionStore, master_list_hash
+from extractors.numeric import concat_rejects, normalize_amounts
+from extractors.pdf_text import PageTexts, open_vendor_pdf
+
+logger = logging.getLogger(__name__)
+
+# --- Site name corrections cache ---
+site_name_corrections = CorrectionStore("site_name_corrections.csv")
+
+def _sorted_token_length(name):
+    """Length of ``name`` after token_sort_ratio's sort-and-join preprocessing."""
+    tokens = name.split()
+    return sum(len(t) for t in tokens) + max(len(tokens) - 1, 0)
+
+class SiteNameMatcher:
+    """Master site names preprocessed once for batched token_sort_ratio matching.
+
+    Choices are blocked on the length of their token-sorted form. ratio() can
+    only reach ``threshold`` when the shorter string is at least
+    threshold / (200 - threshold) of the longer one, so choices outside that
+    window are never scored and results equal a full ``extractOne`` scan.
+    """
+
+    def __init__(self, master_site_names, threshold=80, max_cells=4_000_000):
+        self.choices = list(master_site_names)
+        self.threshold = threshold
+        self.master_hash = master_list_hash(self.choices, threshold)
+        self.max_cells = max_cells
+        lengths = np.array([_sorted_token_length(c) for c in self.choices], dtype=np.int64)
+        self._order = np.argsort(lengths, kind="stable")
+        self._sorted_lengths = lengths[self._order]
+
+    def _window_bounds(self, min_len, max_len):
+        t = self.threshold
+        lo = min_len * t / (200 - t)
+        hi = max_len * (200 - t) / t if t > 0 else np.inf
+        start = np.searchsorted(self._sorted_lengths, lo, side="left")
+        stop = np.searchsorted(self._sorted_lengths, hi, side="right")
+        return start, stop
+
+    def _score_group(self, queries, start, stop, results):
+        # Candidates in master-list order so argmax breaks ties like extractOne.
+        window = np.sort(self._order[start:stop])
+        if window.size == 0:
+            return
+        scores = process.cdist(
+            queries, [self.choices[i] for i in window],
+            scorer=fuzz.token_sort_ratio, score_cutoff=self.threshold,
+            dtype=np.float64, workers=-1,
+        )
+        best = scores.argmax(axis=1)
+        for query, row, col in zip(queries, scores, best):
+            if row[col] >= self.threshold:
+                results[query] = self.choices[window[col]]
+
+    def match_many(self, raw_names):
+        """Return {raw_name: best master name} for every name scoring >= threshold.
+
+        Distinct names are sorted by length and scored with as few cdist calls
+        as ``max_cells`` (the score-matrix size cap) allows.
+        """
+        queries = sorted(set(raw_names), key=_sorted_token_length)
+        results = {}
+        group, group_min, group_max = [], 0, 0
+        for query in queries:
+            length = _sorted_token_length(query)
+            if group:
+                start, stop = self._window_bounds(group_min, length)
+                if (len(group) + 1) * (stop - start) > self.max_cells:
+                    self._score_group(group, *self._window_bounds(group_min, group_max), results)
+                    group = []
+            if not group:
+                group_min = length
+            group.append(query)
+            group_max = length
+        if group:
+            self._score_group(group, *self._window_bounds(group_min, group_max), results)
+        return results
+
+@lru_cache(maxsize=4)
+def _cached_site_matcher(master_site_names, threshold):
+    return SiteNameMatcher(master_site_names, threshold)
+
+def get_site_matcher(master_site_names, threshold=80):
+    """Reuse one matcher per master list instead of re-preprocessing it per call."""
+    if isinstance(master_site_names, SiteNameMatcher):
+        return master_site_names
+    return _cached_site_matcher(tuple(master_site_names), threshold)
+
+def match_site_names(raw_names, master_site_names, threshold=80):
+    """Resolve many raw customer names at once; unmatched names map to themselves."""
+    matcher = get_site_matcher(master_site_names, threshold)
+    resolved, pending = {}, []
+    for name in dict.fromkeys(raw_names):
+        corrected = site_name_corrections.get(matcher.master_hash, name)
+        if corrected is None:
+            pending.append(name)
+        else:
+            resolved[name] = corrected
+    if pending:
+        matches = matcher.match_many(pending)
+        site_name_corrections.put_many(matcher.master_hash, matches)
+        resolved.update(matches)
+    return {name: resolved.get(name, name) for name in raw_names}
+
+def fuzzy_match_site_name(raw_name, master_site_names, threshold=80):
+    return match_site_names([raw_name], master_site_names, threshold)[raw_name]
+
+def normalize_state(raw_state):
+    state_map = {
+        "new south wales": "NSW", "victoria": "VIC", "queensland": "QLD",
+        "south australia": "SA", "western australia": "WA", "tasmania": "TAS",
+        "northern territory": "NT", "australian capital territory": "ACT",
+        "nsw": "NSW", "vic": "VIC", "qld": "QLD", "sa": "SA", "wa": "WA",
+        "tas": "TAS", "nt": "NT", "act": "ACT"
+    }
+    rs = raw_state.strip().lower()
+    return state_map.get(rs, raw_state.upper())
+
+def extract_invoice_metadata(text):
+    def safe_search(pattern, txt, default=""):
+        m = re.search(pattern, txt, re.IGNORECASE)
+        return m.group(1).strip() if m else default
+    return {
+        "Tax Invoice": safe_search(r"Tax Invoice\s*(\d+)", text),
+        "Account Number": safe_search(r"Account Number\s*([\d.]+)", text),
+        "Billing Period": safe_search(r"Billing Period\s*([^\n]+)", text),
+        "Invoice Date": safe_search(r"Invoice Date\s*([^\n]+)", text),
+        "Total": safe_search(r"Total\s*([\d.,]+)", text)
+    }
+
+def extract_invoice_totals_excl_gst(text):
+    matches = re.findall(r"Total\s*\(Excl\.?GST\)\s*[: ]\s*([\d,]+\.\d{2})", text, re.IGNORECASE)
+    totals = [float(m.replace(",", "")) for m in matches]
+    return sum(totals), totals
+
+def split_site_line(line):
+    """Split a ``Services / Site:`` line into (site_code, customer_raw, address), or None."""
+    raw = line.replace("Services / Site:", "").strip()
+    m = re.match(r"^(\S+)\s+(.*)$", raw)
+    if not m:
+        return None
+
+    site_code = m.group(1)
+    rest = m.group(2)
+
+    dash_split = rest.split(" - ", 1)
+    if len(dash_split) == 2:
+        customer_raw, address = dash_split[0].strip(), dash_split[1].strip()
+    else:
+        parts = rest.split()
+        if len(parts) >= 3:
+            customer_raw = " ".join(parts[:2])
+            address = " ".join(parts[2:])
+        else:
+            customer_raw = parts[0]
+            address = " ".join(parts[1:]) if len(parts) > 1 else ""
+    return site_code, customer_raw, address
+
+def parse_site_line(line, master_site_names, resolved_names=None):
+    split = split_site_line(line)
+    if split is None:
+        logger.warning("Could not extract site_code from: %s", line)
+        return {}
+
+    site_code, customer_raw, address = split
+    if resolved_names is not None and customer_raw in resolved_names:
+        customer = resolved_names[customer_raw]
+    else:
+        customer = fuzzy_match_site_name(customer_raw, master_site_names)
+
+    return {
+        "site_code": site_code,
+        "customer": customer,
+        "address": address
+    }
+
+def safe_float(val):
+    try:
+        return float(str(val).replace(',', '').strip())
+    except:
+        return 0.0
+
+# Description noise, removed in a single left-to-right pass. The old per-pattern
+# loop also listed \b\d{3}-\d{5}\b, but it could never fire there: the 5-digit
+# tail was always stripped first by \b\d{5,}\b. It is left out here so the
+# alternation keeps producing the same output.
+DESCRIPTION_NOISE_RE = re.compile(
+    r"\b(?:EPD|TH|AGR|RYD)\w*[\\/]\d+\b"
+    r"|\b(?:EPD|TH|AGR|RYD)\w*\d+(?:\.\d+)?\b"
+    r"|\b\d{5,}(?:\.\d+)?\b"
+    r"|\bNO DOCKET\b"
+    r"|\bN/A\b"
+    r"|\bNA\b"
+    r"|\bT\d{5}[\\/]\d\b"
+    r"|\bD\d{5}[\\/]\d\b",
+    re.IGNORECASE,
+)
+MULTI_SPACE_RE = re.compile(r"\s{2,}")
+
+def clean_description(desc):
+    cleaned_desc = DESCRIPTION_NOISE_RE.sub("", desc)
+    return MULTI_SPACE_RE.sub(" ", cleaned_desc).strip()
+
+# --- Line classification ---
+LINE_FOOTER = "footer"
+LINE_SERVICE = "service"
+LINE_NOISE = "noise"
+LINE_SUBTOTAL = "subtotal"
+LINE_TEXT = "text"
+
+# Matched against the lower-cased line
+FOOTER_RE = re.compile(
+    r"powered by wastedge"
+    r"|^page[: ]*\d+"
+    r"|tax invoice[: ]*\d+"
+    r"|invoice date[: ]*\d{2}/\d{2}/\d{2}"
+    r"|acc[: ]*\d+\.\d+"
+)
+# Matched against the stripped line; the group name is the line kind
+LINE_KIND_RE = re.compile(
+    r"(?P<service>\d{2}/\d{2}/\d{2}\s+\d+\.\d+)"
+    r"|(?P<noise>(?:\d{5,}(?:\.\d+)?"
+    r"|[A-Z]{2,5}\d+(?:\.\d+)?"
+    r"|[A-Z]{2,5}\d+[\\/]\d+"
+    r"|\d{3}-\d{5}"
+    r"|[tT]\d{5}[\\/]\d)\Z)"
+)
+NOISE_WORDS = {"no docket", "n/a", "na"}
+
+def classify_line(line):
+    """Classify a stripped statement line as footer, service, noise, subtotal or text."""
+    lower = line.lower()
+    if FOOTER_RE.search(lower) or ("tax invoice" in lower and "invoice date" in lower and "acc" in lower):
+        return LINE_FOOTER
+    m = LINE_KIND_RE.match(line)
+    if m:
+        return m.lastgroup
+    if lower in NOISE_WORDS:
+        return LINE_NOISE
+    if lower.startswith("sub total"):
+        return LINE_SUBTOTAL
+    return LINE_TEXT
+
+def extract_service_lines(lines, site_info, tax_invoice):
+    """Parse bookings from ``(stripped line, kind)`` pairs, see :func:`classify_line`."""
+    results = []
+    unmatched_booking_lines = []
+    current_entry = {}
+    expecting_description_continuation = False
+
+    for line, kind in lines:
+        is_new_main_line = kind == LINE_SERVICE
+
+        if is_new_main_line:
+            if expecting_description_continuation and current_entry:
+                if current_entry.get("Total") and safe_float(current_entry["Total"]) > 0:
+                    current_entry["Description"] = clean_description(current_entry["Description"])
+                    results.append(current_entry.copy())
+                else:
+                    unmatched_booking_lines.append(" ".join(current_entry.values()))
+                current_entry = {}
+                expecting_description_continuation = False
+
+        if is_new_main_line and ("Disposal Charge" in line or "Rebate" in line):
+            parts = line.split()
+            try:
+                date = parts[0]
+                ref_no = parts[1]
+                tipping_match = re.search(r'(Disposal Charge|Rebate)[^\d]*(\d+\.\d+)\s+tonne', line)
+                tipping = tipping_match.group(2) if tipping_match else ""
+                qty = parts[-3]
+                price = parts[-2]
+                total = parts[-1]
+                description = ' '.join(parts[2:-3])
+            except:
+                continue
+
+            description = clean_description(description)
+            disposal_entry = {
+                "Tax Invoice": tax_invoice,
+                "Services / Site": site_info.get("site_code", ""),
+                "Customer": site_info.get("customer", ""),
+                "Address": site_info.get("address", ""),
+                "State": site_info.get("state", ""),
+                "Date": date,
+                "Ref No": ref_no,
+                "Description": description,
+                "Tipping": tipping,
+                "Qty": qty,
+                "Price": price,
+                "Total": total,
+                "Category": "Disposal"
+            }
+            results.append(disposal_entry)
+            continue
+
+        elif is_new_main_line:
+            parts = line.split()
+            try:
+                date = parts[0]
+                ref_no = parts[1]
+                qty = parts[-3]
+                price = parts[-2]
+                total = parts[-1]
+                description = ' '.join(parts[2:-3])
+            except IndexError:
+                continue
+
+            description = clean_description(description)
+            current_entry = {
+                "Tax Invoice": tax_invoice,
+                "Services / Site": site_info.get("site_code", ""),
+                "Customer": site_info.get("customer", ""),
+                "Address": site_info.get("address", ""),
+                "State": site_info.get("state", ""),
+                "Date": date,
+                "Ref No": ref_no,
+                "Description": description,
+                "Tipping": "",
+                "Qty": qty,
+                "Price": price,
+                "Total": total,
+                "Category": "Booking"
+            }
+            expecting_description_continuation = True
+
+        elif expecting_description_continuation:
+            if kind == LINE_NOISE:
+                continue
+
+            elif kind == LINE_SUBTOTAL:
+                if current_entry.get("Total") and safe_float(current_entry["Total"]) > 0:
+                    current_entry["Description"] = clean_description(current_entry["Description"])
+                    results.append(current_entry.copy())
+                else:
+                    unmatched_booking_lines.append(" ".join(current_entry.values()))
+                current_entry = {}
+                expecting_description_continuation = False
+
+            else:
+                current_entry["Description"] += " " + line
+
+    if current_entry:
+        if current_entry.get("Total") and safe_float(current_entry["Total"]) > 0:
+            current_entry["Description"] = clean_description(current_entry["Description"])
+            results.append(current_entry.copy())
+        else:
+            unmatched_booking_lines.append(" ".join(current_entry.values()))
+
+    return results, unmatched_booking_lines
+
+def parse_multiline_period_charges(lines, default_site_info, tax_invoice, invoice_date):
+    results = []
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        m1 = re.match(r"(\d+)\s+x\s+([\w\d]+).*?@\s*([\d.]+)\s*/\s*Lift", line, re.I)
+        if m1 and i + 1 < len(lines):
+            next_line = lines[i+1].strip()
+            m2 = re.match(r"Site:\s*(\S+)\s+(.*)\s+(\d+)\s+([\d.]+)\s+([\d.]+)$", next_line)
+            if m2:
+                site_code = m2.group(1)
+                description = m2.group(2).strip()
+                qty2 = m2.group(3)
+                price = m2.group(4)
+                total = m2.group(5)
+                entry = {
+                    "Tax Invoice": tax_invoice,
+                    "Services / Site": site_code or default_site_info.get("site_code", ""),
+                    "Customer": default_site_info.get("customer", ""),
+                    "Address": default_site_info.get("address", ""),
+                    "State": default_site_info.get("state", ""),
+                    "Date": invoice_date,
+                    "Ref No": "",
+                    "Description": f"{line} {description}",
+                    "Tipping": "",
+                    "PO": "",
+                    "Qty": qty2,
+                    "Price": price,
+                    "Total": total,
+                    "Category": "Period Charges"
+                }
+                results.append(entry)
+                i += 2
+                continue
+        i += 1
+    return results
+
+def is_footer_line(line):
+    return classify_line(line.strip()) == LINE_FOOTER
+
+def process_invoice(pdf_io, master_site_names):
+    all_data = []
+    period_charges_data = []
+    unmatched_lines = []
+    unmatched_booking_lines = []
+
+    with open_vendor_pdf(pdf_io, "aps") as pdf:
+        page_texts = PageTexts(pdf)
+        full_text = page_texts.full_text()
+        metadata = extract_invoice_metadata(full_text)
+        tax_invoice = metadata["Tax Invoice"]
+        invoice_date = metadata["Invoice Date"]
+
+        invoice_total_excl_gst, all_invoice_totals = extract_invoice_totals_excl_gst(full_text)
+
+        current_site_info = {}
+        service_buffer = []
+        period_charges_buffer = []
+        parsing_services = False
+        current_section = None
+
+        # Classify every line once: footers are dropped, the rest keep their kind
+        page_lines = []
+        for text in page_texts:
+            if not text:
+                continue
+            classified = []
+            for raw in text.split("\n"):
+                line = raw.strip()
+                kind = classify_line(line)
+                if kind != LINE_FOOTER:
+                    classified.append((raw, line, kind))
+            page_lines.append(classified)
+
+        # Fuzzy-match every distinct site customer in the document in one batch
+        site_splits = (split_site_line(l) for lines in page_lines for _, l, _ in lines
+                       if l.startswith("Services / Site:"))
+        resolved_names = match_site_names([s[1] for s in site_splits if s], master_site_names)
+
+        for lines in page_lines:
+
+            i = 0
+            while i < len(lines):
+                _, line, kind = lines[i]
+                # Detect new Tax Invoice (start of new invoice inside same PDF)
+                if re.match(r"Tax Invoice\s*\d+", line, re.IGNORECASE):
+                    # Flush buffers from previous invoice before resetting
+                    if current_site_info and service_buffer:
+                        bookings, unmatched_bookings = extract_service_lines(service_buffer, current_site_info, tax_invoice)
+                        all_data.extend(bookings)
+                        unmatched_booking_lines.extend(unmatched_bookings)
+                        service_buffer = []
+
+                    if period_charges_buffer:
+                        multi_entries = parse_multiline_period_charges(period_charges_buffer, current_site_info, tax_invoice, invoice_date)
+                        period_charges_data.extend(multi_entries)
+                        period_charges_buffer = []
+
+                    invoice_block_text = "\n".join(raw for raw, _, _ in lines[i:i+20])  # limit search window
+                    metadata = extract_invoice_metadata(invoice_block_text)
+                    tax_invoice = metadata["Tax Invoice"]
+                    invoice_date = metadata["Invoice Date"]
+                    
+                    current_site_info = {}
+                    current_section = None
+                    parsing_services = False
+                    i += 1
+                    continue
+
+                if line.startswith("Services / Site:"):
+                    if current_site_info and service_buffer:
+                        bookings, unmatched_bookings = extract_service_lines(service_buffer, current_site_info, tax_invoice)
+                        all_data.extend(bookings)
+                        unmatched_booking_lines.extend(unmatched_bookings)
+                        service_buffer = []
+
+                    if period_charges_buffer:
+                        multi_entries = parse_multiline_period_charges(period_charges_buffer, current_site_info, tax_invoice, invoice_date)
+                        period_charges_data.extend(multi_entries)
+                        period_charges_buffer = []
+
+                    next_line = lines[i+1][1] if i+1 < len(lines) else ""
+                    if re.match(r"^\d{4}$", next_line):
+                        i += 1
+
+                    current_site_info = parse_site_line(line, master_site_names, resolved_names)
+                    parsing_services = True
+                    current_section = "services"
+                    i += 1
+                    continue
+
+                if "Period Charges" in line:
+                    if current_site_info and service_buffer:
+                        bookings, unmatched_bookings = extract_service_lines(service_buffer, current_site_info, tax_invoice)
+                        all_data.extend(bookings)
+                        unmatched_booking_lines.extend(unmatched_bookings)
+                        service_buffer = []
+
+                    current_section = "period_charges"
+                    parsing_services = False
+                    period_charges_buffer = []
+                    i += 1
+                    continue
+
+                if current_section == "period_charges":
+                    if not line or line.lower().startswith(("services", "date ref no", "powered by", "page:")):
+                        if period_charges_buffer:
+                            multi_entries = parse_multiline_period_charges(period_charges_buffer, current_site_info, tax_invoice, invoice_date)
+                            period_charges_data.extend(multi_entries)
+                            period_charges_buffer = []
+                        current_section = None
+                        i += 1
+                        continue
+                    period_charges_buffer.append(line)
+                    i += 1
+                    continue
+
+                if parsing_services:
+                    if "Powered by" in line or line.lower().startswith("page:"):
+                        i += 1
+                        continue
+                    if kind == LINE_SERVICE or any(
+                        kw in line.lower() for kw in ["bin", "exchange", "charge", "tonne", "waste", "frontlift"]
+                    ):
+                        service_buffer.append((line, kind))
+                    elif line.lower().startswith("services") or line.lower().startswith("date ref no"):
+                        pass
+                    elif current_site_info:
+                        service_buffer.append((line, kind))
+                    else:
+                        if line:
+                            unmatched_lines.append(line)
+                    i += 1
+                    continue
+
+                if line and not line.lower().startswith(("page:", "powered by")):
+                    unmatched_lines.append(line)
+                i += 1
+
+        # Flush remaining buffers
+        if current_site_info and service_buffer:
+            bookings, unmatched_bookings = extract_service_lines(service_buffer, current_site_info, tax_invoice)
+            all_data.extend(bookings)
+            unmatched_booking_lines.extend(unmatched_bookings)
+            service_buffer = []
+        if period_charges_buffer:
+            multi_entries = parse_multiline_period_charges(period_charges_buffer, current_site_info, tax_invoice, invoice_date)
+            period_charges_data.extend(multi_entries)
+            period_charges_buffer = []
+
+    df_bookings = pd.DataFrame(all_data)
+    df_period_charges = pd.DataFrame(period_charges_data)
+    df_unmatched_bookings = pd.DataFrame({"Lines": unmatched_booking_lines})
+
+    if "Pincode" in df_bookings.columns:
+        df_bookings = df_bookings.drop(columns=["Pincode"])
+    if "Pincode" in df_period_charges.columns:
+        df_period_charges = df_period_charges.drop(columns=["Pincode"])
+
+    df_bookings, booking_rejects = normalize_amounts(df_bookings, ("Qty", "Price", "Total"))
+    df_period_charges, period_rejects = normalize_amounts(df_period_charges, ("Qty", "Price", "Total"))
+    rejects = concat_rejects({"Bookings": booking_rejects, "Period Charges": period_rejects})
+
+    df_bookings['Total_float'] = df_bookings['Total'] if not df_bookings.empty else pd.Series(dtype=float)
+    df_period_charges['Total_float'] = df_period_charges['Total'] if not df_period_charges.empty else pd.Series(dtype=float)
+
+    sum_bookings = df_bookings['Total_float'].sum() if not df_bookings.empty else 0
+    sum_period_charges = df_period_charges['Total_float'].sum() if not df_period_charges.empty else 0
+    sum_total_extracted = sum_bookings + sum_period_charges
+
+    return {
+        "metadata": metadata,
+        "invoice_total_excl_gst": invoice_total_excl_gst,
+        "all_invoice_totals": all_invoice_totals,
+        "df_bookings": df_bookings,
+        "df_period_charges": df_period_charges,
+        "df_unmatched_bookings": df_unmatched_bookings,
+        "sum_bookings": sum_bookings,
+        "sum_period_charges": sum_period_charges,
+        "sum_total_extracted": sum_total_extracted,
+        "rejects": rejects,
+    }
+
+
+def parse(pdf_io, master_site_names):
+    """Parse an APS statement into bookings, period charges and unmatched lines."""
+    results = process_invoice(pdf_io, master_site_names)
+
+    expected = results["invoice_total_excl_gst"]
+    extracted = results["sum_total_extracted"]
+    if results["all_invoice_totals"]:
+        status = "MATCH" if abs(expected - extracted) < 0.01 else "MISMATCH"
+    else:
+        status = "UNKNOWN"
+    results["reconciliation"] = {
+        "Invoice Total (Excl GST)": expected,
+        "Total Extracted": extracted,
+        "Difference": round(expected - extracted, 2),
+        "status": status,
+    }
+    results["tables"] = {
+        "Bookings": results["df_bookings"],
+        "Period Charges": results["df_period_charges"],
+        "Unmatched Lines": results["df_unmatched_bookings"],
+    }
+    if not results["rejects"].empty:
+        results["tables"]["Rejected Values"] = results["rejects"]
+    return results
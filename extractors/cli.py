@@ -0,0 +1,278 @@
+"""Command-line batch extractor: parse many invoice PDFs across a process pool.
+
+Example::
+
+    python -m extractors --vendor remondis invoices/2024-06/ --workers 8 --combined --format xlsx,parquet
+"""
+import argparse
+import glob
+import io
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from extractors import VENDORS, columnar, load_vendor
+from extractors.router import detect_vendor
+from extractors.workbook import write_workbook
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("xlsx", "csv", *columnar.FORMATS)
+
+# Vendors whose parse() accepts ``workers`` for page-parallel parsing of one PDF.
+PAGE_PARALLEL_VENDORS = ("veolia", "remondis")
+
+# Per-worker state, set once by _init_worker so large options (e.g. the
+# master sites list) are not re-pickled for every file. _vendor_kwargs maps
+# vendor -> extra parse() arguments; _vendor may be "auto".
+_vendor = None
+_vendor_kwargs = {}
+
+
+def _init_worker(vendor, vendor_kwargs):
+    global _vendor, _vendor_kwargs
+    _vendor = vendor
+    _vendor_kwargs = vendor_kwargs
+
+
+def expand_inputs(inputs):
+    """Resolve directories, globs and file paths into a sorted, de-duplicated PDF list."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = [os.path.join(item, f) for f in os.listdir(item) if f.lower().endswith(".pdf")]
+        elif glob.has_magic(item):
+            matches = glob.glob(item, recursive=True)
+        else:
+            matches = [item]
+        paths.extend(sorted(matches))
+    return list(dict.fromkeys(paths))
+
+
+def output_stems(paths):
+    """Per-file output name stems: the file name, or its path relative to the inputs' common
+    directory (separators as ``__``) where two inputs share a file name."""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    counts = {}
+    for stem in stems:
+        counts[stem.casefold()] = counts.get(stem.casefold(), 0) + 1
+    absolute = [os.path.abspath(path) for path in paths]
+    root = os.path.commonpath([os.path.dirname(path) for path in absolute]) if paths else ""
+    unique = []
+    for path, stem in zip(absolute, stems):
+        if counts[stem.casefold()] > 1:
+            stem = os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, "__")
+        unique.append(stem)
+    # Relative paths can still meet (e.g. "a__b/x.pdf" and "a/b__x.pdf"): number any repeats
+    seen = {}
+    for index, stem in enumerate(unique):
+        n = seen.get(stem.casefold(), 0)
+        seen[stem.casefold()] = n + 1
+        if n:
+            unique[index] = f"{stem}_{n + 1}"
+    return dict(zip(paths, unique))
+
+
+def write_tables(tables, output_base, formats):
+    """Write a sheet-name -> DataFrame mapping in each of ``formats``.
+
+    xlsx gives one workbook; csv, parquet and arrow give one file per table.
+    """
+    if not tables:
+        return []
+    written = []
+    for fmt in formats:
+        if fmt == "xlsx":
+            path = output_base + ".xlsx"
+            write_workbook(tables, path)
+            written.append(path)
+            continue
+        for name, df in tables.items():
+            path = f"{output_base}__{name.replace(' ', '_')}"
+            if fmt == "csv":
+                path += ".csv"
+                df.to_csv(path, index=False)
+            else:
+                path += columnar.FORMATS[fmt]
+                columnar.write_table(df, path, fmt)
+            written.append(path)
+    return written
+
+
+def summarize(path, vendor, result):
+    tables = result["tables"]
+    return {
+        "file": path,
+        "vendor": vendor,
+        "rows": {name: len(df) for name, df in tables.items()},
+        "unmatched": sum(len(df) for name, df in tables.items() if "unmatched" in name.lower()),
+        "rejected_values": len(result["rejects"]),
+        "reconciliation": result["reconciliation"],
+    }
+
+
+def process_file(path, stem, output_dir, formats, combined):
+    """Worker task: parse one PDF, write its outputs as ``stem`` unless combining, return a summary."""
+    try:
+        with open(path, "rb") as f:
+            pdf = io.BytesIO(f.read())
+        vendor = _vendor
+        if vendor == "auto":
+            vendor = detect_vendor(pdf)
+            if vendor is None:
+                raise ValueError(f"Could not recognise the invoice vendor; choose one of: {', '.join(VENDORS)}")
+            if vendor == "aps" and "aps" not in _vendor_kwargs:
+                return {"file": path, "vendor": vendor, "error": "APS invoice detected; --master-sites is required"}, None
+        result = load_vendor(vendor).parse(pdf, **_vendor_kwargs.get(vendor, {}))
+    except Exception as e:
+        return {"file": path, "error": f"{type(e).__name__}: {e}"}, None
+
+    summary = summarize(path, vendor, result)
+    if combined:
+        return summary, result["tables"]
+    try:
+        summary["outputs"] = write_tables(result["tables"], os.path.join(output_dir, stem), formats)
+    except Exception as e:
+        summary["error"] = f"writing outputs failed: {type(e).__name__}: {e}"
+    return summary, None
+
+
+def combine_tables(per_file_tables):
+    """Concatenate each table across files, tagging rows with their source file."""
+    combined = {}
+    for path, tables in per_file_tables:
+        for name, df in tables.items():
+            df = df.copy()
+            df.insert(0, "Source File", os.path.basename(path))
+            combined.setdefault(name, []).append(df)
+    return {name: pd.concat(frames, ignore_index=True) for name, frames in combined.items()}
+
+
+def _json_default(value):
+    if hasattr(value, "item"):  # numpy / pandas scalars
+        return value.item()
+    return str(value)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m extractors", description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("--vendor", required=True, choices=sorted(VENDORS) + ["auto"],
+                        help="vendor of every input, or 'auto' to detect it per file from the first page")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: all cores)")
+    parser.add_argument("--output-dir", default="extracted")
+    parser.add_argument("--format", default="xlsx",
+                        help=f"comma-separated output formats: {', '.join(OUTPUT_FORMATS)} (default: xlsx); "
+                             "parquet and arrow write typed columnar files")
+    parser.add_argument("--combined", action="store_true", help="write one combined output instead of one per PDF")
+    parser.add_argument("--master-sites", help="master sites CSV with a 'standard_name' column; required for --vendor aps, and "
+                             "for --vendor auto whenever APS invoices may be among the inputs")
+    parser.add_argument("--page-workers", type=int, default=1,
+                        help="processes per PDF for page-parallel parsing (veolia, remondis; for a few large statements)")
+    parser.add_argument("--summary", help="JSON summary path (default: <output-dir>/summary.json)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    formats = list(dict.fromkeys(f.strip() for f in args.format.split(",") if f.strip()))
+    unknown = [f for f in formats if f not in OUTPUT_FORMATS]
+    if unknown or not formats:
+        logger.error("Unknown output format(s) %s; choose from: %s", ", ".join(unknown), ", ".join(OUTPUT_FORMATS))
+        return 2
+
+    vendor_kwargs = {}
+    if args.vendor == "aps" and not args.master_sites:
+        logger.error("--master-sites is required for the aps vendor")
+        return 2
+    if args.master_sites:
+        master_sites_df = pd.read_csv(args.master_sites)
+        if "standard_name" not in master_sites_df.columns:
+            logger.error("Master Sites CSV must contain a 'standard_name' column.")
+            return 2
+        vendor_kwargs["aps"] = {"master_site_names": master_sites_df["standard_name"].dropna().tolist()}
+    if args.page_workers > 1:
+        if args.vendor not in PAGE_PARALLEL_VENDORS + ("auto",):
+            logger.error("--page-workers is only supported for: %s", ", ".join(PAGE_PARALLEL_VENDORS))
+            return 2
+        for vendor in PAGE_PARALLEL_VENDORS:
+            vendor_kwargs.setdefault(vendor, {})["workers"] = args.page_workers
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        logger.error("No PDF files found.")
+        return 2
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    workers = max(1, min(args.workers, len(paths)))
+    logger.info("Parsing %d file(s) as %s with %d worker(s)", len(paths), args.vendor, workers)
+    stems = output_stems(paths)
+    task_args = (args.output_dir, formats, args.combined)
+    results = [None] * len(paths)
+
+    if workers == 1:
+        _init_worker(args.vendor, vendor_kwargs)
+        for index, path in enumerate(paths):
+            results[index] = process_file(path, stems[path], *task_args)
+            logger.info("[%d/%d] %s", index + 1, len(paths), path)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(args.vendor, vendor_kwargs)) as executor:
+            futures = {executor.submit(process_file, path, stems[path], *task_args): index for index, path in enumerate(paths)}
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                results[index] = future.result()
+                logger.info("[%d/%d] %s", done, len(paths), paths[index])
+
+    summaries = [summary for summary, _ in results]
+    if args.combined:
+        # One combined output per vendor (several when --vendor auto found more than one)
+        per_vendor = {}
+        for s, t in results:
+            if t is not None:
+                per_vendor.setdefault(s["vendor"], []).append((s["file"], t))
+        outputs = [
+            out for vendor, per_file_tables in per_vendor.items()
+            for out in write_tables(combine_tables(per_file_tables),
+                                    os.path.join(args.output_dir, f"{vendor}_combined"), formats)
+        ]
+    else:
+        outputs = [out for s in summaries for out in s.get("outputs", [])]
+
+    failed = [s for s in summaries if "error" in s]
+    summary = {
+        "vendor": args.vendor,
+        "files_per_vendor": {
+            vendor: sum(1 for s in summaries if s.get("vendor") == vendor)
+            for vendor in dict.fromkeys(s["vendor"] for s in summaries if "vendor" in s)
+        },
+        "files": len(paths),
+        "failed": len(failed),
+        "total_rows": sum(sum(s["rows"].values()) for s in summaries if "rows" in s),
+        "total_unmatched": sum(s.get("unmatched", 0) for s in summaries),
+        "total_rejected_values": sum(s.get("rejected_values", 0) for s in summaries),
+        "reconciliation": {
+            status: sum(1 for s in summaries if s.get("reconciliation", {}).get("status") == status)
+            for status in ("MATCH", "MISMATCH", "UNKNOWN")
+        },
+        "outputs": outputs,
+        "per_file": summaries,
+    }
+    summary_path = args.summary or os.path.join(args.output_dir, "summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2, default=_json_default)
+
+    for s in failed:
+        logger.error("Failed: %s (%s)", s["file"], s["error"])
+    logger.info("Wrote %d output file(s) and %s", len(outputs), summary_path)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
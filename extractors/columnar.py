@@ -0,0 +1,92 @@
+"""Typed Parquet / Arrow IPC output for the extractor result tables.
+
+Amount columns already arrive as floats from ``numeric.normalize_amounts``;
+``typed_frame`` additionally turns the text columns into dates, categoricals
+or plain strings so the files load back with real types and can be read a
+few columns at a time.
+"""
+import io
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Day-first formats printed by the vendors (30/04/24, 01/03/2024, 07.02.2024)
+DATE_FORMATS = ("%d/%m/%y", "%d/%m/%Y", "%d.%m.%Y", "%Y-%m-%d")
+# Text columns with at most this share of distinct values are stored as categoricals
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+
+def _as_dates(text, filled):
+    for fmt in DATE_FORMATS:
+        dates = pd.to_datetime(text, format=fmt, errors="coerce")
+        if dates[filled].notna().all():
+            return dates
+    return None
+
+
+def typed_frame(df):
+    """A copy of ``df`` with its text columns typed for columnar storage.
+
+    A column whose name mentions "Date" becomes datetime64 when every
+    non-blank value parses with one of ``DATE_FORMATS``; other text columns
+    become categoricals when values repeat, and strings otherwise. Numeric and
+    boolean columns are left as they are.
+    """
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_datetime64_any_dtype(series.dtype):
+            continue
+        text = series.astype("string").str.strip()
+        filled = text.notna() & (text != "")
+        dates = _as_dates(text, filled) if "date" in str(col).lower() and filled.any() else None
+        if dates is not None:
+            df[col] = dates
+        elif len(text) > 1 and text.nunique() <= CATEGORY_MAX_UNIQUE_RATIO * len(text):
+            df[col] = series.astype("string").astype("category")
+        else:
+            df[col] = series.astype("string")
+    return df
+
+
+def arrow_table(df):
+    return pa.Table.from_pandas(typed_frame(df), preserve_index=False)
+
+
+def write_table(df, target, fmt="parquet"):
+    """Write one DataFrame as typed Parquet (zstd) or Arrow IPC (lz4) to a path or binary file."""
+    table = arrow_table(df)
+    if fmt == "parquet":
+        pq.write_table(table, target, compression="zstd")
+    elif fmt == "arrow":
+        feather.write_feather(table, target, compression="lz4")
+    else:
+        raise ValueError(f"Unknown columnar format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    return target
+
+
+def read_tables(paths, columns=None):
+    """Load and stack Parquet / Arrow files, reading only ``columns`` if given."""
+    frames = []
+    for path in paths:
+        if str(path).endswith(FORMATS["arrow"]):
+            frames.append(feather.read_table(path, columns=columns).to_pandas())
+        else:
+            frames.append(pq.read_table(path, columns=columns).to_pandas())
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+def zip_bytes(tables, fmt="parquet"):
+    """All ``tables`` as one zip of typed files (one per table), e.g. for ``st.download_button``."""
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as zf:
+        for name, df in tables.items():
+            buffer = io.BytesIO()
+            write_table(df, buffer, fmt)
+            zf.writestr(name.replace(" ", "_") + FORMATS[fmt], buffer.getvalue())
+    return output.getvalue()
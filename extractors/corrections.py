@@ -0,0 +1,149 @@
+"""Persistent, append-only store for fuzzy site-name corrections."""
+import csv
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single-process use only
+    fcntl = None
+
+
+def master_list_hash(master_site_names, threshold):
+    """Key corrections by the exact master list (and threshold) that produced them."""
+    digest = hashlib.sha256(f"{threshold}\n".encode("utf-8"))
+    for name in master_site_names:
+        digest.update(name.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()[:16]
+
+
+class CorrectionStore:
+    """CSV-backed raw -> corrected name store, fronted by a bounded in-memory LRU.
+
+    New corrections are appended to the file in a single write; the file is
+    compacted (deduplicated, stale master lists dropped) once
+    ``compact_every`` rows have been written since the last compaction.
+    Files in the old two-column format carry no master hash and are
+    discarded on the next write. Every change to the file happens under an
+    exclusive lock on ``<path>.lock``, so processes sharing the store (CLI
+    workers) never lose each other's appends.
+    """
+
+    HEADER = ["master_hash", "raw_name", "corrected_name"]
+
+    def __init__(self, path, max_entries=100_000, compact_every=10_000, max_master_lists=4):
+        self.path = path
+        self.max_entries = max_entries
+        self.compact_every = compact_every
+        self.max_master_lists = max_master_lists
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._rows_since_compaction = 0
+        self._load()
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock held across a read-modify-write of the file, between processes too."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _header(self):
+        try:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                return next(csv.reader(f), None)
+        except FileNotFoundError:
+            return None
+
+    def _read_rows(self):
+        try:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                if next(reader, None) != self.HEADER:
+                    return []
+                return [tuple(row) for row in reader if len(row) == 3]
+        except FileNotFoundError:
+            return []
+
+    def _load(self):
+        rows = self._read_rows()
+        for master_hash, raw_name, corrected in rows:
+            self._remember((master_hash, raw_name), corrected)
+        # Only superseded rows are waiting for compaction, not the whole file
+        self._rows_since_compaction = len(rows) - len({(h, raw) for h, raw, _ in rows})
+
+    def _remember(self, key, corrected):
+        self._lru[key] = corrected
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, master_hash, raw_name):
+        with self._lock:
+            key = (master_hash, raw_name)
+            corrected = self._lru.get(key)
+            if corrected is not None:
+                self._lru.move_to_end(key)
+            return corrected
+
+    def put_many(self, master_hash, corrections):
+        """Persist ``{raw_name: corrected_name}`` with one append."""
+        if not corrections:
+            return
+        with self._lock, self._file_lock():
+            # Checked under the lock: another process may have migrated or compacted the file
+            if self._header() != self.HEADER:
+                self._rewrite([])
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows((master_hash, raw, corrected) for raw, corrected in corrections.items())
+            for raw, corrected in corrections.items():
+                self._remember((master_hash, raw), corrected)
+            self._rows_since_compaction += len(corrections)
+            if self._rows_since_compaction >= self.compact_every:
+                self._compact()
+
+    def compact(self):
+        with self._lock, self._file_lock():
+            self._compact()
+
+    def _compact(self):
+        latest = {}
+        for master_hash, raw_name, corrected in self._read_rows():
+            key = (master_hash, raw_name)
+            latest.pop(key, None)
+            latest[key] = corrected
+
+        # Keep the master lists written most recently; older ones are stale.
+        last_seen = {}
+        for position, (master_hash, _) in enumerate(latest):
+            last_seen[master_hash] = position
+        keep = set(sorted(last_seen, key=last_seen.get)[-self.max_master_lists:])
+        rows = [(h, raw, corrected) for (h, raw), corrected in latest.items() if h in keep]
+        self._rewrite(rows)
+        self._rows_since_compaction = 0
+
+    def _rewrite(self, rows):
+        """Atomically replace the file; callers hold ``_file_lock``."""
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".",
+                                        dir=os.path.dirname(os.path.abspath(self.path)))
+        try:
+            with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(self.HEADER)
+                writer.writerows(rows)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,371 @@
+"""CSC (Wastedge) invoice parser."""
+import re
+import pandas as pd
+
+from extractors.numeric import concat_rejects, normalize_amounts
+from extractors.pdf_text import PageTexts, open_vendor_pdf
+
+# ========= Regex Patterns =========
+footer_pattern = re.compile(
+    r"(Powered by wastedge\.com|Page:\s*\d+|Tax Invoice:|Invoice Date:|Acc:)",
+    re.IGNORECASE
+)
+
+header_pattern = {
+    "tax_invoice": r"Tax Invoice\s+(\d+)",
+    "account_number": r"Account Number\s+([\d.]+)",
+    "billing_period": r"Billing Period\s+([\d/]+ to [\d/]+)",
+    "invoice_date": r"Invoice Date\s+([\d/]+)",
+    "total": r"Total\s+([\d.,]+)"
+}
+
+site_pattern = re.compile(
+    r"Services\s*/\s*Site:\s*(\d+\.\d+)\s+(.+?)\s*-\s*(.+?)\s*-\s*(.+?)\s+([A-Z]{2,3})\s*(\d+)",
+    re.DOTALL
+)
+
+# Primary pattern for service lines
+pattern = re.compile(
+    r"^(\d{2}/\d{2}/\d{2})\s+"        # Date
+    r"([\d.]+)\s+"                    # Ref No
+    r"(.+?)\s+"                       # Description
+    r"(\d+)\s+"                       # Qty
+    r"([\d.,]+)\s+"                   # Price
+    r"([\d.,]+)\s*"                   # Total
+    r"(.*)$"                          # Trailing desc
+)
+
+# Alternate pattern (decimal qty)
+pattern_alt = re.compile(
+    r"""^
+    (\d{2}/\d{2}/\d{2})\s+
+    ([\d.]+)\s+
+    (.+?)\s+
+    ([\d.]+)\s+
+    ([\d.,]+)\s+
+    ([\d.,]+)\s*
+    (.*)$
+    """,
+    re.VERBOSE
+)
+
+# Period charge rows: description followed by qty, price and total
+period_pattern = re.compile(r"^(.+?)\s+([\d.,]+)\s+([\d.,]+)\s+([\d.,]+)$")
+wasteflex_pattern = re.compile(r"(\d+\.\d+)\s+Wasteflex Pty Ltd\s+-\s+(.+)")
+
+# Line markers for the single-pass scanner
+site_start_pattern = re.compile(r"Services\s*/\s*Site:")
+partial_site_pattern = re.compile(r"Services\s*/\s*Site:\s*(\d+\.\d+)\s*(.*)")
+service_start_pattern = re.compile(r"\d{2}/\d{2}/\d{2}\s")
+raw_service_pattern = re.compile(r"\d{2}/\d{2}/\d{2}")
+sub_total_pattern = re.compile(r"Sub\s+Total", re.IGNORECASE)
+# (key, label literal, pattern) in the order the fields appear in an invoice header
+header_fields = [(key, pat.split("\\s")[0], re.compile(pat)) for key, pat in header_pattern.items()]
+
+# A site header wrapped by pdfplumber is joined with at most this many lines
+MAX_SITE_HEADER_LINES = 3
+
+
+# ========= Functions =========
+def iter_lines(page_texts):
+    """Lines of the concatenated page texts, one page at a time."""
+    for page_text in page_texts:
+        if page_text:
+            yield from page_text.split("\n")
+
+
+def _split_site_markers(line):
+    """Split ``line`` before every "Services / Site:" marker; text ahead of a marker ends the previous block."""
+    cuts = [m.start() for m in site_start_pattern.finditer(line) if m.start()]
+    if not cuts:
+        return [line]
+    return [line[i:j] for i, j in zip([0] + cuts, cuts + [len(line)])]
+
+
+def _site_fields(site_match):
+    site_code, customer_name, address, city, region, zipcode = site_match.groups()
+    return {
+        "Site": site_code,
+        "Customer Name": customer_name.strip(),
+        "Address": address.strip(),
+        "City": city.strip(),
+        "Region": region.strip(),
+        "Zip": zipcode.strip(),
+    }
+
+
+def _partial_site_fields(header_text):
+    """Site fields for a header without the trailing region/postcode (e.g. period-charge-only sites)."""
+    m = partial_site_pattern.match(header_text.split("\n", 1)[0])
+    if not m:
+        return None
+    parts = [part.strip(" -") for part in m.group(2).split(" - ", 2)] + ["", ""]
+    return {
+        "Site": m.group(1),
+        "Customer Name": parts[0],
+        "Address": parts[1],
+        "City": parts[2],
+        "Region": "",
+        "Zip": "",
+    }
+
+
+def _service_row(booking_lines, site):
+    """``(row, full_line)`` for one service booking; row is ``None`` when neither service pattern matches."""
+    full_line = " ".join(booking_lines)
+    m = pattern.match(full_line) or pattern_alt.match(full_line)
+    if not m:
+        return None, full_line
+    date, ref_no, desc, qty, price, total, trailing_desc = m.groups()
+    return {
+        "Tax Invoice": "",
+        **site,
+        "Date": date.strip(),
+        "Ref No": ref_no.strip(),
+        "Description": (desc + " " + trailing_desc).strip(),
+        "PO": "",
+        "Qty": qty.strip(),
+        "Price": price.replace(",", ""),
+        "Total": total.replace(",", ""),
+    }, full_line
+
+
+def parse_page_texts(page_texts):
+    """Scan the invoice text once, line by line.
+
+    Returns a dict with ``headers`` (one per Tax Invoice), ``sites``, service
+    ``rows`` and ``unmatched_rows``, ``period_charges`` and ``raw_line_count``
+    (lines starting with a date). Only the current site block's booking, pending
+    header and period charge rows are held between lines.
+    """
+    headers, sites, rows, unmatched_rows, period_charges = [], [], [], [], []
+    raw_line_count = 0
+
+    # Invoice header: fields are found in order, each after the previous one
+    header, field_idx, first_tax_invoice = {}, 0, None
+
+    # Service lines: current site, a site header still waiting for its postcode, open booking
+    site, pending_header, pending_lines, booking = None, None, 0, None
+
+    # Period charges: Wasteflex site of the current block, scan state, rows not yet emitted
+    period_site, period_state, period_buffer = None, "seek", []
+
+    def close_booking():
+        if booking and site is not None:
+            row, full_line = _service_row(booking, site)
+            if row is not None:
+                rows.append(row)
+            else:
+                unmatched_rows.append({"Tax Invoice": "", **site, "Raw Line": full_line})
+
+    def close_period_block():
+        if period_site is not None:
+            site_code, customer_name_full = period_site.group(1), period_site.group(2).strip()
+            if " - " in customer_name_full:
+                customer_name, address = customer_name_full.split(" - ", 1)
+            else:
+                customer_name, address = customer_name_full, ""
+            for description_text, qty, price, total in period_buffer:
+                period_charges.append({
+                    "Site": site_code,
+                    "Customer Name": customer_name.strip(),
+                    "Address": address.strip(),
+                    "Description": description_text.strip(),
+                    "Qty": qty.replace(",", "").strip(),
+                    "Price": price.replace(",", "").strip(),
+                    "Total": total.replace(",", "").strip(),
+                })
+
+    def scan_period_line(block_line):
+        nonlocal period_site, period_state
+        if period_site is None and "Wasteflex" in block_line:
+            period_site = wasteflex_pattern.search(block_line)
+        if period_state == "seek":
+            if block_line == "Period Charges":
+                period_state = "first"
+            return
+        if period_state == "first":
+            period_state = "rows"
+            if block_line.strip().startswith("Description"):
+                return
+        if period_state == "rows":
+            stripped = block_line.strip()
+            if not stripped:
+                return
+            m = period_pattern.match(stripped)
+            if m:
+                period_buffer.append(m.groups())
+            else:
+                period_state = "done"
+
+    def scan_service_line(block_line):
+        nonlocal booking
+        if site is None:
+            return
+        stripped = block_line.strip()
+        if not stripped:
+            return
+        if service_start_pattern.match(stripped):
+            close_booking()
+            booking = [stripped]
+        elif booking is not None:
+            if sub_total_pattern.match(stripped):
+                close_booking()
+                booking = None
+            elif not footer_pattern.search(stripped):
+                booking.append(stripped)
+
+    def open_site(site_fields, rest=""):
+        nonlocal site, pending_header
+        site, pending_header = site_fields, None
+        if site is not None:
+            sites.append(site)
+        for block_line in rest.split("\n"):
+            scan_service_line(block_line)
+
+    def try_open_site():
+        m = site_pattern.match(pending_header)
+        if m:
+            open_site(_site_fields(m), pending_header[m.end():])
+
+    for line in iter_lines(page_texts):
+        if line[:1].isdigit() and raw_service_pattern.match(line):
+            raw_line_count += 1
+
+        # ---- Invoice headers ----
+        pos = 0
+        while True:
+            key, label, field_pattern = header_fields[field_idx]
+            m = field_pattern.search(line, pos) if label in line else None
+            if not m:
+                break
+            header[key] = m.group(1).strip()
+            pos = m.end()
+            if key == "tax_invoice" and first_tax_invoice is None:
+                first_tax_invoice = header[key]
+            field_idx += 1
+            if field_idx == len(header_fields):
+                header["total"] = float(header["total"].replace(",", ""))
+                headers.append(header)
+                header, field_idx = {}, 0
+
+        for segment in _split_site_markers(line) if "Site:" in line else (line,):
+            start = site_start_pattern.match(segment) if "Site:" in segment else None
+            if start:
+                # ---- New site block ----
+                close_period_block()
+                period_site, period_state, period_buffer = None, "seek", []
+                scan_period_line(segment[start.end():])
+
+                close_booking()
+                if pending_header is not None:
+                    open_site(_partial_site_fields(pending_header))
+                booking, site = None, None
+                pending_header, pending_lines = segment, 1
+                try_open_site()
+                continue
+
+            scan_period_line(segment)
+
+            if pending_header is not None:
+                stripped = segment.strip()
+                structural = (
+                    service_start_pattern.match(stripped)
+                    or sub_total_pattern.match(stripped)
+                    or stripped == "Period Charges"
+                )
+                if structural or pending_lines >= MAX_SITE_HEADER_LINES:
+                    open_site(_partial_site_fields(pending_header))
+                else:
+                    pending_header += "\n" + segment
+                    pending_lines += 1
+                    try_open_site()
+                    continue
+
+            scan_service_line(segment)
+
+    close_booking()
+    close_period_block()
+    if pending_header is not None:
+        open_site(_partial_site_fields(pending_header))
+
+    # Rows carry the document's first Tax Invoice number
+    for row in rows + unmatched_rows:
+        row["Tax Invoice"] = first_tax_invoice or ""
+
+    return {
+        "headers": headers,
+        "sites": sites,
+        "rows": rows,
+        "unmatched_rows": unmatched_rows,
+        "period_charges": period_charges,
+        "raw_line_count": raw_line_count,
+    }
+
+
+def validate_totals(df_lines, df_period, headers):
+    """Reconcile extracted line totals plus 10% GST against the PDF's invoice totals."""
+    # Sum of all invoice totals from PDF
+    total_invoice_sum = sum(h["total"] for h in headers)
+
+    # Sum extracted line totals (raises KeyError when no service lines were parsed)
+    service_lines_total = df_lines["Total"].sum()
+
+    # Include Period Charges totals if needed
+    period_charges_total = df_period["Total"].sum() if not df_period.empty else 0.00
+    line_total_sum = service_lines_total + period_charges_total
+
+    # GST and Total incl. GST
+    gst_amount = round(line_total_sum * 0.10, 2)
+    calculated_total = round(line_total_sum + gst_amount, 2)
+    difference = total_invoice_sum - calculated_total
+
+    return {
+        "service_lines_total": service_lines_total,
+        "period_charges_total": period_charges_total,
+        "subtotal": line_total_sum,
+        "gst_amount": gst_amount,
+        "calculated_total": calculated_total,
+        "total_invoice_sum": total_invoice_sum,
+        "difference": difference,
+        "status": "MATCH" if abs(difference) < 0.01 else "MISMATCH",
+    }
+
+
+def parse(pdf_bytes):
+    """Parse a CSC invoice PDF (bytes or file-like) into service rows, unmatched rows and period charges."""
+    if hasattr(pdf_bytes, "read"):
+        pdf_bytes = pdf_bytes.read()
+    with open_vendor_pdf(pdf_bytes, "csc") as pdf:
+        scan = parse_page_texts(PageTexts(pdf))
+    rows, unmatched_rows = scan["rows"], scan["unmatched_rows"]
+    period_charges, headers = scan["period_charges"], scan["headers"]
+
+    df_lines, line_rejects = normalize_amounts(pd.DataFrame(rows), ("Qty", "Price", "Total"))
+    df_period, period_rejects = normalize_amounts(pd.DataFrame(period_charges), ("Qty", "Price", "Total"))
+    rejects = concat_rejects({"invoice_data": line_rejects, "Period Charges": period_rejects})
+
+    try:
+        reconciliation = validate_totals(df_lines, df_period, headers)
+    except Exception as e:
+        reconciliation = {"status": "UNKNOWN", "error": str(e)}
+
+    tables = {
+        "invoice_data": df_lines,
+        "unmatched_lines": pd.DataFrame(unmatched_rows),
+        "Period Charges": df_period,
+    }
+    if not rejects.empty:
+        tables["Rejected Values"] = rejects
+
+    return {
+        "rows": rows,
+        "unmatched_rows": unmatched_rows,
+        "period_charges": period_charges,
+        "headers": headers,
+        "sites": scan["sites"],
+        "raw_line_count": scan["raw_line_count"],
+        "reconciliation": reconciliation,
+        "rejects": rejects,
+        "tables": tables,
+    }
@@ -0,0 +1,197 @@
+"""Iron Mountain invoice parser."""
+import pandas as pd
+import re
+
+from extractors.numeric import concat_rejects, normalize_amounts
+from extractors.pdf_text import PageTexts, open_vendor_pdf
+
+# ----------------------------
+# Line patterns
+# ----------------------------
+# Each pattern is only run on lines containing its literal marker (see parse_page_texts)
+ACCOUNT_ID_RE = re.compile(r"Account ID:\s*(\d+)")
+INVOICE_NUMBER_RE = re.compile(r"Invoice Number:\s*([A-Z0-9]+)")
+LEVEL2_ACCOUNT_RE = re.compile(r"Level 2 Account:\s*(\d+).*?Level 2 Account Name:\s*([A-Za-z\s&]+)")
+SERVICE_ADDRESS_RE = re.compile(r"Service Address:\s*(.+)")
+ORDER_NO_RE = re.compile(r"IM Order No\.\:\s*([A-Z0-9]+)")
+SUBTOTAL_RE = re.compile(r"SUBTOTAL:\s*\$?([\d,]+\.\d{2})", re.IGNORECASE)
+# Trailing "[date] UOM price qty amount" of a charge line. Searched from offset 1,
+# the first hit is where the old lazy "(.+?)" description prefix stopped, so the
+# description is simply line[:m.start()] and the engine never re-expands it.
+CHARGE_TAIL_RE = re.compile(r"\s+(\d{2}/\d{2}/\d{4})?\s+([A-Z]+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)")
+
+# ----------------------------
+# Function to parse PDF
+# ----------------------------
+def parse_invoice(pdf_bytes):
+    with open_vendor_pdf(pdf_bytes, "ironmountain") as pdf:
+        return parse_page_texts(PageTexts(pdf))
+
+
+def parse_page_texts(page_texts):
+    """Parse extracted page texts; returns ``(df, unmatched_df, invoice_subtotals, rejects)``."""
+    parsed_data = []
+    unmatched_lines = []
+    invoice_subtotals = {}
+    # Markers seen on earlier lines, for deciding which unparsed SS: lines to report
+    seen_account_marker = False
+    seen_list_of_charges = False
+
+    # Context variables
+    account_id = None
+    invoice_number = None
+    level2_account = None
+    level2_name = None
+    service_address = None
+    order_no = None
+    ignore_ss_after_list_of_charges = False
+
+    for text in page_texts:
+        if not text:
+            continue
+
+        lines = text.split("\n")
+
+        for line in lines:
+            report_if_unparsed = line.startswith("SS:") and seen_account_marker and not seen_list_of_charges
+            parsed = False
+            has_account_id = "Account ID:" in line
+            if has_account_id or "Level 2 Account" in line:
+                seen_account_marker = True
+
+            # Detect start of summary/total section
+            if "List of Charges" in line:
+                ignore_ss_after_list_of_charges = True
+                seen_list_of_charges = True
+
+            # Detect Invoice Number (reset invoice context EXCEPT account_id)
+            m = INVOICE_NUMBER_RE.search(line) if "Invoice Number:" in line else None
+            if m:
+                invoice_number = m.group(1).strip()
+                level2_account = None
+                level2_name = None
+                service_address = None
+                order_no = None
+                ignore_ss_after_list_of_charges = False
+
+            # Detect Account ID
+            m = ACCOUNT_ID_RE.search(line) if has_account_id else None
+            if m:
+                account_id = m.group(1).strip()
+
+            # Detect Level 2 Account
+            m = LEVEL2_ACCOUNT_RE.search(line) if "Level 2 Account:" in line else None
+            if m:
+                level2_account = m.group(1).strip()
+                level2_name = m.group(2).strip()
+                service_address = None
+                order_no = None
+
+            # Detect Service Address
+            if "Service Address:" in line:
+                sm = SERVICE_ADDRESS_RE.search(line)
+                if sm:
+                    service_address = sm.group(1).strip()
+
+            # Detect Order No
+            if "IM Order No.:" in line:
+                om = ORDER_NO_RE.search(line)
+                if om:
+                    order_no = om.group(1).strip()
+
+            # Detect charge line (only searched while a charge can be recorded)
+            m = None
+            if (account_id or level2_account) and not ignore_ss_after_list_of_charges:
+                m = CHARGE_TAIL_RE.search(line, 1)
+            if m:
+                charge_desc = line[:m.start()].strip()
+                charge_date = m.group(1).strip() if m.group(1) else ""
+                uom = m.group(2).strip()
+                price = m.group(3).strip()
+                qty = m.group(4).strip()
+                amount = m.group(5).strip()
+
+                parsed_data.append({
+                    "Account ID": account_id,
+                    "Invoice Number": invoice_number,
+                    "Level 2 Account": level2_account,
+                    "Level 2 Account Name": level2_name,
+                    "Service Address": service_address,
+                    "IM Order No.": order_no,
+                    "Charge Description": charge_desc,
+                    "Charge Period / Date": charge_date,
+                    "UOM": uom,
+                    "Price": price,
+                    "Quantity": qty,
+                    "Amount": amount
+                })
+
+                parsed = True
+
+            # Detect SUBTOTAL for the current invoice
+            # upper() keeps the IGNORECASE match reachable for any casing of "SUBTOTAL:"
+            m = SUBTOTAL_RE.search(line) if invoice_number and "SUBTOTAL:" in line.upper() else None
+            if m:
+                invoice_subtotals[invoice_number] = float(m.group(1).replace(",", ""))
+                ignore_ss_after_list_of_charges = False
+
+            if report_if_unparsed and not parsed:
+                unmatched_lines.append(line)
+
+    # Convert to DataFrame
+    df, rejects = normalize_amounts(pd.DataFrame(parsed_data), ("Price", "Quantity", "Amount"))
+    if not df.empty:
+        df['Invoice Subtotal'] = df['Invoice Number'].map(invoice_subtotals)
+
+    unmatched_df = pd.DataFrame(unmatched_lines, columns=["Unparsed Line"])
+
+    return df, unmatched_df, invoice_subtotals, rejects
+
+
+# ----------------------------
+# Invoice totals check
+# ----------------------------
+def invoice_totals_check(df, invoice_subtotals):
+    """Compare parsed Amount per invoice against the invoice's SUBTOTAL line."""
+    checks = []
+    for inv, subtotal in invoice_subtotals.items():
+        parsed_inv_total = df[df['Invoice Number'] == inv]['Amount'].sum() if not df.empty else 0
+        checks.append({
+            "Invoice Number": inv,
+            "Parsed": parsed_inv_total,
+            "Expected": subtotal,
+            "Match": abs(parsed_inv_total - subtotal) <= 0.01,
+        })
+    return checks
+
+
+# ----------------------------
+# Headless entry point
+# ----------------------------
+def parse(pdf_bytes):
+    """Parse an Iron Mountain invoice PDF (bytes or file-like) into charge rows and unparsed SS: lines."""
+    if hasattr(pdf_bytes, "read"):
+        pdf_bytes = pdf_bytes.read()
+    df, unmatched_df, invoice_subtotals, rejects = parse_invoice(pdf_bytes)
+    checks = invoice_totals_check(df, invoice_subtotals)
+    if not checks:
+        status = "UNKNOWN"
+    else:
+        status = "MATCH" if all(c["Match"] for c in checks) else "MISMATCH"
+
+    rejects = concat_rejects({"Parsed Data": rejects})
+    tables = {
+        "Parsed Data": df,
+        "Unmatched Lines": unmatched_df,
+    }
+    if not rejects.empty:
+        tables["Rejected Values"] = rejects
+
+    return {
+        "df": df,
+        "unmatched_df": unmatched_df,
+        "invoice_subtotals": invoice_subtotals,
+        "reconciliation": {"invoices": checks, "status": status},
+        "rejects": rejects,
+        "tables": tables,
+    }
@@ -0,0 +1,54 @@
+"""Columnar amount normalization shared by the vendor parsers."""
+import pandas as pd
+
+AMOUNT_COLUMNS = ("Qty", "Quantity", "Price", "Total", "GST", "Amount")
+
+# Trailing units printed next to quantities and prices (e.g. "12.50 TO", "3 EA")
+UNIT_SUFFIX_RE = r"(?i)\s*(?:TO|EA|KG|AUD|tonnes?)\.?$"
+# "$", thousands separators and the whitespace pdfplumber leaves inside split decimals ("1 234. 50")
+NOISE_RE = r"[$,\s]"
+
+REJECT_COLUMNS = ["Row", "Column", "Value"]
+
+
+def normalize_amounts(df, columns=AMOUNT_COLUMNS):
+    """Convert ``columns`` of ``df`` to float in one vectorized pass per column.
+
+    Returns ``(df, rejects)``: a copy of ``df`` with the converted columns and a
+    DataFrame of the non-blank values that could not be parsed (Row, Column,
+    Value). Rejected and blank cells become NaN rather than 0.0, so sums skip them.
+    """
+    present = [col for col in columns if col in df.columns]
+    if not present:
+        return df, pd.DataFrame(columns=REJECT_COLUMNS)
+
+    df = df.copy()
+    rejects = []
+    for col in present:
+        raw = df[col]
+        if pd.api.types.is_numeric_dtype(raw):
+            df[col] = raw.astype(float)
+            continue
+        text = raw.astype("string").str.strip()
+        cleaned = (
+            text.str.replace(UNIT_SUFFIX_RE, "", regex=True)
+                .str.replace(NOISE_RE, "", regex=True)
+                .fillna("")
+                .astype(object)
+        )
+        values = pd.to_numeric(cleaned, errors="coerce").astype(float)
+        bad = ((cleaned != "") & values.isna()).to_numpy(dtype=bool)
+        if bad.any():
+            rejects.append(pd.DataFrame({"Row": raw.index[bad], "Column": col, "Value": raw[bad].astype(str).values}))
+        df[col] = values
+
+    rejects = pd.concat(rejects, ignore_index=True) if rejects else pd.DataFrame(columns=REJECT_COLUMNS)
+    return df, rejects
+
+
+def concat_rejects(rejects_by_table):
+    """Stack ``{table name: rejects}`` into one DataFrame with a leading Table column."""
+    frames = [r.assign(Table=name) for name, r in rejects_by_table.items() if not r.empty]
+    if not frames:
+        return pd.DataFrame(columns=["Table"] + REJECT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[["Table"] + REJECT_COLUMNS]
@@ -0,0 +1,509 @@
+"""Opal statement parser with learned-pattern fallback."""
+import copy
+import hashlib
+from bisect import bisect_left
+import pandas as pd
+import re
+import json
+import logging
+
+from extractors.numeric import concat_rejects, normalize_amounts
+from extractors.pdf_text import PageTexts, open_vendor_pdf
+
+logger = logging.getLogger(__name__)
+
+LEARNED_PATTERNS_FILE = "learned_patterns.json"
+# Qty. and Unit Price keep their unit text ("12.5 TO"); only the money columns are converted
+OPAL_AMOUNT_COLUMNS = ("Amount excl. GST", "GST", "Amount Incl. GST")
+
+# -----------------------------
+# Load learned patterns
+# -----------------------------
+def load_learned_patterns():
+    try:
+        with open(LEARNED_PATTERNS_FILE, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_learned_patterns(patterns):
+    with open(LEARNED_PATTERNS_FILE, "w") as f:
+        json.dump(patterns, f, indent=2)
+
+def learned_patterns_version(patterns):
+    """Content hash of a learned-patterns mapping (changes whenever a pattern is saved or edited)."""
+    return hashlib.sha256(json.dumps(patterns, sort_keys=True).encode("utf-8")).hexdigest()
+
+# -----------------------------
+# Tokenizer (shared with the learning widget)
+# -----------------------------
+def tokenize_line(line: str) -> str:
+    """Convert a line into the token signature learned patterns are keyed by."""
+    tokens = line.split()
+    return " ".join(
+        ["<NUM>" if t.replace(".", "").isdigit() else "<TXT>" for t in tokens]
+    )
+
+# -----------------------------
+# Line patterns
+# -----------------------------
+CUSTOMER_RE = re.compile(r"^(R-[A-Z0-9]+)\s+(.+)")
+# Every priced line starts with a dd.mm.yyyy date
+DATED_LINE_RE = re.compile(r"\d{2}\.\d{2}\.\d{4}\s")
+RENTAL_RE = re.compile(
+    r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+(\d{2}\.\d{2}\.\d{4} to \d{2}\.\d{2}\.\d{4})\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+(\w+)\s+([\d,\.]+)\s+([\d,\.]+)\s+([\d,\.]+) AUD"
+)
+FFS_QTY_WEIGHT_RE = re.compile(
+    r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+FFS - Qty/Weight\s+([\w\d/]+)\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+([\w\d\.]+)\s+([\d,\.]+)\s+([\d,\.]+)\s+([\d,\.]+) AUD"
+)
+FFS_QTY_TO_RE = re.compile(
+    r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+FFS - Qty/Weight\s+([\w\-\/]+)\s+([\d\.]+)\s+TO\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+) AUD"
+)
+FFS_LOAD_RE = re.compile(
+    r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+FFS - Load\s+([\w\-\.]+)\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+) AUD"
+)
+FRONT_LIFT_RE = re.compile(
+    r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+(\d{2}\.\d{2}\.\d{4} to \d{2}\.\d{2}\.\d{4})\s+(.+?)\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+) AUD"
+)
+PLASTIC_ROLL_RE = re.compile(
+    r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+FFS - Qty/Weight\s+([A-Z0-9]+)\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+)\s+AUD"
+)
+MANUAL_PRICE_RE = re.compile(r"(\d{2}\.\d{2}\.\d{4})\s+(.+?)\s+Manual Price\s+(.+)")
+MANUAL_PRICE_DETAIL_RE = re.compile(r"\d+\.?\d*\s+(TO\s+)?\d+\.?\d*")
+MANUAL_PRICE_TOTALS_RE = re.compile(r"([\d,\.]+)\s+([\d,\.]+)\s+([\d,\.]+)\s+AUD")
+MANUAL_PRICE_QTY_RE = re.compile(r"(\d+\.?\d*)\s+TO\s+([\d,\.]+)")
+MANUAL_PRICE_BILLED_QTY_RE = re.compile(r"Billed Qty\s+([\d\.]+)\s+TO")
+BILLED_QTY_RE = re.compile(r"Billed Qty\s+([\d\.]+)\s+(\w+)")
+UNPARSED_RE = re.compile(r"\d{2}\.\d{2}\.\d{4}.*AUD")
+INVOICE_NO_RE = re.compile(r"Invoice No\. (\d+)")
+TOTAL_PAYABLE_RE = re.compile(
+    r"Total Payable\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s+AUD", re.IGNORECASE
+)
+
+# -----------------------------
+# Row builders
+# -----------------------------
+def _billed_qty(lines, i):
+    billed_qty_line = lines[i + 1] if i + 1 < len(lines) else ""
+    billed_qty_match = BILLED_QTY_RE.search(billed_qty_line)
+    return f"{billed_qty_match.group(1)} {billed_qty_match.group(2)}" if billed_qty_match else ""
+
+def _rental_row(m, lines, i):
+    date, description, period, qty, qty_unit, unit_price, unit_unit, amt_excl_gst, gst, amt_incl_gst = m.groups()
+    return {
+        "Date": date, "Description": description,
+        "Charge Type/Period Reference": period, "Reference": "", "Billed qty": _billed_qty(lines, i),
+        "Qty.": f"{qty} {qty_unit}", "Unit Price": f"{unit_price} {unit_unit}",
+        "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
+    }
+
+def _ffs_qty_weight_row(m, lines, i):
+    date, description, reference, qty, qty_unit, unit_price, unit_unit, amt_excl_gst, gst, amt_incl_gst = m.groups()
+    return {
+        "Date": date, "Description": description,
+        "Charge Type/Period Reference": "FFS - Qty/Weight", "Reference": reference,
+        "Billed qty": _billed_qty(lines, i), "Qty.": f"{qty} {qty_unit}", "Unit Price": f"{unit_price} {unit_unit}",
+        "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
+    }
+
+def _ffs_qty_to_row(m, lines, i):
+    date, description, reference, val1, val2, qty_unit, billed_qty, unit_price, amt_incl_gst = m.groups()
+    gst = str(round(float(amt_incl_gst) - float(unit_price), 2))
+    amt_excl_gst = unit_price
+    billed_qty_full = f"{billed_qty} {qty_unit}"
+    return {
+        "Date": date,
+        "Description": description, "Charge Type/Period Reference": "FFS - Qty/Weight",
+        "Reference": reference, "Billed qty": billed_qty_full, "Qty.": f"{val1} TO {val2} {qty_unit}",
+        "Unit Price": unit_price, "Amount excl. GST": amt_excl_gst,
+        "GST": gst, "Amount Incl. GST": amt_incl_gst
+    }
+
+def _ffs_load_row(m, lines, i):
+    date, description, reference, qty, qty_unit, unit_price, gst, amt_incl_gst = m.groups()
+    amt_excl_gst = str(round(float(amt_incl_gst) - float(gst), 2))
+    return {
+        "Date": date,
+        "Description": description.strip(), "Charge Type/Period Reference": "FFS - Load",
+        "Reference": reference.strip(), "Billed qty": _billed_qty(lines, i),
+        "Qty.": f"{qty} {qty_unit}", "Unit Price": f"{unit_price}",
+        "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
+    }
+
+def _front_lift_row(m, lines, i):
+    date, description, period, ref_details, qty_val, qty_unit, unit_price_val, unit_price_unit, amt_excl_gst, gst, amt_incl_gst = m.groups()
+    billed_qty_full = f"{qty_val} {qty_unit}"
+    return {
+        "Date": date,
+        "Description": description.strip(), "Charge Type/Period Reference": period,
+        "Reference": ref_details.strip(), "Billed qty": billed_qty_full,
+        "Qty.": billed_qty_full, "Unit Price": f"{unit_price_val} {unit_price_unit}",
+        "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
+    }
+
+def _plastic_roll_row(m, lines, i):
+    date, description, reference, qty, qty_unit, unit_price, amt_excl_gst, gst, amt_incl_gst = m.groups()
+    billed_qty_full = f"{qty} {qty_unit}"
+    return {
+        "Date": date,
+        "Description": description.strip(), "Charge Type/Period Reference": "FFS - Qty/Weight",
+        "Reference": reference.strip(), "Billed qty": billed_qty_full,
+        "Qty.": billed_qty_full, "Unit Price": unit_price,
+        "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
+    }
+
+def _manual_price_row(lines, i):
+    """Manual Price lines spread their qty/totals over up to five following lines."""
+    date_match = MANUAL_PRICE_RE.match(lines[i])
+    if not date_match:
+        return None
+    date, desc1, desc2 = date_match.groups()
+    description_lines = [f"{desc1.strip()} {desc2.strip()}"]
+
+    lookahead = 1
+    while i + lookahead < len(lines) and lookahead <= 5:
+        next_line = lines[i + lookahead].strip()
+        if next_line == "":
+            break
+        if (MANUAL_PRICE_DETAIL_RE.search(next_line) or "AUD" in next_line or "Billed Qty" in next_line):
+            description_lines.append(next_line)
+        else:
+            break
+        lookahead += 1
+
+    full_block = " ".join(description_lines)
+
+    totals_match = MANUAL_PRICE_TOTALS_RE.search(full_block)
+    amt_excl_gst, gst, amt_incl_gst = totals_match.groups() if totals_match else ("", "", "")
+
+    qty_match = MANUAL_PRICE_QTY_RE.search(full_block)
+    qty = f"{qty_match.group(1)} TO" if qty_match else ""
+    unit_price = qty_match.group(2) if qty_match else ""
+
+    billed_qty_match = MANUAL_PRICE_BILLED_QTY_RE.search(full_block)
+    billed_qty = f"{billed_qty_match.group(1)} TO" if billed_qty_match else ""
+
+    return {
+        "Date": date,
+        "Description": "Manual Price - " + description_lines[0],
+        "Charge Type/Period Reference": "Manual Price",
+        "Reference": "", "Billed qty": billed_qty or qty,
+        "Qty.": qty, "Unit Price": unit_price,
+        "Amount excl. GST": amt_excl_gst, "GST": gst, "Amount Incl. GST": amt_incl_gst
+    }
+
+def compile_learned_patterns(learned_patterns):
+    """Index learned patterns by token signature, compiling each regex once.
+
+    Entries with a missing regex/field map or an invalid regex are skipped.
+    """
+    compiled = {}
+    for token_pattern, pattern_data in learned_patterns.items():
+        try:
+            regex = re.compile(pattern_data["regex"])
+            field_map = pattern_data["field_map"]
+        except (KeyError, re.error) as e:
+            logger.warning("Skipping learned pattern %r: %s", token_pattern, e)
+            continue
+        compiled[token_pattern] = (regex, field_map, pattern_data.get("Charge Type", ""))
+    return compiled
+
+def _learned_row(line, compiled_patterns, token_pattern=None):
+    entry = compiled_patterns.get(token_pattern or tokenize_line(line))
+    if entry is None:
+        return None
+    regex, field_map, charge_type = entry
+    match = regex.match(line)
+    if not match:
+        return None
+    groups = match.groups()
+    parsed = {"Charge Type/Period Reference": charge_type}
+
+    # ✅ Safe group lookup
+    for field, group_index in field_map.items():
+        if 0 < group_index <= len(groups):
+            parsed[field] = groups[group_index - 1]
+        else:
+            parsed[field] = ""  # fallback empty if invalid mapping
+    return parsed
+
+# Dated "... AUD" lines, in priority order. A pattern is only tried when all of
+# its literals occur on the line, so most lines reach one or two regexes.
+DATED_PATTERNS = [
+    (RENTAL_RE, (" to ",), _rental_row),
+    (FFS_QTY_WEIGHT_RE, ("FFS - Qty/Weight",), _ffs_qty_weight_row),
+    (FFS_QTY_TO_RE, ("FFS - Qty/Weight", "TO"), _ffs_qty_to_row),
+    (FFS_LOAD_RE, ("FFS - Load",), _ffs_load_row),
+    (FRONT_LIFT_RE, (" to ",), _front_lift_row),
+]
+
+# -----------------------------
+# Main PDF Processing
+# -----------------------------
+def scan_page_texts(page_texts, learned_patterns):
+    """Parse extracted page texts into a scan dict.
+
+    Besides ``invoice_no``, ``data``, ``missed_lines`` and ``totals`` the scan
+    keeps each row's (page, line index) position and, by token signature,
+    every line whose outcome depends on the learned patterns, with the
+    invoice/customer state at that line. ``relearn`` uses these to apply
+    changed patterns without parsing the PDF again.
+    """
+    compiled_patterns = compile_learned_patterns(learned_patterns)
+    invoice_no = ""
+    data = []
+    row_positions = []
+    missed_lines = []
+    missed_positions = []
+    learnable_lines = {}
+    customer = ""
+    full_text = []
+
+    for page_num, text in enumerate(page_texts, start=1):
+        full_text.append((text or "") + "\n")
+
+        # Extract invoice number
+        if not invoice_no and text and "Invoice No." in text:
+            match = INVOICE_NO_RE.search(text)
+            if match:
+                invoice_no = match.group(1)
+
+        if not text:
+            continue
+
+        lines = text.split("\n")
+
+        for i, line in enumerate(lines):
+            # ---------------- Customer ----------------
+            if line.startswith("R-"):
+                cust_match = CUSTOMER_RE.match(line)
+                if cust_match:
+                    customer = cust_match.group(1) + " " + cust_match.group(2).strip()
+                    continue
+
+            # ---------------- Rental / FFS / Front Lift ----------------
+            dated = DATED_LINE_RE.match(line) is not None
+            if dated and " AUD" in line:
+                row = None
+                for regex, literals, build_row in DATED_PATTERNS:
+                    if all(literal in line for literal in literals):
+                        m = regex.match(line)
+                        if m:
+                            row = build_row(m, lines, i)
+                            break
+                if row is not None:
+                    data.append({"Invoice No.": invoice_no, "Customer": customer, **row})
+                    row_positions.append((page_num, i))
+                    continue
+
+            # ---------------- Manual Price ----------------
+            if "Manual Price" in line:
+                try:
+                    row = _manual_price_row(lines, i)
+                except Exception:
+                    row = None
+                if row is not None:
+                    data.append({"Invoice No.": invoice_no, "Customer": customer, **row})
+                    row_positions.append((page_num, i))
+                continue
+
+            # From here on the outcome depends on the learned patterns: work out
+            # the fallbacks once and keep the line for relearn()
+            position = (page_num, i)
+            token_pattern = tokenize_line(line)
+
+            # ---------------- Fallback Plastic Rolls ----------------
+            fallback_row = None
+            if dated and "FFS - Qty/Weight" in line and "AUD" in line:
+                m = PLASTIC_ROLL_RE.match(line)
+                if m:
+                    fallback_row = {"Invoice No.": invoice_no, "Customer": customer, **_plastic_roll_row(m, lines, i)}
+
+            # ---------------- Unmatched ----------------
+            missed_line = None
+            if fallback_row is None and "AUD" in line and UNPARSED_RE.search(line):
+                missed_line = {
+                    "Page": page_num, "Line No.": i + 1, "Customer": customer,
+                    "Line": line, "Note": "Potential invoice data (unparsed)"
+                }
+
+            learnable_lines.setdefault(token_pattern, []).append(
+                (position, invoice_no, customer, line, fallback_row, missed_line)
+            )
+
+            # ---------------- Learned Patterns ----------------
+            row = _learned_row(line, compiled_patterns, token_pattern) if compiled_patterns else None
+            if row is not None:
+                data.append({"Invoice No.": invoice_no, "Customer": customer, **row})
+                row_positions.append(position)
+            elif fallback_row is not None:
+                data.append(fallback_row)
+                row_positions.append(position)
+            elif missed_line is not None:
+                missed_lines.append(missed_line)
+                missed_positions.append(position)
+
+    # ---------------- Totals ----------------
+    total_payable_matches = TOTAL_PAYABLE_RE.findall("".join(full_text))
+
+    totals = {}
+    if total_payable_matches:
+        excl_total = gst_total = incl_total = 0.0
+        for excl_str, gst_str, incl_str in total_payable_matches:
+            excl_total += float(excl_str.replace(",", ""))
+            gst_total += float(gst_str.replace(",", ""))
+            incl_total += float(incl_str.replace(",", ""))
+        totals = {
+            "Amount excl. GST": round(excl_total, 2),
+            "GST": round(gst_total, 2),
+            "Amount Incl. GST": round(incl_total, 2)
+        }
+
+    return {
+        "invoice_no": invoice_no,
+        "data": data,
+        "missed_lines": missed_lines,
+        "totals": totals,
+        "row_positions": row_positions,
+        "missed_positions": missed_positions,
+        "learnable_lines": learnable_lines,
+        "learned_patterns": copy.deepcopy(learned_patterns),
+    }
+
+def parse_page_texts(page_texts, learned_patterns):
+    """Parse extracted page texts; returns ``(invoice_no, data, missed_lines, totals)``."""
+    scan = scan_page_texts(page_texts, learned_patterns)
+    return scan["invoice_no"], scan["data"], scan["missed_lines"], scan["totals"]
+
+# -----------------------------
+# Incremental re-parse after learning
+# -----------------------------
+def _place(items, positions, position, item):
+    """Set the entry at ``position`` in a position-sorted list to ``item``, or remove it if None."""
+    index = bisect_left(positions, position)
+    present = index < len(positions) and positions[index] == position
+    if item is None:
+        if present:
+            del items[index]
+            del positions[index]
+    elif present:
+        items[index] = item
+    else:
+        items.insert(index, item)
+        positions.insert(index, position)
+
+def relearn(scan, learned_patterns):
+    """The scan ``scan_page_texts`` would return for ``learned_patterns``, derived from ``scan``.
+
+    Only lines whose token signature gained, lost or changed a pattern are
+    re-matched; their rows and unmatched entries are replaced in page order.
+    ``scan`` itself is left unchanged.
+    """
+    previous = scan["learned_patterns"]
+    changed = {
+        token_pattern for token_pattern in previous.keys() | learned_patterns.keys()
+        if previous.get(token_pattern) != learned_patterns.get(token_pattern)
+    }
+    if not changed:
+        return scan
+    compiled_patterns = compile_learned_patterns(
+        {token_pattern: learned_patterns[token_pattern] for token_pattern in changed if token_pattern in learned_patterns}
+    )
+
+    data, row_positions = list(scan["data"]), list(scan["row_positions"])
+    missed_lines, missed_positions = list(scan["missed_lines"]), list(scan["missed_positions"])
+    for token_pattern in changed:
+        for position, invoice_no, customer, line, fallback_row, missed_line in scan["learnable_lines"].get(token_pattern, ()):
+            row = _learned_row(line, compiled_patterns, token_pattern)
+            if row is not None:
+                row = {"Invoice No.": invoice_no, "Customer": customer, **row}
+            else:
+                row = fallback_row
+            _place(data, row_positions, position, row)
+            _place(missed_lines, missed_positions, position, missed_line if row is None else None)
+
+    return {
+        **scan,
+        "data": data,
+        "row_positions": row_positions,
+        "missed_lines": missed_lines,
+        "missed_positions": missed_positions,
+        "learned_patterns": copy.deepcopy(learned_patterns),
+    }
+
+def scan_pdf(file_stream, learned_patterns=None):
+    """``scan_page_texts`` for a PDF; keep the scan to ``relearn`` it after patterns change."""
+    if learned_patterns is None:
+        learned_patterns = load_learned_patterns()
+    with open_vendor_pdf(file_stream, "opal") as pdf:
+        return scan_page_texts(PageTexts(pdf), learned_patterns)
+
+def process_pdf(file_stream, learned_patterns=None):
+    scan = scan_pdf(file_stream, learned_patterns)
+    return scan["invoice_no"], scan["data"], scan["missed_lines"], scan["totals"]
+
+
+# -----------------------------
+# Invoice totals check
+# -----------------------------
+def invoice_totals_check(extracted_lines, invoice_totals, tolerance=0.05):
+    """Compare summed Amount Incl. GST against the invoice's Total Payable."""
+    df = pd.DataFrame(extracted_lines)
+    if df.empty:
+        return None
+
+    # Ensure Amount Incl. GST is numeric
+    df, _ = normalize_amounts(df, ("Amount Incl. GST",))
+
+    # Mark Manual Price lines
+    df['Is Manual Price'] = df['Charge Type/Period Reference'].str.contains("Manual Price", na=False)
+
+    actual_total = df["Amount Incl. GST"].sum()
+    expected_total = float(str(invoice_totals.get("Amount Incl. GST", 0)).replace(",", ""))
+    diff = actual_total - expected_total
+
+    return {
+        "expected_total": expected_total,
+        "actual_total": actual_total,
+        "difference": diff,
+        "within_tolerance": abs(diff) <= tolerance,
+        "manual_price_total": df.loc[df['Is Manual Price'], 'Amount Incl. GST'].sum(),
+    }
+
+# -----------------------------
+# Headless entry point
+# -----------------------------
+def parse(file_stream, learned_patterns=None, tolerance=0.05):
+    """Parse an Opal statement; see ``process_pdf`` for the row layout."""
+    return parse_result(*process_pdf(file_stream, learned_patterns), tolerance)
+
+def parse_result(invoice_no, data, missed_lines, totals, tolerance=0.05):
+    """The ``parse`` result dict (normalized amounts, rejects, tables) for already-parsed rows."""
+    data_df, rejects = normalize_amounts(pd.DataFrame(data), OPAL_AMOUNT_COLUMNS)
+    rejects = concat_rejects({"Invoice Data": rejects})
+
+    check = invoice_totals_check(data_df, totals, tolerance) if data and totals else None
+    if check is None:
+        reconciliation = {"status": "UNKNOWN"}
+    else:
+        reconciliation = {**check, "status": "MATCH" if check["within_tolerance"] else "MISMATCH"}
+
+    tables = {}
+    if data:
+        tables["Invoice Data"] = data_df
+    if missed_lines:
+        tables["Unmatched Lines"] = pd.DataFrame(missed_lines)
+    if totals:
+        tables["Invoice Totals"] = pd.DataFrame([totals])
+    if not rejects.empty:
+        tables["Rejected Values"] = rejects
+
+    return {
+        "invoice_no": invoice_no,
+        "data": data,
+        "missed_lines": missed_lines,
+        "totals": totals,
+        "reconciliation": reconciliation,
+        "rejects": rejects,
+        "tables": tables,
+    }
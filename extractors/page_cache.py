@@ -0,0 +1,156 @@
+"""Content-addressed on-disk cache of extracted page text, shared by all vendors.
+
+Entries are keyed by (SHA-256 of the PDF bytes, text backend, backend
+version, page index) and stored zlib-compressed in one SQLite file, so
+re-running an unchanged statement (after a site-name fix, a learned pattern
+or a regex change) reads its pages back without opening the PDF. Least
+recently used documents are evicted once the stored text exceeds the size
+limit.
+
+``INVOICE_PAGE_CACHE`` sets the database path (``off`` disables caching) and
+``INVOICE_PAGE_CACHE_MB`` the size limit.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "invoice-extractors", "page_text.sqlite")
+DEFAULT_MAX_MB = 512
+
+# Bumped whenever the tables change; older cache files are emptied and rebuilt
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    digest TEXT NOT NULL, backend TEXT NOT NULL, version TEXT NOT NULL,
+    n_pages INTEGER NOT NULL, last_used REAL NOT NULL, size INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (digest, backend, version)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    digest TEXT NOT NULL, backend TEXT NOT NULL, version TEXT NOT NULL,
+    page INTEGER NOT NULL, text BLOB NOT NULL,
+    PRIMARY KEY (digest, backend, version, page)
+);
+CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals VALUES (0, 0);
+"""
+DOCUMENT = "digest=? AND backend=? AND version=?"
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class PageTextCache:
+    """One connection to the cache file; use from a single thread (see ``get_cache``).
+
+    The stored text size is kept as a running total in the database, shared
+    by every process using the file, so eviction checks never scan the pages.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_MB * 2**20):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        # Autocommit: every stored page is visible to other processes at once
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("BEGIN IMMEDIATE")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            for table in ("documents", "pages", "totals"):
+                self._db.execute(f"DROP TABLE IF EXISTS {table}")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        for statement in SCHEMA.split(";"):
+            if statement.strip():
+                self._db.execute(statement)
+        self._db.execute("COMMIT")
+
+    def page_count(self, key):
+        """Page count recorded for ``key`` = (digest, backend, version), or None; marks it used."""
+        row = self._db.execute(f"SELECT n_pages FROM documents WHERE {DOCUMENT}", key).fetchone()
+        if row is None:
+            return None
+        self._db.execute(f"UPDATE documents SET last_used=? WHERE {DOCUMENT}", (time.time(), *key))
+        return row[0]
+
+    def add_document(self, key, n_pages):
+        self._db.execute(
+            "INSERT INTO documents (digest, backend, version, n_pages, last_used) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT DO UPDATE SET n_pages=excluded.n_pages, last_used=excluded.last_used",
+            (*key, n_pages, time.time()))
+
+    def get(self, key, page):
+        row = self._db.execute(f"SELECT text FROM pages WHERE {DOCUMENT} AND page=?", (*key, page)).fetchone()
+        return None if row is None else zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, key, page, text):
+        """Store a page of a document added with ``add_document``.
+
+        Pages of a document evicted in the meantime (by any process) are not
+        stored, so no page outlives its document row.
+        """
+        blob = zlib.compress(text.encode("utf-8"), 6)
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            if self._db.execute(f"UPDATE documents SET size=size+? WHERE {DOCUMENT}", (len(blob), *key)).rowcount \
+                    and self._db.execute("INSERT OR IGNORE INTO pages VALUES (?, ?, ?, ?, ?)",
+                                         (*key, page, blob)).rowcount:
+                self._db.execute("UPDATE totals SET size=size+?", (len(blob),))
+                self._db.execute("COMMIT")
+            else:
+                self._db.execute("ROLLBACK")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def size(self):
+        return self._db.execute("SELECT size FROM totals").fetchone()[0]
+
+    def evict(self):
+        """Drop least recently used documents until the stored text fits ``max_bytes``."""
+        if self.size() <= self.max_bytes:
+            return
+        self._db.execute("BEGIN IMMEDIATE")
+        excess = self.size() - self.max_bytes
+        for *key, size in self._db.execute(
+                "SELECT digest, backend, version, size FROM documents ORDER BY last_used").fetchall():
+            if excess <= 0:
+                break
+            self._db.execute(f"DELETE FROM pages WHERE {DOCUMENT}", key)
+            self._db.execute(f"DELETE FROM documents WHERE {DOCUMENT}", key)
+            self._db.execute("UPDATE totals SET size=size-?", (size,))
+            excess -= size
+        # Pages left without a document row (e.g. by an interrupted write) are never looked up again
+        self._db.execute(
+            "DELETE FROM pages WHERE NOT EXISTS (SELECT 1 FROM documents d WHERE d.digest=pages.digest "
+            "AND d.backend=pages.backend AND d.version=pages.version)")
+        self._db.execute("COMMIT")
+
+    def clear(self):
+        self._db.execute("BEGIN IMMEDIATE")
+        self._db.execute("DELETE FROM pages")
+        self._db.execute("DELETE FROM documents")
+        self._db.execute("UPDATE totals SET size=0")
+        self._db.execute("COMMIT")
+
+
+# sqlite3 connections may only be used by the thread that opened them, and
+# Streamlit runs every rerun on a new script thread: one cache per thread,
+# reopened in worker processes.
+_local = threading.local()
+
+
+def get_cache():
+    """This thread's cache per ``INVOICE_PAGE_CACHE``, or None when caching is off."""
+    path = os.environ.get("INVOICE_PAGE_CACHE", DEFAULT_PATH)
+    if not path or path.lower() == "off":
+        return None
+    cache = getattr(_local, "cache", None)
+    if cache is None or _local.pid != os.getpid() or cache.path != path:
+        max_mb = float(os.environ.get("INVOICE_PAGE_CACHE_MB", DEFAULT_MAX_MB))
+        cache = _local.cache = PageTextCache(path, int(max_mb * 2**20))
+        _local.pid = os.getpid()
+    return cache
@@ -0,0 +1,209 @@
+"""Per-document page-text layer shared by the vendor parsers.
+
+Text comes from one of two backends behind the same small interface
+(``len(doc)``, ``doc.page_text(i)``, ``close()``): pdfplumber, whose layout
+analysis the Wastedge-style parsers were written against, and PyMuPDF, which
+is much faster. ``VENDOR_BACKENDS`` picks one per vendor. Extracted text is
+kept in the on-disk page cache (``extractors.page_cache``), so unchanged PDFs
+are only extracted once.
+"""
+import io
+from itertools import repeat
+from multiprocessing.util import Finalize
+
+import fitz  # PyMuPDF
+import pdfplumber
+
+from extractors import page_cache
+
+# Text backend per vendor. Move a vendor to "pymupdf" only once
+# benchmarks/bench_text_backends.py reports no row differences for it.
+VENDOR_BACKENDS = {
+    "aps": "pdfplumber",
+    "opal": "pdfplumber",
+    "csc": "pdfplumber",
+    "ironmountain": "pdfplumber",
+    "veolia": "pymupdf",
+    "remondis": "pdfplumber",
+}
+
+
+def pdf_source(pdf_input):
+    """File path or raw bytes for ``open_pdf``; file-like inputs are read once."""
+    if hasattr(pdf_input, "read"):  # Streamlit UploadedFile / BytesIO
+        return pdf_input.read()
+    return pdf_input  # local path or already bytes
+
+
+class _Document:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PdfplumberDocument(_Document):
+    def __init__(self, source):
+        self._pdf = pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+        self._pages = self._pdf.pages
+
+    def __len__(self):
+        return len(self._pages)
+
+    def page_text(self, index):
+        page = self._pages[index]
+        text = page.extract_text() or ""
+        # Only the text is kept; drop the page's cached chars and layout objects
+        page.close()
+        return text
+
+    def close(self):
+        self._pdf.close()
+
+
+class PyMuPDFDocument(_Document):
+    def __init__(self, source):
+        source = pdf_source(source)
+        if isinstance(source, str):
+            self._doc = fitz.open(source)
+        else:
+            self._doc = fitz.open(stream=source, filetype="pdf")
+
+    def __len__(self):
+        return self._doc.page_count
+
+    def page_text(self, index):
+        return self._doc[index].get_text("text")
+
+    def close(self):
+        self._doc.close()
+
+
+BACKENDS = {"pdfplumber": PdfplumberDocument, "pymupdf": PyMuPDFDocument}
+# Part of the cache key, so upgrading a backend re-extracts instead of reusing its old text
+BACKEND_VERSIONS = {"pdfplumber": pdfplumber.__version__, "pymupdf": fitz.VersionBind}
+
+
+class CachedDocument(_Document):
+    """A backend document behind the page-text cache.
+
+    The PDF itself is only opened on the first page missing from the cache, so
+    a fully cached document is read back without any text extraction.
+    """
+
+    def __init__(self, source, backend, cache):
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                source = f.read()
+        else:
+            source = pdf_source(source)
+        self._source = source
+        self._backend = backend
+        self._cache = cache
+        self._key = (page_cache.digest(source), backend, BACKEND_VERSIONS[backend])
+        self._doc = None
+        self._n_pages = cache.page_count(self._key)
+        if self._n_pages is None:
+            self._n_pages = len(self._open())
+            cache.add_document(self._key, self._n_pages)
+
+    def _open(self):
+        if self._doc is None:
+            self._doc = BACKENDS[self._backend](self._source)
+        return self._doc
+
+    def __len__(self):
+        return self._n_pages
+
+    def page_text(self, index):
+        text = self._cache.get(self._key, index)
+        if text is None:
+            text = self._open().page_text(index)
+            self._cache.put(self._key, index, text)
+        return text
+
+    def close(self):
+        if self._doc is not None:
+            self._doc.close()
+        self._cache.evict()
+
+
+def open_pdf(source, backend="pdfplumber"):
+    """Open a file path, raw bytes or binary file object with the named text backend.
+
+    Pages are served from the page-text cache when it is enabled.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown text backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+    cache = page_cache.get_cache()
+    if cache is None:
+        return BACKENDS[backend](source)
+    return CachedDocument(source, backend, cache)
+
+
+def open_vendor_pdf(source, vendor):
+    """``open_pdf`` with the backend configured for ``vendor`` in ``VENDOR_BACKENDS``."""
+    return open_pdf(source, VENDOR_BACKENDS[vendor])
+
+
+class PageTexts:
+    """Per-document page-text layer: each page's text is extracted at most once."""
+
+    def __init__(self, doc):
+        self._doc = doc
+        self._texts = [None] * len(doc)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __getitem__(self, index):
+        if self._texts[index] is None:
+            self._texts[index] = self._doc.page_text(index)
+        return self._texts[index]
+
+    def __iter__(self):
+        """Stream page texts in order, extracting lazily on first access."""
+        for index in range(len(self._texts)):
+            yield self[index]
+
+    def full_text(self):
+        return "\n".join(text for text in self if text)
+
+
+# ---------------------------
+# Page-range extraction across processes
+# ---------------------------
+# Per-worker document, opened once by init_page_text_worker
+_worker_texts = None
+
+
+def page_count(source, backend="pdfplumber"):
+    with open_pdf(source, backend) as doc:
+        return len(doc)
+
+
+def init_page_text_worker(source, backend="pdfplumber"):
+    """Pool initializer: open ``source`` once per worker process, closed when the worker exits."""
+    global _worker_texts
+    doc = open_pdf(source, backend)
+    _worker_texts = PageTexts(doc)
+    Finalize(None, doc.close, exitpriority=0)
+
+
+def extract_page_range(start, stop, page_func=None):
+    texts = [_worker_texts[i] for i in range(start, stop)]
+    return texts if page_func is None else [page_func(text) for text in texts]
+
+
+def map_page_texts(executor, n_pages, workers, page_func=None):
+    """All page texts, extracted in page ranges by an executor initialized with ``init_page_text_worker``.
+
+    With ``page_func`` (a picklable, module-level function) each page's
+    ``page_func(text)`` is returned instead, computed in the worker.
+    """
+    chunk = max(1, -(-n_pages // (workers * 4)))
+    starts = range(0, n_pages, chunk)
+    stops = [min(start + chunk, n_pages) for start in starts]
+    results = executor.map(extract_page_range, starts, stops, repeat(page_func))
+    return [result for page_results in results for result in page_results]
@@ -0,0 +1,383 @@
+"""Remondis (Wastedge) tax invoice parser."""
+import pandas as pd
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from extractors.numeric import concat_rejects, normalize_amounts
+from extractors.pdf_text import (
+    VENDOR_BACKENDS, PageTexts, init_page_text_worker, map_page_texts, open_vendor_pdf, page_count,
+)
+
+
+def _no_progress(message):
+    pass
+
+
+# Rows are stored once in a columnar item table; each row points at a snapshot
+# of the invoice header fields it was read under. Line Items and Bookings are
+# column subsets of the joined table.
+ITEM_COLUMNS = ["Date", "Ref No", "Description", "PO", "Qty", "Price", "Total", "Charge Type"]
+ROW_HEADER_FIELDS = {
+    "Invoice Number": "Tax Invoice",
+    "Account Number": "Account Number",
+    "Service Site": "Service Site",
+    "Invoice Date": "Invoice Date",
+}
+LINE_ITEM_COLUMNS = ["Invoice Number"] + ITEM_COLUMNS
+BOOKING_COLUMNS = list(ROW_HEADER_FIELDS) + ITEM_COLUMNS
+
+
+def _empty_items():
+    return {col: [] for col in ["Header"] + ITEM_COLUMNS}
+
+
+def split_invoice_chunks(page_texts):
+    """``(start, stop)`` page ranges; every page containing "Tax Invoice" starts a new chunk."""
+    invoice_chunks = []
+    chunk_start = 0
+    for i, text in enumerate(page_texts):
+        if "Tax Invoice" in text and i > chunk_start:
+            invoice_chunks.append((chunk_start, i))
+            chunk_start = i
+    if page_texts:
+        invoice_chunks.append((chunk_start, len(page_texts)))
+    return invoice_chunks
+
+
+def parse_invoice_chunk(chunk):
+    """Parse the page texts of one invoice chunk.
+
+    Returns ``(merge_header, header, items, row_headers)``: the header read from
+    the first page, the same header after footers on later pages updated it, the
+    chunk's rows as columns (see ``ITEM_COLUMNS``) and the header field snapshots
+    their ``Header`` column indexes. Depends only on ``chunk``, so chunks can be
+    parsed in any process; ``merge_chunk_results`` combines them in order.
+    """
+    items = _empty_items()
+    row_headers = []
+    current_header = None
+
+    def add_item(*values):
+        nonlocal current_header
+        if current_header is None:
+            row_headers.append({col: header.get(key, "") for col, key in ROW_HEADER_FIELDS.items()})
+            current_header = len(row_headers) - 1
+        items["Header"].append(current_header)
+        for col, value in zip(ITEM_COLUMNS, values):
+            items[col].append(value)
+
+    text = chunk[0]
+    lines = text.splitlines()
+    header = {}
+
+    # --- Extract invoice header info ---
+    footer_line = next((l for l in lines if re.search(r"Tax Invoice:.*Invoice Date:.*Acc:", l)), None)
+    if footer_line:
+        invoice_match = re.search(r"Tax Invoice:\s*(\d+)", footer_line)
+        date_match = re.search(r"Invoice Date:\s*([0-9/]+)", footer_line)
+        acc_match = re.search(r"Acc:\s*([\d.]+)", footer_line)
+        name_match = re.search(r"Acc:\s*[\d.]+\s+(.*)", footer_line)
+
+        if invoice_match:
+            header["Tax Invoice"] = invoice_match.group(1)
+        if date_match:
+            header["Invoice Date"] = date_match.group(1)
+        if acc_match:
+            header["Account Number"] = acc_match.group(1).split('.')[0]
+        if name_match:
+            header["Customer Name"] = name_match.group(1).strip()
+
+    try:
+        cust_idx = next(
+            i for i, l in enumerate(lines)
+            if ("PTY LTD" in l or "UNIT TRUST" in l)
+            and "REMONDIS" not in l
+            and not l.strip().startswith("Page:")
+        )
+        header["Customer Name"] = lines[cust_idx].strip()
+    except StopIteration:
+        header.setdefault("Customer Name", "")
+
+    if "Tax Invoice" not in header or not header["Tax Invoice"]:
+        match = re.search(r"Tax Invoice\s+(\d+)", text)
+        if match:
+            header["Tax Invoice"] = match.group(1)
+
+    acc = re.search(r"Account Number\s+([\d.]+)", text)
+    if acc:
+        header["Account Number"] = acc.group(1).split('.')[0]
+
+    bill = re.search(r"Billing Period\s+([0-9/]+ to [0-9/]+)", text)
+    header["Billing Period"] = bill.group(1) if bill else ""
+
+    date = re.search(r"Invoice Date\s+([0-9/]+)", text)
+    if date:
+        header["Invoice Date"] = date.group(1)
+
+    total = re.search(r"Total\s+\$([0-9.,]+)", text)
+    header["Total Amount"] = total.group(1) if total else ""
+
+    site = re.search(r"Services\s*/\s*Site:\s+([A-Za-z0-9.]+)", text)
+    header["Service Site"] = site.group(1) if site else ""
+
+    # Header as merged into the invoice list; later footers keep updating ``header`` itself
+    merge_header = dict(header)
+
+    # --- Parse line items ---
+    skip_next = False
+    for idx_page, text in enumerate(chunk):
+        lines = text.splitlines()
+
+        if idx_page != 0:
+            footer_line = next((l for l in lines if re.search(r"Tax Invoice:.*Invoice Date:.*Acc:", l)), None)
+            if footer_line:
+                invoice_match = re.search(r"Tax Invoice:\s*(\d+)", footer_line)
+                date_match = re.search(r"Invoice Date:\s*([0-9/]+)", footer_line)
+                acc_match = re.search(r"Acc:\s*([\d.]+)", footer_line)
+                name_match = re.search(r"Acc:\s*[\d.]+\s+(.*)", footer_line)
+
+                if invoice_match:
+                    header["Tax Invoice"] = invoice_match.group(1)
+                if date_match:
+                    header["Invoice Date"] = date_match.group(1)
+                if acc_match:
+                    header["Account Number"] = acc_match.group(1).split('.')[0]
+                if name_match:
+                    header["Customer Name"] = name_match.group(1).strip()
+                current_header = None
+
+        for i, line in enumerate(lines):
+            if skip_next:
+                skip_next = False
+                continue
+
+            line = line.strip()
+
+            # --- Rental / Period Charges ---
+            if line.startswith("Site:"):
+                raw_text = line.strip()
+                raw_text = re.split(r"\b(Total:|Totals|Page:|Tax Invoice:)", raw_text)[0].strip()
+
+                qty, price, total_val = "", "", ""
+
+                # Try inline match first
+                match_inline = re.search(r"(\d+)\s*\$([\d.,]+)\s*\$([\d.,]+)", raw_text)
+                if match_inline:
+                    qty, price, total_val = match_inline.groups()
+                    description = raw_text[:match_inline.start()].strip()
+                else:
+                    description = raw_text
+                    j = i + 1
+                    while j < len(lines):
+                        next_line = lines[j].strip()
+                        if re.match(r"(Totals|Total:|Page:|Tax Invoice:)", next_line):
+                            break
+                        match_rental = re.match(r"(\d+)\s*x?\s*(\d*)\s*\$([\d.,]+)\s*\$([\d.,]+)\s*(.*)", next_line)
+                        if match_rental:
+                            units, qty2, price, total_val, extra = match_rental.groups()
+                            qty = qty2 if qty2 else units
+                            if extra.strip():
+                                description += " " + extra.strip()
+                            skip_next = True
+                            break
+                        else:
+                            description += " " + next_line
+                        j += 1
+
+                add_item("", "", description.strip(), "", qty, price, total_val, "Rental")
+                continue
+
+            # --- Booking / Disposal Lines ---
+            clean_line = re.split(r"\b(Totals|Total:|Page:|Tax Invoice:)", line)[0].strip()
+
+            match_booking = re.match(
+                r"^(\d{2}/\d{2}/\d{2})\s+([\d.]+)\s+(.+?)\s+(\d+)\s+\$([\d.,]+)\s+\$([\d.,]+)",
+                clean_line
+            )
+            match_disposal = re.match(
+                r"^(\d{2}/\d{2}/\d{2})\s+([\d.]+)\s+(.+?)\s+([\d.,]+)\s+\w+\s+([\d.,]+)\s+\$([\d.,]+)\s+\$([\d.,]+)",
+                clean_line
+            )
+
+            if match_booking:
+                date_, ref_no, description, po, price, total_val = match_booking.groups()
+                qty = "1"
+                charge_type = "Booking"
+            elif match_disposal:
+                date_, ref_no, description, qty1, qty2, price, total_val = match_disposal.groups()
+                po = ""
+                qty = qty2
+                charge_type = "Disposal"
+            else:
+                continue
+
+            add_item(date_, ref_no, description.strip(), po, qty, price, total_val, charge_type)
+
+    return merge_header, header, items, row_headers
+
+
+def merge_chunk_results(chunk_results):
+    """Combine ``parse_invoice_chunk`` results in chunk order into headers, items and row headers."""
+    all_headers_dict = {}
+    all_items = _empty_items()
+    all_row_headers = []
+
+    for merge_header, header, items, row_headers in chunk_results:
+        invoice_no = merge_header.get("Tax Invoice")
+        if invoice_no:
+            if invoice_no not in all_headers_dict:
+                # The chunk's own header is kept, including updates from its later pages' footers
+                all_headers_dict[invoice_no] = header
+            else:
+                for key, val in merge_header.items():
+                    if not all_headers_dict[invoice_no].get(key) and val:
+                        all_headers_dict[invoice_no][key] = val
+        offset = len(all_row_headers)
+        all_items["Header"].extend(h + offset for h in items["Header"])
+        for col in ITEM_COLUMNS:
+            all_items[col].extend(items[col])
+        all_row_headers.extend(row_headers)
+
+    return all_headers_dict, all_items, all_row_headers
+
+
+def item_table(items, row_headers):
+    """One DataFrame of all rows with their header fields joined from ``row_headers``."""
+    if not items["Header"]:
+        return pd.DataFrame()
+    header_df = pd.DataFrame(row_headers, columns=list(ROW_HEADER_FIELDS)).take(items["Header"])
+    header_df = header_df.reset_index(drop=True)
+    return pd.concat([header_df, pd.DataFrame({col: items[col] for col in ITEM_COLUMNS})], axis=1)
+
+
+def item_views(items_df):
+    """``(lines_df, bookings_df)`` as column subsets of the joined item table."""
+    if items_df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    return items_df[LINE_ITEM_COLUMNS], items_df[BOOKING_COLUMNS]
+
+
+GST_RATE = 0.10
+
+
+def validate_invoices(headers_df, bookings_df):
+    """Check each invoice's Total Amount against its booking totals plus 10% GST."""
+    if bookings_df.empty or headers_df.empty:
+        return pd.DataFrame()
+    booking_sums = bookings_df.groupby("Invoice Number")["Total"].sum()
+    # Headers without an invoice number match no bookings; a missing total counts as 0.
+    invoice_no = headers_df.get("Tax Invoice", pd.Series(None, index=headers_df.index, dtype=object))
+    expected_total = headers_df.get("Total Amount", pd.Series(0, index=headers_df.index))
+    sum_total = invoice_no.map(booking_sums).fillna(0)
+    sum_with_gst = sum_total * (1 + GST_RATE)
+    return pd.DataFrame({
+        "Invoice Number": invoice_no,
+        "Expected Total": expected_total,
+        "Sum of Bookings": sum_total,
+        "Sum with GST (10%)": sum_with_gst,
+        "Valid": expected_total.isna() | ((sum_with_gst - expected_total).abs() < 0.01),
+    }).reset_index(drop=True)
+
+
+def extract_invoice_data(pdf_file, progress=None, workers=1):
+    """Parse a Remondis PDF; ``progress(message)`` receives status updates if given.
+
+    With ``workers`` > 1, page text extraction and invoice chunk parsing run in
+    a process pool; the merged output is the same as the sequential parse.
+    """
+    progress = progress or _no_progress
+    progress("Starting extraction...")
+
+    if workers > 1:
+        source = pdf_file.read() if hasattr(pdf_file, "read") else pdf_file
+        backend = VENDOR_BACKENDS["remondis"]
+        total_pages = page_count(source, backend)
+        progress(f"PDF opened, total pages: {total_pages}, reading with {workers} workers...")
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_page_text_worker,
+                                 initargs=(source, backend)) as executor:
+            page_texts = map_page_texts(executor, total_pages, workers)
+            invoice_chunks = split_invoice_chunks(page_texts)
+            progress(f"Found {len(invoice_chunks)} invoice chunks, processing...")
+            chunk_results = list(executor.map(
+                parse_invoice_chunk,
+                [page_texts[start:stop] for start, stop in invoice_chunks],
+                chunksize=max(1, len(invoice_chunks) // (workers * 4)),
+            ))
+    else:
+        # Each page's text is extracted once and the page released; chunks are page ranges
+        with open_vendor_pdf(pdf_file, "remondis") as pdf:
+            total_pages = len(pdf)
+            progress(f"PDF opened, total pages: {total_pages}")
+            page_texts = []
+            for i, text in enumerate(PageTexts(pdf)):
+                page_texts.append(text)
+                progress(f"Reading page {i + 1} of {total_pages}...")
+
+        invoice_chunks = split_invoice_chunks(page_texts)
+        progress(f"Found {len(invoice_chunks)} invoice chunks, processing...")
+        chunk_results = []
+        for idx, (start, stop) in enumerate(invoice_chunks, 1):
+            progress(f"Processing invoice chunk {idx} of {len(invoice_chunks)}...")
+            chunk_results.append(parse_invoice_chunk(page_texts[start:stop]))
+
+    all_headers_dict, all_items, all_row_headers = merge_chunk_results(chunk_results)
+
+    # --- Create DataFrames ---
+    headers_df = pd.DataFrame(list(all_headers_dict.values()))
+    items_df = item_table(all_items, all_row_headers)
+
+    # --- Clean numeric columns ---
+    headers_df, header_rejects = normalize_amounts(headers_df, ("Total Amount",))
+    items_df, item_rejects = normalize_amounts(items_df, ("Qty", "Price", "Total"))
+    # Line Items and Bookings share their rows, so they share their rejects too
+    rejects = concat_rejects({
+        "Invoice Headers": header_rejects,
+        "Line Items": item_rejects,
+        "Bookings": item_rejects,
+    })
+    lines_df, bookings_df = item_views(items_df)
+
+    # --- Invoice Validation with 10% GST ---
+    validation_df = validate_invoices(headers_df, bookings_df)
+
+    # --- Output file name ---
+    billing_periods = {h.get("Billing Period", "") for h in all_headers_dict.values() if h.get("Billing Period")}
+    if billing_periods:
+        safe_periods = "_".join(bp.replace(" ", "").replace("/", "-") for bp in billing_periods)
+        output_file = f"Remondis_Invoice_Data_{safe_periods}.xlsx"
+    else:
+        output_file = "Remondis_Invoice_Data.xlsx"
+
+    return headers_df, lines_df, bookings_df, validation_df, rejects, output_file
+
+
+def parse(pdf_file, progress=None, workers=1):
+    """Headless entry point returning the Remondis tables and validation status."""
+    headers_df, lines_df, bookings_df, validation_df, rejects, output_file = extract_invoice_data(
+        pdf_file, progress, workers
+    )
+
+    if validation_df.empty:
+        status = "UNKNOWN"
+    else:
+        status = "MATCH" if validation_df["Valid"].all() else "MISMATCH"
+
+    tables = {
+        "Invoice Headers": headers_df,
+        "Line Items": lines_df,
+        "Bookings": bookings_df,
+        "Validation": validation_df,
+    }
+    if not rejects.empty:
+        tables["Rejected Values"] = rejects
+
+    return {
+        "headers_df": headers_df,
+        "lines_df": lines_df,
+        "bookings_df": bookings_df,
+        "validation_df": validation_df,
+        "output_file": output_file,
+        "reconciliation": {"status": status},
+        "rejects": rejects,
+        "tables": tables,
+    }
@@ -0,0 +1,120 @@
+"""In-memory cache of parse results across Streamlit reruns.
+
+Streamlit reruns the whole app script on every widget interaction. The apps
+look their upload up here instead of parsing it again. Entries are keyed by
+the PDF's SHA-256, the vendor module, a hash of every source file in the
+``extractors`` package (the parser version, which covers shared helpers such
+as ``numeric`` and ``pdf_text``) and any extra versions the app passes, such
+as the Opal learned patterns.
+The cache lives at module level, so it survives reruns and is shared by the
+sessions of one server process. Least recently used entries are evicted once
+the estimated size of the stored results exceeds ``INVOICE_RESULT_CACHE_MB``
+(default 1024).
+"""
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_MAX_MB = 1024
+
+
+def approx_size(obj):
+    """Rough in-memory size of a parse result: DataFrames, containers and scalars."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(approx_size(k) + approx_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(approx_size(item) for item in obj)
+    return sys.getsizeof(obj)
+
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_package_version = (None, None)  # (file stat signature, digest)
+
+
+def package_version():
+    """SHA-256 over the ``extractors`` package sources; editing any parser or shared helper changes it.
+
+    The files are only re-read when one's size or modification time changes.
+    """
+    global _package_version
+    paths = sorted(os.path.join(PACKAGE_DIR, name) for name in os.listdir(PACKAGE_DIR) if name.endswith(".py"))
+    signature = tuple((path, os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in paths)
+    if _package_version[0] != signature:
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _package_version = (signature, digest.hexdigest())
+    return _package_version[1]
+
+
+class ResultCache:
+    """Size-capped LRU mapping; ``get_or_compute`` is safe to call from concurrent sessions."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+        # Computed outside the lock so one long parse does not block other sessions
+        value = compute()
+        size = approx_size(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+_cache = None
+
+
+def shared_cache():
+    global _cache
+    if _cache is None:
+        max_mb = float(os.environ.get("INVOICE_RESULT_CACHE_MB", DEFAULT_MAX_MB))
+        _cache = ResultCache(int(max_mb * 2**20))
+    return _cache
+
+
+def cached_result(module, pdf_bytes, compute, *versions):
+    """``compute()`` for this upload, or its cached value from an earlier rerun.
+
+    ``module`` is the vendor module doing the parse; ``versions`` are extra
+    hashable values the result depends on. The returned value is shared with
+    later reruns and must not be modified in place.
+    """
+    key = (module.__name__, hashlib.sha256(pdf_bytes).hexdigest(), package_version(), *versions)
+    return shared_cache().get_or_compute(key, compute)
@@ -0,0 +1,97 @@
+"""Vendor auto-detection from the first page of an invoice PDF.
+
+Only page one is read (PyMuPDF, a few milliseconds even for long statements)
+and matched against literal markers each vendor prints there; vendor modules
+are imported only once the vendor is known.
+"""
+import io
+import re
+
+import fitz  # PyMuPDF
+
+from extractors import VENDORS, load_vendor
+
+# Checked in order; the first vendor whose fingerprint matches wins. APS, CSC
+# and Remondis are all Wastedge statements, so the more specific markers
+# (REMONDIS footer, CSC's "name - address - city STATE postcode" site
+# headers, matched within one line so an APS header followed by a postcode
+# line does not pass) come before the generic Wastedge ones. Fingerprints use
+# layout text the vendor prints, never customer names.
+FINGERPRINTS = [
+    ("remondis", re.compile(r"REMONDIS")),
+    ("ironmountain", re.compile(r"Account ID:|Level 2 Account")),
+    ("opal", re.compile(r"Invoice No\.[\s\S]*\sAUD$", re.MULTILINE)),
+    ("veolia", re.compile(r"Total Inc GST")),
+    ("csc", re.compile(r"Services[ \t]*/[ \t]*Site:[ \t]*\d+\.\d+[ \t]+.+?[ \t]-[ \t].+?[ \t]-[ \t].+?[ \t][A-Z]{2,3}[ \t]*\d{4}\b")),
+    ("aps", re.compile(r"Total\s*\(Excl\.?GST\)|Services\s*/\s*Site:", re.IGNORECASE)),
+    ("csc", re.compile(r"Powered by wastedge", re.IGNORECASE)),
+]
+
+# Vendor names and their Streamlit apps, for wrong-upload messages
+VENDOR_NAMES = {
+    "aps": "APS", "opal": "Opal", "csc": "CSC",
+    "ironmountain": "Iron Mountain", "veolia": "Veolia", "remondis": "Remondis",
+}
+APPS = {
+    "aps": "parser.py", "opal": "Opal.py", "csc": "CSC_Invoice_Extraction.py",
+    "ironmountain": "IronMountainApp.py", "veolia": "NewVeolia.py", "remondis": "Remondis-App.py",
+}
+
+
+def first_page_text(pdf_input):
+    """Text of page one. Accepts a path, bytes or a file-like object, whose position is left unchanged."""
+    if isinstance(pdf_input, str):
+        doc = fitz.open(pdf_input)
+    else:
+        if hasattr(pdf_input, "getvalue"):  # BytesIO / Streamlit UploadedFile
+            data = pdf_input.getvalue()
+        elif hasattr(pdf_input, "read"):
+            pos = pdf_input.tell()
+            data = pdf_input.read()
+            pdf_input.seek(pos)
+        else:
+            data = pdf_input
+        doc = fitz.open(stream=data, filetype="pdf")
+    with doc:
+        return doc[0].get_text("text") if doc.page_count else ""
+
+
+def detect_vendor_text(text):
+    """Vendor key (see ``extractors.VENDORS``) whose fingerprint matches ``text``, or None."""
+    for vendor, fingerprint in FINGERPRINTS:
+        if fingerprint.search(text):
+            return vendor
+    return None
+
+
+def detect_vendor(pdf_input):
+    """Vendor key for a PDF, or None when no fingerprint matches its first page."""
+    return detect_vendor_text(first_page_text(pdf_input))
+
+
+def wrong_upload_message(pdf_input, expected):
+    """Message for an app expecting ``expected`` when the PDF is recognisably another vendor's, else None.
+
+    PDFs that match no fingerprint pass, so unfamiliar layouts still reach the parser.
+    """
+    vendor = detect_vendor(pdf_input)
+    if vendor is None or vendor == expected:
+        return None
+    return (f"This PDF looks like a {VENDOR_NAMES[vendor]} invoice, not {VENDOR_NAMES[expected]}. "
+            f"Please use the {VENDOR_NAMES[vendor]} extractor ({APPS[vendor]}).")
+
+
+def route(pdf_input, vendor_kwargs=None):
+    """Detect the vendor and parse with its module.
+
+    ``vendor_kwargs`` maps vendor keys to extra ``parse`` arguments (e.g.
+    ``{"aps": {"master_site_names": [...]}}``). Returns ``(vendor, result)``;
+    raises ValueError when the vendor cannot be recognised.
+    """
+    vendor = detect_vendor(pdf_input)
+    if vendor is None:
+        raise ValueError(f"Could not recognise the invoice vendor; choose one of: {', '.join(VENDORS)}")
+    if isinstance(pdf_input, bytes):
+        pdf_input = io.BytesIO(pdf_input)  # every parse() accepts a binary file object
+    kwargs = (vendor_kwargs or {}).get(vendor, {})
+    return vendor, load_vendor(vendor).parse(pdf_input, **kwargs)
@@ -0,0 +1,403 @@
+"""Veolia invoice parser (PyMuPDF text extraction by default)."""
+import re
+import pandas as pd
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+
+from extractors.numeric import concat_rejects, normalize_amounts
+from extractors.pdf_text import (
+    VENDOR_BACKENDS, PageTexts, init_page_text_worker, map_page_texts, open_vendor_pdf, page_count, pdf_source,
+)
+
+# ---------------------------
+# Extract text from PDF
+# ---------------------------
+def extract_text_from_pdf(pdf_input):
+    """
+    Accepts:
+      - str (file path)
+      - BytesIO / raw bytes
+      - Streamlit UploadedFile
+    """
+    with open_vendor_pdf(pdf_source(pdf_input), "veolia") as doc:
+        return list(PageTexts(doc))
+
+
+# ---------------------------
+# Line index over a page
+# ---------------------------
+def line_index(text):
+    """``(lines, starts)``: ``text.splitlines()`` and the offset in ``text`` where each line starts."""
+    lines = text.splitlines()
+    starts = list(accumulate((len(l) for l in text.splitlines(keepends=True)), initial=0))[:-1]
+    return lines, starts
+
+
+def lines_before(lines, starts, pos, n):
+    """Last ``n`` lines of ``text[:pos].splitlines()``, without copying the prefix."""
+    k = bisect_right(starts, pos) - 1
+    if k < 0:
+        return []
+    before = lines[max(0, k - n):k]
+    if pos > starts[k]:
+        before.append(lines[k][:pos - starts[k]])
+    return before[-n:]
+
+
+def lines_between(lines, starts, start, end):
+    """``text[start:end].splitlines()`` for a span starting and ending inside line content."""
+    first = bisect_right(starts, start) - 1
+    last = bisect_right(starts, end) - 1
+    if first == last:
+        return [lines[first][start - starts[first]:end - starts[first]]]
+    return (
+        [lines[first][start - starts[first]:]]
+        + lines[first + 1:last]
+        + [lines[last][:end - starts[last]]]
+    )
+
+# ---------------------------
+# Extract Customer & Address
+# ---------------------------
+def extract_customer_address(text):
+    """Prefer SECOND block (site address), fallback to FIRST block."""
+    lines = text.splitlines()
+    customer, address = "", ""
+
+    # Site address block usually appears after invoice header
+    for i, line in enumerate(lines):
+        if line.strip().upper().startswith("SITE ADDRESS") and i + 1 < len(lines):
+            # capture next 2–3 lines as address
+            addr_lines = []
+            for j in range(i + 1, len(lines)):
+                next_line = lines[j].strip()
+                if not next_line:
+                    break
+                addr_lines.append(next_line)
+                if re.search(r"\b(?:VIC|NSW|QLD|TAS|WA|SA|NT|ACT)\b\s*\d{3,4}", next_line):
+                    break
+
+            address = " ".join(addr_lines).strip()
+            customer = lines[i + 1].strip() if addr_lines else ""
+            return customer, address
+
+    # fallback: detect customer name + address in top block
+    cust_addr_match = re.search(
+        r"([A-Za-z0-9 \-/&]+)\n([\d]+ .+?\s(?:VIC|TAS|NSW|QLD|WA|SA|NT|ACT)\s*\d{3,4})",
+        text,
+    )
+    if cust_addr_match:
+        customer = cust_addr_match.group(1).strip()
+        address = cust_addr_match.group(2).replace("\n", ", ").strip()
+    return customer, address
+
+# ---------------------------
+# Split Reference vs Service
+# ---------------------------
+def split_reference_and_service(desc):
+    desc = desc.strip()
+    tokens = desc.split(maxsplit=1)
+    if not tokens:
+        return "", desc
+
+    first, rest = tokens[0], tokens[1] if len(tokens) > 1 else ""
+
+    # Case 1: explicit CASE references
+    if re.match(r"CASE[:\-]?\d+", first, re.I):
+        return first, rest
+
+    # Case 2: pure numeric with >=3 digits
+    if first.isdigit() and len(first) >= 3:
+        return first, rest
+
+    # Case 3: alphanumeric containing digits, length >=5
+    if any(c.isdigit() for c in first) and len(first) >= 5:
+        return first, rest
+
+    # Otherwise → treat whole thing as Service Provided
+    return "", desc
+
+def parse_invoice_lines(block_lines, header_data):
+    """Parse the lines of one ``Date ... Service Provided`` block into line item records."""
+    lines = [l.strip() for l in block_lines if l.strip()]
+    line_items, current = [], []
+
+    # group lines by date-start
+    for l in lines:
+        if re.match(r"\d{2}/\d{2}/\d{2,4}", l):
+            # new line item starts with a date
+            if current:
+                line_items.append(current)
+            current = [l]
+        else:
+            current.append(l)
+    if current:
+        line_items.append(current)
+
+    records = []
+    for item in line_items:
+        text = " ".join(item)
+
+        # 🔧 FIX: join split decimals like "2,700." "02" → "2,700.02"
+        text = re.sub(r"(\d{1,3}(?:,\d{3})*)\.\s*(\d{2})", r"\1.\2", text)
+
+        # ------------------------
+        # Case 1: With Quantity + Amount
+        # ------------------------
+        m = re.match(
+            r"(\d{2}/\d{2}/\d{2,4})\s+(.+?)\s+(\d{1,6}(?:\.\d{1,2})?)\s+\$?\s*([\d,]+\.\d{2})",
+            text,
+        )
+        if not m:
+            m = re.match(
+                r"(\d{2}/\d{2}/\d{2,4})\s+(.+?)\s+(\d{1,6}(?:\.\d{1,2})?)\s+\$?\s*([\d.,]+)",
+                text,
+            )
+        if m:
+            ref, service = split_reference_and_service(m.group(2))
+            records.append(
+                {
+                    **header_data,
+                    "Service Date": m.group(1),
+                    "Reference": ref,
+                    "Service Provided": service,
+                    "Quantity": m.group(3),
+                    "Amount": m.group(4),
+                }
+            )
+            continue
+
+        # ------------------------
+        # Case 2: Amount only (no Quantity)
+        # ------------------------
+        m = re.match(r"(\d{2}/\d{2}/\d{2,4})\s+(.+?)\s+\$?([\d,]+\.\d{2})", text)
+        if not m:
+            m = re.match(
+                r"(\d{2}/\d{2}/\d{2,4})\s+(.+?)\s+\$?\s*([\d.,]+)",
+                text,
+            )
+        if m:
+            ref, service = split_reference_and_service(m.group(2))
+            records.append(
+                {
+                    **header_data,
+                    "Service Date": m.group(1),
+                    "Reference": ref,
+                    "Service Provided": service,
+                    "Quantity": "",
+                    "Amount": m.group(3),
+                }
+            )
+            continue
+
+        # ------------------------
+        # Case 3: With Quantity but missing Amount
+        # ------------------------
+        m = re.match(
+            r"(\d{2}/\d{2}/\d{2,4})\s+(.+?)\s+(\d{1,6}(?:\.\d{1,2})?)$",
+            text,
+        )
+        if m:
+            ref, service = split_reference_and_service(m.group(2))
+            next_amount = ""
+            if len(item) > 1:
+                maybe_amount = item[-1].replace("$", "").replace(",", "").strip()
+                if re.match(r"^\d+(?:\.\d{2})?$", maybe_amount):
+                    next_amount = maybe_amount
+            records.append(
+                {
+                    **header_data,
+                    "Service Date": m.group(1),
+                    "Reference": ref,
+                    "Service Provided": service,
+                    "Quantity": m.group(3),
+                    "Amount": next_amount,
+                }
+            )
+            continue
+
+    return records
+
+# ---------------------------
+# Parse invoice page
+# ---------------------------
+HEADER_PATTERNS = {
+    "Tax Invoice": r"Tax Invoice\s+(\d+)",
+    "Invoice Date": r"Invoice Date\s+([\d/]+)",
+    "Account Number": r"Account Number\s+(\d+)",
+    "Purchase Order": r"Purchase Order\s*(\S*)",
+    "Total Inc GST": r"Total Inc GST\s*\$?([\d.,]+)",
+    "GST": r"GST\s*\$?([\d.,]+)",
+    "Payment Due": r"Payment due by\s+([\d/]+)",
+}
+
+
+def parse_invoice(text, prev_header=None):
+    """Parse one invoice page with possibly multiple site blocks."""
+    header_data = {
+        f: (m.group(1).strip() if (m := re.search(p, text, re.I)) else "")
+        for f, p in HEADER_PATTERNS.items()
+    }
+
+    # carry headers if continued
+    if prev_header:
+        for key, val in header_data.items():
+            if not val:
+                header_data[key] = prev_header.get(key, "")
+
+    records = []
+    lines, starts = line_index(text)
+
+    # find ALL site blocks
+    for block in re.finditer(
+        r"Date\s+(?:Reference\s+)?Service Provided(.+?)(?:Site\s+Total|continued overleaf|Total\s+Inc|GST\s+|\Z)",
+        text,
+        re.S | re.I,
+    ):
+        # try to find the site address right before this block
+        before = lines_before(lines, starts, block.start(), 8)
+        cust, addr = "", ""
+        for i in range(len(before)):
+            line = before[i].strip()
+            if line and re.search(r"\b(?:VIC|NSW|QLD|TAS|WA|SA|NT|ACT)\b\s*\d{3,4}", line):
+                cust = before[i - 2].strip() if i >= 2 else before[i - 1].strip()
+                addr = " ".join(before[i - 1 : i + 1])
+                break
+
+        header_data["Customer"], header_data["Address"] = cust, addr
+
+        # parse line items inside this block
+        block_records = parse_invoice_lines(lines_between(lines, starts, *block.span(1)), header_data)
+        records.extend(block_records)
+
+    return records, header_data
+
+# ---------------------------
+# Validation
+# ---------------------------
+def validate_invoices(df):
+    if df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce")
+    validation_records = []
+    mismatched_lines = []
+
+    for inv, group in df.groupby("Tax Invoice"):
+        sum_amount = group["Amount"].sum()
+        expected_gst = round(sum_amount * 0.10, 2)
+        calc_total_inc = round(sum_amount + expected_gst, 2)
+
+        reported_total = group["Total Inc GST"].iloc[0]
+        try:
+            reported_total = float(str(reported_total).replace(",", ""))
+        except Exception:
+            reported_total = None
+
+        status = "MATCH"
+        if reported_total and abs(calc_total_inc - reported_total) >= 1.00:
+            status = "MISMATCH"
+
+        validation_records.append(
+            {
+                "Tax Invoice": inv,
+                "Extracted Sum": round(sum_amount, 2),
+                "Expected GST (10%)": expected_gst,
+                "Calculated Total Inc GST": calc_total_inc,
+                "Reported Total Inc GST": reported_total,
+                "Status": status,
+            }
+        )
+
+        if status == "MISMATCH":
+            mismatched_lines.extend(group.to_dict(orient="records"))
+
+    return pd.DataFrame(validation_records), pd.DataFrame(mismatched_lines)
+
+# ---------------------------
+# Headless entry point
+# ---------------------------
+def parse_pages(texts):
+    """Parse page texts in order, carrying missing header fields forward."""
+    all_records = []
+    prev_header = None
+
+    for page_text in texts:
+        records, prev_header = parse_invoice(page_text, prev_header)
+        all_records.extend(records)
+
+    return pd.DataFrame(all_records)
+
+
+def carry_headers(page_results):
+    """Fill header fields a page left blank from the nearest earlier page.
+
+    ``page_results`` are ``parse_invoice(text)`` results parsed without a
+    carried header; the page header and its records are patched in place, so
+    the records match what ``parse_pages`` builds sequentially.
+    """
+    all_records = []
+    prev_header = None
+
+    for records, header_data in page_results:
+        if prev_header:
+            carried = {key: prev_header.get(key, "") for key in HEADER_PATTERNS if not header_data[key]}
+            header_data.update(carried)
+            for record in records:
+                record.update(carried)
+        all_records.extend(records)
+        prev_header = header_data
+
+    return all_records
+
+
+def parse_pages_parallel(pdf_input, workers):
+    """Extract and parse pages across ``workers`` processes, then carry headers in page order."""
+    source = pdf_source(pdf_input)
+    backend = VENDOR_BACKENDS["veolia"]
+    n_pages = page_count(source, backend)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_page_text_worker,
+                             initargs=(source, backend)) as executor:
+        page_results = map_page_texts(executor, n_pages, workers, parse_invoice)
+
+    return pd.DataFrame(carry_headers(page_results))
+
+
+def parse(pdf_input, workers=1):
+    """Parse a Veolia invoice PDF into line items plus per-invoice validation.
+
+    With ``workers`` > 1 pages are extracted and parsed in a process pool
+    (``parse_pages_parallel``); the result is the same as the sequential parse.
+    """
+    if workers > 1:
+        df = parse_pages_parallel(pdf_input, workers)
+    else:
+        df = parse_pages(extract_text_from_pdf(pdf_input))
+    df, rejects = normalize_amounts(df, ("Quantity", "Amount"))
+    rejects = concat_rejects({"Line_Items": rejects})
+    validation_df, mismatched_df = validate_invoices(df)
+
+    if validation_df.empty:
+        status = "UNKNOWN"
+    else:
+        status = "MATCH" if (validation_df["Status"] == "MATCH").all() else "MISMATCH"
+
+    tables = {}
+    if not df.empty:
+        tables["Line_Items"] = df
+    if not validation_df.empty:
+        tables["Validation"] = validation_df
+    if not mismatched_df.empty:
+        tables["Mismatched_Lines"] = mismatched_df
+    if not rejects.empty:
+        tables["Rejected Values"] = rejects
+
+    return {
+        "df": df,
+        "validation_df": validation_df,
+        "mismatched_df": mismatched_df,
+        "reconciliation": {"status": status},
+        "rejects": rejects,
+        "tables": tables,
+    }
@@ -0,0 +1,110 @@
+"""Streaming Excel export shared by the apps and the CLI.
+
+Sheets are written one after another into an xlsxwriter ``constant_memory``
+workbook: each row is flushed to a temp file as soon as the next one starts,
+so memory stays flat however long the tables are. Numeric columns are written
+as numbers, text always as text (never interpreted as formulas or URLs).
+"""
+import datetime
+import math
+import numbers
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+MAX_ROWS = 1_048_576
+MAX_SHEET_NAME = 31
+# Rows converted from the DataFrame to Python values at a time
+CHUNK_ROWS = 10_000
+# workbook_bytes() builds the file in memory up to this size, then on disk
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+
+def _write_float(ws, row, col, value):
+    if value != value:  # NaN -> blank, as pandas writes it
+        return
+    if math.isinf(value):
+        ws.write_string(row, col, "inf" if value > 0 else "-inf")
+    else:
+        ws.write_number(row, col, value)
+
+
+def _write_int(ws, row, col, value):
+    ws.write_number(row, col, value)
+
+
+def _write_bool(ws, row, col, value):
+    ws.write_boolean(row, col, value)
+
+
+def _write_value(ws, row, col, value, date_format=None):
+    if isinstance(value, str):
+        if value:
+            ws.write_string(row, col, value)
+    elif value is None or value is pd.NaT or value is pd.NA:
+        return
+    elif isinstance(value, bool):
+        ws.write_boolean(row, col, value)
+    elif isinstance(value, numbers.Real):
+        _write_float(ws, row, col, float(value))
+    elif isinstance(value, (datetime.date, datetime.datetime)):
+        ws.write_datetime(row, col, value, date_format)
+    else:
+        ws.write_string(row, col, str(value))
+
+
+def _column_writer(series, date_format):
+    if pd.api.types.is_bool_dtype(series.dtype) and not series.hasnans:
+        return _write_bool
+    if pd.api.types.is_integer_dtype(series.dtype) and not series.hasnans:
+        return _write_int
+    # Nullable extension dtypes (Float64, ...) hold pd.NA, which _write_value handles
+    if pd.api.types.is_float_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+        return _write_float
+    return lambda ws, row, col, value: _write_value(ws, row, col, value, date_format)
+
+
+def write_sheet(workbook, sheet_name, df, header_format=None, date_format=None):
+    """Stream ``df`` (header row plus values, no index) into a new worksheet."""
+    if len(df) + 1 > MAX_ROWS:
+        raise ValueError(f"Sheet '{sheet_name}' has {len(df):,} rows; Excel allows {MAX_ROWS - 1:,}.")
+    ws = workbook.add_worksheet(sheet_name[:MAX_SHEET_NAME])
+    for col, name in enumerate(df.columns):
+        ws.write_string(0, col, str(name), header_format)
+
+    writers = [_column_writer(df[name], date_format) for name in df.columns]
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS]
+        columns = [chunk.iloc[:, i].tolist() for i in range(len(writers))]
+        for offset, row_values in enumerate(zip(*columns)):
+            row = start + offset + 1
+            for col, (write, value) in enumerate(zip(writers, row_values)):
+                write(ws, row, col, value)
+    return ws
+
+
+def write_workbook(tables, target):
+    """Write a sheet-name -> DataFrame mapping to ``target`` (a path or binary file object)."""
+    workbook = xlsxwriter.Workbook(target, {"constant_memory": True, "remove_timezone": True})
+    header_format = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    date_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+    try:
+        for sheet_name, df in tables.items():
+            write_sheet(workbook, sheet_name, df, header_format, date_format)
+    finally:
+        workbook.close()
+    return target
+
+
+def workbook_bytes(tables):
+    """The workbook for ``tables`` as bytes, e.g. for ``st.download_button``.
+
+    The zip is assembled in a spooled temp file, which moves to disk once it
+    outgrows ``SPOOL_MAX_BYTES``.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as f:
+        write_workbook(tables, f)
+        f.seek(0)
+        return f.read()